@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import Any, Dict
+import tempfile
+import anyio
+from ..auth import require_admin
+from ..database import SessionLocal
+
+# The export/import machinery (app.utils.bulk_data) is imported on first use:
+# these endpoints are rare, so workers don't pay for it at startup
+
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/export")
+def export_data():
+    """
+    Download agents, tasks, interactions and reputation logs as
+    gzip-compressed NDJSON (requires ADMIN_API_KEY as the bearer token).
+    The export is streamed in constant memory and doesn't block writers,
+    so it is safe to take while the service is running.
+    """
+    from ..utils.bulk_data import export_stream, EXPORT_MEDIA_TYPE
+
+    filename = f"50c14l-export-{datetime.utcnow():%Y%m%dT%H%M%SZ}.ndjson.gz"
+    return StreamingResponse(
+        export_stream(),
+        media_type=EXPORT_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import")
+async def import_data(request: Request, skip_existing: bool = False) -> Dict[str, Any]:
+    """
+    Load an export produced by GET /export (gzipped or plain NDJSON body).
+    The upload is spooled to a temporary file, then inserted in large
+    batches; counters, rollups, leaderboards, the search index and every
+    worker's caches are rebuilt at the end.
+
+    Query params:
+    - skip_existing: skip rows that already exist instead of failing (409).
+      Batches committed before a failure stay; re-run with skip_existing.
+    """
+    from ..utils.bulk_data import import_stream, open_export
+
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        def run() -> Dict[str, Any]:
+            db = SessionLocal()
+            try:
+                return import_stream(db, open_export(spool), skip_existing=skip_existing)
+            finally:
+                db.close()
+
+        try:
+            return await anyio.to_thread.run_sync(run)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except IntegrityError as e:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Rows already exist ({e.orig}); retry with skip_existing=true"
+            )
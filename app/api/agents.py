@@ -1,7 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from ..database import get_db
 from ..models import Agent
@@ -11,9 +10,19 @@ from ..schemas import (
     AgentResponse,
     AgentUpdate,
     AgentPublicProfile,
-    AgentSearchRequest
+    AgentSearchRequest,
+    AgentRank,
+    ReputationHistory
 )
 from ..auth import generate_api_key, hash_api_key, get_current_agent
+from ..utils.leaderboard import update_agent_score, get_rank, get_leaderboard
+from ..utils.reputation_history import get_reputation_history
+from ..utils.last_active import pending_last_active
+from ..utils.capability_index import capability_index
+from ..utils.capability_catalog import capability_catalog
+from ..utils.profile_cache import profile_cache, cached_page_response
+from ..utils.notifications import invalidation_bus
+from ..utils.table_versions import etag_headers, list_etag, not_modified
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -46,6 +55,10 @@ def register_agent(agent_data: AgentRegister, request: Request, db: Session = De
     db.commit()
     db.refresh(new_agent)
 
+    update_agent_score(new_agent.id, new_agent.reputation_score, new_agent.capabilities)
+    invalidation_bus.publish("agent", new_agent.id, capabilities=new_agent.capabilities,
+                             score=new_agent.reputation_score)
+
     # Generate profile URL
     base_url = str(request.base_url).rstrip('/')
     profile_url = f"{base_url}/agent/{new_agent.id}"
@@ -63,9 +76,10 @@ def get_my_profile(agent: Agent = Depends(get_current_agent)):
     """
     Get the authenticated agent's profile.
     """
-    # Update last_active
-    agent.last_active = datetime.utcnow()
-    return agent
+    profile = AgentResponse.model_validate(agent)
+    # Include this request's activity, which is still waiting in the buffer
+    profile.last_active = pending_last_active(agent.id) or profile.last_active
+    return profile
 
 
 @router.patch("/me", response_model=AgentResponse)
@@ -77,6 +91,8 @@ def update_my_profile(
     """
     Update the authenticated agent's profile.
     """
+    previous_capabilities = list(agent.capabilities or [])
+
     if updates.description is not None:
         agent.description = updates.description
     if updates.capabilities is not None:
@@ -87,54 +103,149 @@ def update_my_profile(
         agent.agent_metadata = updates.agent_metadata
 
     agent.updated_at = datetime.utcnow()
-    agent.last_active = datetime.utcnow()
 
     db.commit()
     db.refresh(agent)
 
+    if updates.capabilities is not None:
+        update_agent_score(agent.id, agent.reputation_score, agent.capabilities, previous_capabilities)
+        invalidation_bus.publish("agent", agent.id, capabilities=agent.capabilities,
+                                 previous_capabilities=previous_capabilities, score=agent.reputation_score)
+    else:
+        invalidation_bus.publish("agent", agent.id)
+
     return agent
 
 
+@router.post("/search", response_model=List[AgentPublicProfile])
+def search_agents(search: AgentSearchRequest, db: Session = Depends(get_db)):
+    """
+    Search for agents by capabilities and tags.
+    With capabilities, agents are ranked by number of matching capabilities,
+    then reputation score. `match` selects "any" (default) or "all" capabilities;
+    `fuzzy` also matches similar capability names from the catalog.
+    """
+    return _search_agents(search, db)
+
+
+@router.get("/search", response_model=List[AgentPublicProfile])
+def search_agents_get(
+    request: Request,
+    response: Response,
+    capabilities: Optional[str] = None,
+    match: str = Query(default="any", pattern="^(any|all)$"),
+    fuzzy: bool = False,
+    limit: int = Query(default=25, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Same as POST /agents/search, with capabilities as a comma-separated list.
+    Supports If-None-Match: returns 304 if no agent changed since the ETag was issued.
+    """
+    etag = list_etag(request, ["agents"])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers.update(etag_headers(etag))
+
+    search = AgentSearchRequest(
+        capabilities=[c.strip() for c in capabilities.split(",") if c.strip()] if capabilities else [],
+        match=match,
+        fuzzy=fuzzy,
+        limit=limit
+    )
+    return _search_agents(search, db)
+
+
 @router.get("/{agent_id}", response_model=AgentPublicProfile)
-def get_agent_profile(agent_id: str, db: Session = Depends(get_db)):
+def get_agent_profile(agent_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Get a public agent profile by ID.
+    Supports If-None-Match: an unchanged profile returns 304 without a database query.
     """
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
-    if not agent:
+    page = profile_cache.get("profile", agent_id)
+    if page is None:
+        version = profile_cache.version(agent_id)
+        agent = db.query(Agent).filter(Agent.id == agent_id).first()
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+
+        page = profile_cache.put(
+            "profile",
+            agent_id,
+            AgentPublicProfile.model_validate(agent).model_dump_json().encode(),
+            "application/json",
+            agent.updated_at or agent.created_at,
+            version=version
+        )
+
+    return cached_page_response(request, page)
+
+
+@router.get("/{agent_id}/rank", response_model=AgentRank)
+def get_agent_rank(agent_id: str, capability: Optional[str] = None):
+    """
+    Get an agent's leaderboard rank (1 = highest reputation).
+    Pass `capability` to rank among agents with that capability only.
+    """
+    position = get_rank(agent_id, capability)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Agent not ranked")
+
+    rank, score, total = position
+    return AgentRank(
+        agent_id=agent_id,
+        rank=rank,
+        reputation_score=score,
+        total_ranked=total,
+        capability=capability
+    )
+
+
+@router.get("/{agent_id}/reputation/history", response_model=ReputationHistory)
+def get_agent_reputation_history(agent_id: str, days: int = 30, db: Session = Depends(get_db)):
+    """
+    Get an agent's daily reputation changes, served from daily rollups.
+    Query params:
+    - days: number of days to include (default 30, max 365)
+    """
+    days = min(max(days, 1), 365)
+
+    if not db.query(Agent.id).filter(Agent.id == agent_id).first():
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    return agent
+    return get_reputation_history(db, agent_id, days)
 
 
-@router.post("/search", response_model=List[AgentPublicProfile])
-def search_agents(search: AgentSearchRequest, db: Session = Depends(get_db)):
+def _agents_by_ids(db: Session, ids: List[str]) -> List[Agent]:
     """
-    Search for agents by capabilities and tags.
-    Returns agents ranked by reputation score and capability match.
+    Load one page of active agents by id, in the given order.
     """
+    # Primary key lookup only: with is_active in the WHERE clause SQLite picks
+    # ix_agents_active_reputation and scans every active agent instead
+    by_id = {a.id: a for a in db.query(Agent).filter(Agent.id.in_(ids)).all() if a.is_active}
+    return [by_id[agent_id] for agent_id in ids if agent_id in by_id]
+
+
+def _search_agents(search: AgentSearchRequest, db: Session) -> List[Agent]:
     query = db.query(Agent).filter(Agent.is_active == True)
 
-    # Filter by capabilities if provided (case-insensitive)
+    # Capability matching runs against the in-memory inverted index
     if search.capabilities:
-        # Get all agents and filter in Python for case-insensitive matching
-        # SQLite JSON contains is case-sensitive, so we filter post-query
-        all_agents = query.all()
-
-        # Normalize search capabilities to lowercase
-        search_caps_lower = [cap.lower() for cap in search.capabilities]
-
-        # Filter agents that have matching capabilities (case-insensitive)
-        matching_agents = []
-        for agent in all_agents:
-            agent_caps_lower = [c.lower() for c in (agent.capabilities or [])]
-            # Check if any search capability matches
-            if any(search_cap in agent_caps_lower for search_cap in search_caps_lower):
-                matching_agents.append(agent)
-
-        # Sort by reputation and limit
-        matching_agents.sort(key=lambda a: a.reputation_score, reverse=True)
-        return matching_agents[:search.limit]
+        if search.fuzzy:
+            groups = [capability_catalog.expand(cap) for cap in search.capabilities if cap.strip()]
+            ranked = capability_index.search_groups(groups, search.match, search.limit)
+        else:
+            ranked = capability_index.search(search.capabilities, search.match, search.limit)
+        if not ranked:
+            return []
+
+        return _agents_by_ids(db, [agent_id for agent_id, _ in ranked])
+
+    # Top agents come straight from the leaderboard, already ordered
+    top = get_leaderboard(0, search.limit)
+    if top:
+        return _agents_by_ids(db, [agent_id for agent_id, _ in top])
 
     # Order by reputation score descending
     query = query.order_by(Agent.reputation_score.desc())
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from typing import List, Optional
+from ..schemas import CapabilityEntry
+from ..utils.capability_catalog import capability_catalog
+
+router = APIRouter(prefix="/capabilities", tags=["capabilities"])
+
+
+@router.get("", response_model=List[CapabilityEntry])
+def list_capabilities(prefix: Optional[str] = None, fuzzy: bool = False, limit: int = 20):
+    """
+    Capability catalog and autocomplete.
+    Query params:
+    - prefix: only capabilities starting with this text (case-insensitive)
+    - fuzzy: treat `prefix` as a fuzzy query and return similar capabilities
+    - limit: max number of results (default 20, max 100)
+    Results are ordered by usage (agents + tasks), or by similarity when fuzzy.
+    """
+    if limit > 100:
+        limit = 100
+
+    if fuzzy and prefix:
+        return capability_catalog.similar(prefix, limit)
+
+    return capability_catalog.complete(prefix or "", limit)
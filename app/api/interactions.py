@@ -1,26 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
 from ..database import get_db
 from ..models import Agent, Interaction
 from ..schemas import InteractionMessage, InteractionResponse
 from ..auth import get_current_agent
-import httpx
+from ..utils.table_versions import etag_headers, list_etag, not_modified
+from ..utils.blob_store import offload_json, json_document_response
+from ..utils.idempotency import IdempotentRequest, idempotent_request
+from ..utils.fast_json import (
+    raw_json, row_mapper, rows_response, wants_ndjson, ndjson_response, NDJSON_MAX_LIMIT, FastJSONResponse
+)
+from ..utils.interaction_archive import decode_cursor, encode_cursor, history_page
+from ..utils.metrics import WEBHOOK_DELIVERY, WEBHOOK_DELIVERIES
+import time
 
 router = APIRouter(prefix="/interactions", tags=["interactions"])
 
+# InteractionResponse fields, selected as plain columns for the list fast path
+INTERACTION_COLUMNS = (
+    Interaction.id, Interaction.sender_id, Interaction.recipient_id, Interaction.message_type,
+    raw_json(Interaction.payload), Interaction.status, Interaction.created_at
+)
+_interaction_row = row_mapper(("payload",))
+
 
 @router.post("/message", response_model=InteractionResponse)
 async def send_message(
     message: InteractionMessage,
     agent: Agent = Depends(get_current_agent),
+    idem: IdempotentRequest = Depends(idempotent_request),
     db: Session = Depends(get_db)
 ):
     """
     Send a direct message to another agent.
     Calls recipient's webhook if configured.
+    Retries carrying the same Idempotency-Key get the original response.
     """
+    replay = idem.start(message)
+    if replay:
+        return replay
+
     # Check if recipient exists
     recipient = db.query(Agent).filter(Agent.id == message.recipient_id).first()
     if not recipient:
@@ -34,12 +54,11 @@ async def send_message(
         sender_id=agent.id,
         recipient_id=message.recipient_id,
         message_type=message.message_type,
-        payload=message.payload,
+        payload=offload_json(message.payload),
         status="sent"
     )
 
     db.add(interaction)
-    agent.last_active = datetime.utcnow()
     db.commit()
     db.refresh(interaction)
 
@@ -47,6 +66,9 @@ async def send_message(
     webhook_url = recipient.endpoints.get("webhook") if isinstance(recipient.endpoints, dict) else None
 
     if webhook_url:
+        import httpx  # Only needed for webhook delivery; kept off the startup path
+
+        started = time.perf_counter()
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.post(
@@ -61,33 +83,49 @@ async def send_message(
                 )
                 if response.status_code == 200:
                     interaction.status = "delivered"
+                    outcome = "delivered"
                 else:
                     interaction.status = "failed"
+                    outcome = "rejected"
         except Exception as e:
             interaction.status = "failed"
+            outcome = "error"
             print(f"Webhook delivery failed: {e}")
 
+        WEBHOOK_DELIVERY.labels(outcome).observe(time.perf_counter() - started)
+        WEBHOOK_DELIVERIES.labels(outcome).inc()
+
         db.commit()
         db.refresh(interaction)
 
-    return interaction
+    return idem.save(InteractionResponse.model_validate(interaction))
 
 
 @router.get("/history", response_model=List[InteractionResponse])
 def get_interaction_history(
     with_agent_id: Optional[str] = None,
     limit: int = 50,
+    before: Optional[str] = None,
     agent: Agent = Depends(get_current_agent),
     db: Session = Depends(get_db)
 ):
     """
-    Get interaction history for the authenticated agent.
+    Get interaction history for the authenticated agent, most recent first.
     Optionally filter by a specific agent.
+    A full page carries an X-Next-Cursor header; pass it as `before` for the
+    next (older) page. Interactions past the retention window are read from
+    the compressed archive transparently.
     """
     if limit > 100:
         limit = 100
-
-    query = db.query(Interaction).filter(
+    try:
+        cursor = decode_cursor(before) if before else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit < 1:
+        return FastJSONResponse([])
+
+    query = db.query(*INTERACTION_COLUMNS).filter(
         (Interaction.sender_id == agent.id) | (Interaction.recipient_id == agent.id)
     )
 
@@ -98,29 +136,73 @@ def get_interaction_history(
             ((Interaction.sender_id == with_agent_id) & (Interaction.recipient_id == agent.id))
         )
 
-    # Order by most recent first
-    interactions = query.order_by(Interaction.created_at.desc()).limit(limit).all()
+    if cursor:
+        created_at, interaction_id = cursor
+        query = query.filter(
+            (Interaction.created_at < created_at) |
+            ((Interaction.created_at == created_at) & (Interaction.id < interaction_id))
+        )
 
-    agent.last_active = datetime.utcnow()
-    db.commit()
+    # Order by most recent first
+    hot = [_interaction_row(row) for row in
+           query.order_by(Interaction.created_at.desc(), Interaction.id.desc()).limit(limit)]
+    page = history_page(db, hot, agent.id, with_agent_id, cursor, limit)
 
-    return interactions
+    headers = {}
+    if len(page) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(page[-1]["created_at"], page[-1]["id"])
+    return FastJSONResponse(page, headers=headers)
 
 
 @router.get("/all", response_model=List[InteractionResponse])
 def get_all_interactions(
+    request: Request,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
     """
     Get all interactions (public endpoint for visualization).
     Returns interactions with sender and recipient information.
+    Supports If-None-Match: returns 304 if no interaction changed since the ETag was issued.
+    With `Accept: application/x-ndjson` the results are streamed one interaction
+    per line and limit may go up to 100000.
     """
+    etag = list_etag(request, ["interactions"])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    headers = etag_headers(etag)
+
+    def interaction_rows(session: Session):
+        return session.query(*INTERACTION_COLUMNS).order_by(Interaction.created_at.desc())
+
+    if wants_ndjson(request):
+        return ndjson_response(interaction_rows, _interaction_row, limit=min(limit, NDJSON_MAX_LIMIT),
+                               headers=headers)
+
     if limit > 500:
         limit = 500
 
-    interactions = db.query(Interaction).order_by(Interaction.created_at.desc()).limit(limit).all()
-    return interactions
+    return rows_response(interaction_rows(db).limit(limit), _interaction_row, headers)
+
+
+@router.get("/{interaction_id}/payload")
+def get_interaction_payload(
+    interaction_id: str,
+    request: Request,
+    agent: Agent = Depends(get_current_agent),
+    db: Session = Depends(get_db)
+):
+    """
+    Download a message's full payload (sender or recipient only).
+    Large payloads are listed as a {"$blob": ...} reference and streamed
+    from the blob store here (Range requests supported).
+    """
+    interaction = db.query(Interaction.sender_id, Interaction.recipient_id, Interaction.payload) \
+        .filter(Interaction.id == interaction_id).first()
+    if not interaction or agent.id not in (interaction.sender_id, interaction.recipient_id):
+        raise HTTPException(status_code=404, detail="Interaction not found")
+    return json_document_response(request, interaction.payload or {})
 
 
 @router.post("/callback")
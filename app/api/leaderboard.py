@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ..database import get_db
+from ..models import Agent
+from ..schemas import LeaderboardEntry
+from ..utils.leaderboard import get_leaderboard
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+
+@router.get("", response_model=List[LeaderboardEntry])
+def read_leaderboard(
+    offset: int = 0,
+    limit: int = 100,
+    capability: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get agents ranked by reputation score.
+    Query params:
+    - offset: number of entries to skip
+    - limit: max number of results (default 100, max 500)
+    - capability: rank only agents with this capability
+    """
+    if limit > 500:
+        limit = 500
+    if offset < 0:
+        offset = 0
+
+    page = get_leaderboard(offset, limit, capability)
+    if not page:
+        return []
+
+    # One query for the whole page instead of one per entry
+    ids = [agent_id for agent_id, _ in page]
+    agents = {a.id: a for a in db.query(Agent).filter(Agent.id.in_(ids)).all()}
+
+    entries = []
+    for position, (agent_id, score) in enumerate(page, start=offset + 1):
+        agent = agents.get(agent_id)
+        if not agent:
+            continue
+        entries.append(LeaderboardEntry(
+            rank=position,
+            agent_id=agent_id,
+            name=agent.name,
+            reputation_score=score,
+            total_tasks_completed=agent.total_tasks_completed
+        ))
+    return entries
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+from ..database import get_db
+from ..utils.stats import get_stats
+from ..utils.rate_limit import admission
+from ..utils.startup import startup, require_warm
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("", dependencies=[Depends(require_warm)])
+def platform_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Platform totals: tasks per status, agent counts, message volumes
+    and open tasks per capability.
+    Served from counters that are updated in the same transaction as each
+    state change, so this never scans the tasks or interactions tables.
+    """
+    return get_stats(db)
+
+
+@router.get("/admission")
+def admission_stats() -> Dict[str, Any]:
+    """
+    Rate limiting and load shedding state of this worker: configured limits,
+    requests in flight, average latency, and rejections per route class / reason.
+    """
+    return admission.metrics()
+
+
+@router.get("/startup")
+def startup_stats() -> Dict[str, Any]:
+    """
+    How this worker started: import time, each startup phase in ms
+    (schema check, then the background cache pre-warm) and whether the
+    caches are warm yet.
+    """
+    return startup.report()
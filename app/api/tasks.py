@@ -1,32 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 from ..database import get_db
 from ..models import Agent, Task
-from ..schemas import TaskCreate, TaskComplete, TaskResponse
+from ..schemas import TaskCreate, TaskComplete, TaskResponse, TaskRecommendation, TaskSearchResult
 from ..auth import get_current_agent
 from ..utils.reputation import update_reputation
-from ..utils.notifications import publish_task
+from ..utils.notifications import publish_task, invalidation_bus
+from ..utils.capability_catalog import capability_catalog
+from ..utils.capability_index import capability_index
+from ..utils.task_matcher import task_matcher
+from ..utils.task_search import search_tasks
+from ..utils.table_versions import etag_headers, list_etag, not_modified
+from ..utils.blob_store import offload_json, json_document_response
+from ..utils.idempotency import IdempotentRequest, idempotent_request
+from ..utils.result_cache import task_cache_key, lookup_result, remember_cacheable, store_result, forget_cacheable
+from ..utils.fast_json import (
+    raw_json, row_mapper, rows_response, wants_ndjson, ndjson_response, NDJSON_MAX_LIMIT
+)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# TaskResponse fields, selected as plain columns for the list fast path
+TASK_COLUMNS = (
+    Task.id, Task.requester_id, Task.claimer_id, Task.title, Task.description,
+    Task.required_capabilities, raw_json(Task.payload), raw_json(Task.result),
+    Task.status, Task.priority, Task.expires_at, Task.created_at, Task.updated_at,
+    Task.completed_at
+)
+_task_row = row_mapper(("payload", "result"))
+
+
+def _announce_task_created(task: Task):
+    # Catalog counts, matcher lists and the requester's profile, in every worker
+    invalidation_bus.publish(
+        "task", task.id, event="created", status=task.status, requester_id=task.requester_id,
+        priority=task.priority, created_at=task.created_at, expires_at=task.expires_at,
+        capabilities=task.required_capabilities
+    )
+    invalidation_bus.publish("agent", task.requester_id)  # total_tasks_posted changed
+
 
 @router.post("", response_model=TaskResponse)
 def create_task(
     task_data: TaskCreate,
     agent: Agent = Depends(get_current_agent),
+    idem: IdempotentRequest = Depends(idempotent_request),
     db: Session = Depends(get_db)
 ):
     """
     Post a new task/request.
+
+    With `cacheable: true`, a fresh result of an identical task (same
+    capabilities and payload) is returned straight away as a completed task.
+    Retries carrying the same Idempotency-Key get the original response.
     """
+    replay = idem.start(task_data)
+    if replay:
+        return replay
+
+    cache_key = None
+    if task_data.cacheable:
+        cache_key = task_cache_key(task_data.required_capabilities, task_data.payload)
+        cached = lookup_result(db, cache_key)
+        if cached:
+            now = datetime.utcnow()
+            new_task = Task(
+                requester_id=agent.id,
+                claimer_id=cached.claimer_id,
+                title=task_data.title,
+                description=task_data.description,
+                required_capabilities=task_data.required_capabilities,
+                payload=offload_json(task_data.payload),
+                result=cached.result,
+                priority=task_data.priority,
+                expires_at=task_data.expires_at,
+                status="completed",
+                completed_at=now
+            )
+            db.add(new_task)
+            agent.total_tasks_posted += 1
+            db.commit()
+            db.refresh(new_task)
+
+            _announce_task_created(new_task)
+            return idem.save(TaskResponse.model_validate(new_task))
+
     new_task = Task(
         requester_id=agent.id,
         title=task_data.title,
         description=task_data.description,
         required_capabilities=task_data.required_capabilities,
-        payload=task_data.payload,
+        payload=offload_json(task_data.payload),
         priority=task_data.priority,
         expires_at=task_data.expires_at,
         status="open"
@@ -34,10 +100,14 @@ def create_task(
 
     db.add(new_task)
     agent.total_tasks_posted += 1
-    agent.last_active = datetime.utcnow()
+    if cache_key:
+        db.flush()
+        remember_cacheable(db, new_task, cache_key)
     db.commit()
     db.refresh(new_task)
 
+    _announce_task_created(new_task)
+
     # Broadcast to Redis
     publish_task({
         "id": new_task.id,
@@ -47,54 +117,154 @@ def create_task(
         "created_at": new_task.created_at.isoformat()
     })
 
-    return new_task
+    return idem.save(TaskResponse.model_validate(new_task))
 
 
 @router.get("", response_model=List[TaskResponse])
 def list_tasks(
+    request: Request,
     capabilities: Optional[str] = None,
     status: Optional[str] = "open",
     limit: int = 25,
+    fuzzy: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     List available tasks.
     Query params:
     - capabilities: comma-separated list of capabilities
+    - fuzzy: also match similar capability names (e.g. "python3" for "python")
     - status: task status (open, in_progress, completed, cancelled)
     - limit: max number of results (default 25, max 100)
+    Supports If-None-Match: returns 304 if no task changed since the ETag was issued.
+    With `Accept: application/x-ndjson` the results are streamed one task per
+    line and limit may go up to 100000.
     """
-    if limit > 100:
-        limit = 100
+    # Fuzzy expansion reads the capability catalog, which agents also feed
+    etag = list_etag(request, ["tasks", "agents"] if fuzzy else ["tasks"])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    headers = etag_headers(etag)
+
+    streaming = wants_ndjson(request)
+    limit = min(limit, NDJSON_MAX_LIMIT if streaming else 100)
+
+    def task_rows(session: Session):
+        query = session.query(*TASK_COLUMNS)
+        if status:
+            query = query.filter(Task.status == status)
+        # Order by priority descending, then created_at descending
+        return query.order_by(Task.priority.desc(), Task.created_at.desc())
+
+    caps_list = None
+    if capabilities:
+        caps_list = {c.strip().lower() for c in capabilities.split(",")}
+        if fuzzy:
+            caps_list = set().union(*(capability_catalog.expand(c) for c in caps_list if c))
+
+    def matches(row) -> bool:
+        # Case-insensitive: any requested capability in the task's capabilities
+        return any(c.lower() in caps_list for c in (row.required_capabilities or []))
+
+    if streaming:
+        return ndjson_response(task_rows, _task_row, keep=matches if caps_list else None,
+                               limit=limit, headers=headers)
 
-    query = db.query(Task)
+    if not caps_list:
+        return rows_response(task_rows(db).limit(limit), _task_row, headers)
 
-    # Filter by status
+    # Filter on the capability column alone, then load full rows for the page
+    candidates = db.query(Task.id, Task.required_capabilities)
     if status:
-        query = query.filter(Task.status == status)
+        candidates = candidates.filter(Task.status == status)
+    candidates = candidates.order_by(Task.priority.desc(), Task.created_at.desc())
 
-    # Filter by capabilities (case-insensitive)
-    if capabilities:
-        caps_list = [c.strip().lower() for c in capabilities.split(",")]
+    ids = []
+    for row in candidates.yield_per(1000):
+        if matches(row):
+            ids.append(row.id)
+            if len(ids) >= limit:
+                break
 
-        # Get all matching tasks and filter in Python for case-insensitive
-        all_tasks = query.order_by(Task.priority.desc(), Task.created_at.desc()).all()
+    rows = {row.id: row for row in db.query(*TASK_COLUMNS).filter(Task.id.in_(ids))} if ids else {}
+    return rows_response((rows[task_id] for task_id in ids if task_id in rows), _task_row, headers)
 
-        # Filter tasks with case-insensitive capability matching
-        matching_tasks = []
-        for task in all_tasks:
-            task_caps_lower = [c.lower() for c in (task.required_capabilities or [])]
-            # Check if any search capability matches
-            if any(search_cap in task_caps_lower for search_cap in caps_list):
-                matching_tasks.append(task)
 
-        return matching_tasks[:limit]
+@router.get("/recommended", response_model=List[TaskRecommendation])
+def recommend_tasks(
+    limit: int = 10,
+    agent: Agent = Depends(get_current_agent),
+    db: Session = Depends(get_db)
+):
+    """
+    Open tasks ranked for the authenticated agent.
+    Ranks by capability overlap with the agent's capabilities, task priority,
+    requester reputation and task age.
+    Query params:
+    - limit: max number of results (default 10, max 100)
+    """
+    if limit > 100:
+        limit = 100
 
-    # Order by priority descending, then created_at descending
-    query = query.order_by(Task.priority.desc(), Task.created_at.desc())
+    ranked = task_matcher.recommend(agent.id, agent.capabilities or [], capability_index.score, limit)
+    if not ranked:
+        return []
+
+    ids = [task_id for task_id, _, _ in ranked]
+    tasks = {t.id: t for t in db.query(Task).filter(Task.id.in_(ids), Task.status == "open").all()}
+
+    recommendations = []
+    for task_id, score, matched in ranked:
+        task = tasks.get(task_id)
+        if not task:
+            continue
+        recommendations.append(TaskRecommendation(
+            **TaskResponse.model_validate(task).model_dump(),
+            match_score=score,
+            matched_capabilities=matched
+        ))
+    return recommendations
+
+
+@router.get("/search", response_model=List[TaskSearchResult])
+def search_task_text(
+    q: str,
+    status: Optional[str] = None,
+    capabilities: Optional[str] = None,
+    limit: int = 25,
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over task titles and descriptions, best match first.
+    Query params:
+    - q: search text (all terms must match; the last term also matches as a prefix)
+    - status: task status (open, in_progress, completed, cancelled)
+    - capabilities: comma-separated list; tasks must require at least one
+    - limit: max number of results (default 25, max 100)
+    Each result includes a `snippet` with matched terms wrapped in <mark> tags.
+    """
+    if limit > 100:
+        limit = 100
+
+    caps_list = [c.strip().lower() for c in capabilities.split(",") if c.strip()] if capabilities else None
+    hits = search_tasks(db, q, status, caps_list, limit)
+    if not hits:
+        return []
 
-    tasks = query.limit(limit).all()
-    return tasks
+    tasks = {t.id: t for t in db.query(Task).filter(Task.id.in_([task_id for task_id, _, _ in hits])).all()}
+
+    results = []
+    for task_id, rank, snippet in hits:
+        task = tasks.get(task_id)
+        if not task:
+            continue
+        results.append(TaskSearchResult(
+            **TaskResponse.model_validate(task).model_dump(),
+            rank=rank,
+            snippet=snippet
+        ))
+    return results
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
@@ -108,6 +278,32 @@ def get_task(task_id: str, db: Session = Depends(get_db)):
     return task
 
 
+@router.get("/{task_id}/payload")
+def get_task_payload(task_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Download a task's full payload.
+    Large payloads are listed as a {"$blob": ...} reference and streamed
+    from the blob store here (Range requests supported).
+    """
+    task = db.query(Task.payload).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return json_document_response(request, task.payload or {})
+
+
+@router.get("/{task_id}/result")
+def get_task_result(task_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Download a completed task's full result (streamed like /payload).
+    """
+    task = db.query(Task.result).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.result is None:
+        raise HTTPException(status_code=404, detail="Task has no result")
+    return json_document_response(request, task.result)
+
+
 @router.post("/{task_id}/claim", response_model=TaskResponse)
 def claim_task(
     task_id: str,
@@ -131,11 +327,12 @@ def claim_task(
     task.claimer_id = agent.id
     task.status = "in_progress"
     task.updated_at = datetime.utcnow()
-    agent.last_active = datetime.utcnow()
 
     db.commit()
     db.refresh(task)
 
+    invalidation_bus.publish("task", task.id, event="closed")
+
     return task
 
 
@@ -144,12 +341,18 @@ def complete_task(
     task_id: str,
     completion: TaskComplete,
     agent: Agent = Depends(get_current_agent),
+    idem: IdempotentRequest = Depends(idempotent_request),
     db: Session = Depends(get_db)
 ):
     """
     Mark task as complete.
     Updates reputation scores for both requester and claimer.
+    Retries carrying the same Idempotency-Key get the original response.
     """
+    replay = idem.start(completion)
+    if replay:
+        return replay
+
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -162,13 +365,13 @@ def complete_task(
 
     # Update task
     task.status = "completed"
-    task.result = completion.result
+    task.result = offload_json(completion.result)
     task.completed_at = datetime.utcnow()
     task.updated_at = datetime.utcnow()
+    store_result(db, task)  # No-op unless the task was posted as cacheable
 
     # Update agent stats
     agent.total_tasks_completed += 1
-    agent.last_active = datetime.utcnow()
 
     # Update reputation for claimer (completer)
     update_reputation(db, agent.id, "task_completed", 10, f"Completed task: {task.title}")
@@ -181,7 +384,9 @@ def complete_task(
     db.commit()
     db.refresh(task)
 
-    return task
+    invalidation_bus.publish("task", task.id, event="closed")
+
+    return idem.save(TaskResponse.model_validate(task))
 
 
 @router.delete("/{task_id}")
@@ -205,8 +410,10 @@ def cancel_task(
 
     task.status = "cancelled"
     task.updated_at = datetime.utcnow()
-    agent.last_active = datetime.utcnow()
+    forget_cacheable(db, task.id)
 
     db.commit()
 
+    invalidation_bus.publish("task", task.id, event="closed")
+
     return {"message": "Task cancelled successfully"}
@@ -1,8 +1,12 @@
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from .config import settings
 from .database import get_db
 from .models import Agent
+from .utils.last_active import touch_agent
+from .utils.metrics import API_KEY_VERIFY
+from .utils.rate_limit import verified_keys
 import secrets
 import bcrypt
 
@@ -27,7 +31,8 @@ def verify_api_key_hash(plain_key: str, hashed_key: str) -> bool:
     """Verify an API key against its hash"""
     plain_key_bytes = plain_key.encode('utf-8')[:72]
     hashed_bytes = hashed_key.encode('utf-8')
-    return bcrypt.checkpw(plain_key_bytes, hashed_bytes)
+    with API_KEY_VERIFY.time():
+        return bcrypt.checkpw(plain_key_bytes, hashed_bytes)
 
 
 def get_current_agent(
@@ -45,9 +50,31 @@ def get_current_agent(
 
     for agent in agents:
         if verify_api_key_hash(api_key, agent.api_key_hash):
+            # Buffered; written to the agents table by the periodic flush
+            touch_agent(agent.id)
+            # From now on the rate limiter gives this key its own bucket
+            verified_keys.add(api_key)
             return agent
 
     raise HTTPException(
         status_code=401,
         detail="Invalid API key"
     )
+
+
+def require_admin(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """
+    Dependency for operator endpoints (export/import): the bearer token must
+    be ADMIN_API_KEY. Agent API keys are never admin keys.
+    """
+    if not settings.admin_api_key:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled (set ADMIN_API_KEY)"
+        )
+    if not secrets.compare_digest(credentials.credentials.encode("utf-8"),
+                                  settings.admin_api_key.encode("utf-8")):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin key"
+        )
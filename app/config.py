@@ -5,8 +5,37 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:////data/50c14l.db"  # Persistent disk in production, override for local dev
     redis_url: str = "redis://localhost:6379"
     secret_key: str = "dev-secret-key-change-in-production"
+    admin_api_key: str = ""  # Bearer token for /export and /import (empty = admin endpoints disabled)
     environment: str = "development"
     allowed_origins: str = "*"
+    last_active_flush_seconds: float = 5.0  # How often buffered last_active times are written
+    blob_dir: str = "/data/blobs"  # Out-of-row payload/result storage (persistent disk in production)
+    blob_inline_threshold: int = 64 * 1024  # JSON documents larger than this (bytes) go to the blob store
+    blob_compress: bool = True
+    result_cache_ttl_seconds: int = 24 * 3600  # How long a completed result can answer identical tasks
+    result_cache_max_bytes: int = 50 * 1024 * 1024  # Least recently used results are evicted beyond this
+    idempotency_ttl_seconds: int = 24 * 3600  # How long a response is replayed for a repeated Idempotency-Key
+    idempotency_lock_seconds: int = 60  # A reservation without a response is abandoned after this
+    query_profiler: bool = False  # Profile SQL per request (Server-Timing header, N+1 detection, JSON traces)
+    query_profiler_sample_rate: float = 0.01  # Share of requests traced; requests with N+1 patterns always are
+    query_profiler_n_plus_one: int = 5  # Flag a statement repeated this many times in one request
+    query_profiler_log: str = ""  # JSON-lines trace file (default: stdout)
+    reputation_log_retention_days: int = 90  # Raw reputation logs older than this are archived
+    interaction_retention_days: int = 30  # Interactions older than this move to compressed archive segments
+    interaction_archive_dir: str = "/data/interactions"  # Archive segment files (persistent disk in production)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "auto"  # memory | redis | auto (redis when reachable)
+    rate_limits: str = "read=20/60,write=5/20,message=5/20,register=0.2/5"  # class=tokens per second/burst
+    trusted_proxies: str = "127.0.0.1,::1"  # Proxies whose X-Forwarded-For names the client (addresses, networks or *)
+    rate_limit_ip_factor: float = 4.0  # Authenticated agents also share a bucket per address this many times larger
+    shed_max_in_flight: int = 200  # 503 for all API requests beyond this many concurrent ones (0 = off)
+    shed_latency_ms: float = 2000  # 503 for reads while average latency exceeds this (0 = off)
+    deploy_id: str = ""  # E.g. the git SHA: list ETags from an older deploy stop matching
+    static_max_age_seconds: int = 300  # Browser/CDN freshness for the HTML and markdown pages
+    static_stale_seconds: int = 86400  # Then served stale while revalidating (a cheap 304)
+    warmup_wait_seconds: float = 30  # API requests arriving during the cache pre-warm wait this long, then 503
+    import_batch_size: int = 5000  # Rows per INSERT batch in bulk imports
+    import_commit_rows: int = 200000  # Rows per transaction in bulk imports
 
     class Config:
         env_file = ".env"
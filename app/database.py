@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+import os
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
 
 # Create SQLite engine
@@ -25,6 +28,64 @@ def get_db():
         db.close()
 
 
+def dialect_insert(db):
+    """
+    The dialect-specific insert() of a session or connection, which
+    supports INSERT ... ON CONFLICT upserts (SQLite and PostgreSQL).
+    """
+    dialect = db.get_bind().dialect if isinstance(db, Session) else db.dialect
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSIONS_DIR = os.path.join(PROJECT_ROOT, "migrations", "versions")
+
+
+def latest_revision() -> str:
+    """
+    Newest migration revision, read from the file names alone.
+    Revision ids are sequential ("0001", "0002", ...) and prefix their files.
+    """
+    return max(name.split("_", 1)[0] for name in os.listdir(VERSIONS_DIR) if name.endswith(".py"))
+
+
+def schema_revision() -> Optional[str]:
+    """
+    Revision the database is at (its alembic_version marker), or None.
+    """
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:  # No marker table yet: new database, or created by create_all
+        return None
+
+
 # Function to initialize database
-def init_db():
-    Base.metadata.create_all(bind=engine)
+def init_db() -> bool:
+    """
+    Bring the schema up to date by running the Alembic migrations (alembic upgrade head).
+    Databases created by the old create_all are adopted by the baseline revision.
+
+    When the database's version marker already names the newest revision,
+    this is one SELECT: Alembic isn't even imported.
+
+    Returns:
+        bool: True if migrations ran, False if the schema was already current
+    """
+    if schema_revision() == latest_revision():
+        return False
+
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    cfg.attributes["configure_logging"] = False  # keep the app's logging setup
+    with engine.begin() as connection:
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, "head")
+    return True
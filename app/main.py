@@ -1,15 +1,38 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+import time
+_import_started = time.perf_counter()  # Before everything else, so the startup report covers imports
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from .config import settings
-from .database import engine, init_db, get_db
+from .database import Base, engine, init_db, get_db, SessionLocal
 from .models import Agent
-from .api import agents, tasks, interactions, activity
+from .api import agents, tasks, interactions, activity, leaderboard, capabilities, stats, admin
+from .models import ReputationLog, ReputationDailyRollup, StatCounter
+from .utils.leaderboard import rebuild_leaderboard
+from .utils.reputation_history import rebuild_rollups
+from .utils.capability_index import capability_index
+from .utils.capability_catalog import capability_catalog
+from .utils.task_matcher import task_matcher
+from .utils.task_search import init_search
+from .utils.profile_cache import profile_cache, cached_page_response
+from .utils.static_assets import static_assets
+from .utils.stats import rebuild_stats
+from .utils.fast_json import FastJSONResponse
+from .utils.last_active import start_last_active_flusher, stop_last_active_flusher
+from .utils.rate_limit import AdmissionMiddleware
+from .utils.metrics import MetricsMiddleware, metrics_response
+from .utils.notifications import ping_redis, invalidation_bus
+from .utils.table_versions import bump_version
+from .utils.startup import startup, require_warm
+from sqlalchemy import text
+from typing import Optional
 import os
 
+startup.imported(_import_started)
+
 # Create FastAPI app
 app = FastAPI(
     title="50C14L - Autonomous Agent Marketplace",
@@ -17,7 +40,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -30,107 +54,249 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-agent rate limits and overload shedding (added last, so it runs first)
+app.add_middleware(AdmissionMiddleware)
+
+# Per-request SQL profiling (debugging aid, off by default)
+if settings.query_profiler:
+    from .utils.query_profiler import QueryProfilerMiddleware
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Latency, in-flight and DB usage per route (outermost, so 429/503 are counted too)
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Setup Jinja2 templates
-templates = Jinja2Templates(directory="static")
+# Jinja2 templates, loaded on the first landing page render
+_templates = None
+
+
+def get_templates():
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory="static")
+    return _templates
 
 # Include routers
-app.include_router(agents.router, prefix="/api/v1", tags=["agents"])
-app.include_router(tasks.router, prefix="/api/v1", tags=["tasks"])
-app.include_router(interactions.router, prefix="/api/v1", tags=["interactions"])
-app.include_router(activity.router, prefix="/api/v1", tags=["activity"])
+# Routes that read or update the in-process caches wait for the startup pre-warm
+warm = [Depends(require_warm)]
+app.include_router(agents.router, prefix="/api/v1", tags=["agents"], dependencies=warm)
+app.include_router(tasks.router, prefix="/api/v1", tags=["tasks"], dependencies=warm)
+app.include_router(interactions.router, prefix="/api/v1", tags=["interactions"], dependencies=warm)
+app.include_router(activity.router, prefix="/api/v1", tags=["activity"], dependencies=warm)
+app.include_router(leaderboard.router, prefix="/api/v1", tags=["leaderboard"], dependencies=warm)
+app.include_router(capabilities.router, prefix="/api/v1", tags=["capabilities"], dependencies=warm)
+app.include_router(stats.router, prefix="/api/v1", tags=["stats"])  # Monitoring stays reachable; see stats.py
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])  # Export/import rebuild the caches themselves
+
+
+def resync_caches():
+    """
+    Rebuild the in-process caches from the database, for when this worker
+    may have missed invalidations from the others.
+    """
+    db = SessionLocal()
+    try:
+        capability_index.rebuild(db)
+        capability_catalog.rebuild(db)
+        task_matcher.rebuild(db)
+    finally:
+        db.close()
+    profile_cache.clear()
+    bump_version(*Base.metadata.tables, shared=True)
+
+
+invalidation_bus.on_resync(resync_caches)
+
+
+def warm_up():
+    """
+    Build the in-process caches and derived data. Runs on a background
+    thread after the server is up; API routes wait for it (require_warm).
+    """
+    # Subscribe before the caches are rebuilt, so no other worker's write falls in between
+    with startup.phase("invalidation bus", background=True) as phase:
+        phase.detail = "listening on Redis" if invalidation_bus.start() else "in-process only (no Redis)"
+
+    with startup.phase("task search", background=True) as phase:
+        phase.detail = init_search(engine)
+
+    db = SessionLocal()
+    try:
+        # Backfill rollups for reputation logs written before rollups existed
+        if db.query(ReputationDailyRollup.id).first() is None and db.query(ReputationLog.id).first() is not None:
+            with startup.phase("reputation rollups", background=True) as phase:
+                phase.detail = f"backfilled {rebuild_rollups(db)} rows"
+
+        # Seed counters from the existing data once; afterwards they are maintained per write
+        if db.query(StatCounter.name).first() is None:
+            with startup.phase("stat counters", background=True) as phase:
+                phase.detail = f"initialized {rebuild_stats(db)} counters"
+
+        with startup.phase("leaderboard", background=True) as phase:
+            phase.detail = f"{rebuild_leaderboard(db)} agents"
+
+        with startup.phase("capability index", background=True) as phase:
+            phase.detail = f"{capability_index.rebuild(db)} agents"
+
+        with startup.phase("capability catalog", background=True) as phase:
+            phase.detail = f"{capability_catalog.rebuild(db)} capabilities"
+
+        with startup.phase("task matcher", background=True) as phase:
+            phase.detail = f"{task_matcher.rebuild(db)} open tasks"
+    finally:
+        db.close()
+
+    with startup.phase("static pages", background=True) as phase:
+        phase.detail = f"{static_assets.preload()} files"
 
 
 # Initialize database on startup
 @app.on_event("startup")
 def startup_event():
-    init_db()
-    print("✅ Database initialized")
     print(f"✅ Environment: {settings.environment}")
     print(f"✅ Database: {settings.database_url}")
 
+    with startup.phase("schema") as phase:
+        phase.detail = "migrated" if init_db() else "up to date (version marker)"
+
+    start_last_active_flusher(settings.last_active_flush_seconds)
+
+    # The server starts accepting connections now; static pages and /health are served right away
+    startup.warm_up_in_background(warm_up)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Write any buffered last_active times before exiting
+    stop_last_active_flusher()
+    invalidation_bus.stop()
+
 
 # Root endpoint - homepage with full agent instructions
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """
     Homepage for 50C14L - includes full instructions for AI agents
     """
-    return FileResponse("static/for-agents.html")
+    return static_assets.response(request, "static/for-agents.html")
 
 
 # For agents landing page
 @app.get("/for-agents", response_class=HTMLResponse)
-async def for_agents():
+async def for_agents(request: Request):
     """
     Landing page for AI agents with getting started instructions
     """
-    return FileResponse("static/for-agents.html")
+    return static_assets.response(request, "static/for-agents.html")
 
 
 # Admin dashboard
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard():
+async def admin_dashboard(request: Request):
     """
     Admin dashboard to visualize agent activity
     """
-    return FileResponse("static/admin.html")
+    return static_assets.response(request, "static/admin.html")
 
 
 # Activity log
 @app.get("/log", response_class=HTMLResponse)
-async def activity_log():
+async def activity_log(request: Request):
     """
     Real-time activity log (private, no link on landing page)
     """
-    return FileResponse("static/log.html")
+    return static_assets.response(request, "static/log.html")
 
 
 # Activity log v2 (clean terminal style)
 @app.get("/log2", response_class=HTMLResponse)
-async def activity_log_v2():
+async def activity_log_v2(request: Request):
     """
     Real-time activity log - clean terminal style with all details visible
     """
-    return FileResponse("static/log2.html")
+    return static_assets.response(request, "static/log2.html")
 
 
 # Activity log v3 (minimal command-line agentic style)
 @app.get("/log3", response_class=HTMLResponse)
-async def activity_log_v3():
+async def activity_log_v3(request: Request):
     """
     Real-time activity log - minimalist command-line agentic product style
     """
-    return FileResponse("static/log3.html")
+    return static_assets.response(request, "static/log3.html")
 
 
 # Activity log v4 (pure ASCII terminal style)
 @app.get("/log4", response_class=HTMLResponse)
-async def activity_log_v4():
+async def activity_log_v4(request: Request):
     """
     Real-time activity log - pure old-school terminal with ASCII and colors only
     """
-    return FileResponse("static/log4.html")
+    return static_assets.response(request, "static/log4.html")
 
 
 # 3D Network Visualization
 @app.get("/view", response_class=HTMLResponse)
-async def network_view():
+async def network_view(request: Request):
     """
     3D interactive network visualization of agents and interactions
     """
-    return FileResponse("static/view.html")
+    return static_assets.response(request, "static/view.html")
 
 
 # Agent instructions markdown
-@app.get("/for-agents/instructions.md", response_class=FileResponse)
-async def agent_instructions():
+@app.get("/for-agents/instructions.md")
+async def agent_instructions(request: Request):
     """
     Complete agent instructions in markdown format
     """
-    return FileResponse("docs/agent-instructions.md", media_type="text/markdown")
+    return static_assets.response(request, "docs/agent-instructions.md")
+
+
+def _landing_page(request: Request, agent_id: Optional[str] = None, agent_name: Optional[str] = None):
+    """
+    Serve an agent landing page from the profile cache, rendering it on a miss.
+    """
+    base_url = str(request.base_url).rstrip('/')
+    if agent_id is None:
+        agent_id = profile_cache.agent_id_for_name(agent_name)
+
+    page = profile_cache.get("landing", agent_id, base_url) if agent_id else None
+    if page is None:
+        version = profile_cache.version(agent_id) if agent_id else None
+        db = SessionLocal()
+        try:
+            if agent_id:
+                agent = db.query(Agent).filter(Agent.id == agent_id).first()
+            else:
+                agent = db.query(Agent).filter(Agent.name == agent_name).first()
+            if not agent:
+                return HTMLResponse(content="<h1>Agent not found</h1>", status_code=404)
+            if version is None:
+                version = profile_cache.version(agent.id)
+            profile_cache.remember_name(agent.name, agent.id)
+
+            html = get_templates().get_template("agent-landing.html").render({
+                "request": request,
+                "agent": agent,
+                "base_url": base_url
+            })
+            page = profile_cache.put(
+                "landing",
+                agent.id,
+                html.encode("utf-8"),
+                "text/html; charset=utf-8",
+                agent.updated_at or agent.created_at,
+                variant=base_url,
+                version=version
+            )
+        finally:
+            db.close()
+
+    return cached_page_response(request, page)
 
 
 # Agent landing page
@@ -139,26 +305,7 @@ async def agent_landing_page(agent_id: str, request: Request):
     """
     Auto-generated landing page for a specific agent
     """
-    # Get agent from database
-    from .database import SessionLocal
-    db = SessionLocal()
-    try:
-        agent = db.query(Agent).filter(Agent.id == agent_id).first()
-        if not agent:
-            return HTMLResponse(content="<h1>Agent not found</h1>", status_code=404)
-
-        # Render template
-        base_url = str(request.base_url).rstrip('/')
-        return templates.TemplateResponse(
-            "agent-landing.html",
-            {
-                "request": request,
-                "agent": agent,
-                "base_url": base_url
-            }
-        )
-    finally:
-        db.close()
+    return _landing_page(request, agent_id=agent_id)
 
 
 # Agent landing page by name
@@ -167,24 +314,7 @@ async def agent_landing_page_by_name(agent_name: str, request: Request):
     """
     Agent landing page by name (alternative URL)
     """
-    from .database import SessionLocal
-    db = SessionLocal()
-    try:
-        agent = db.query(Agent).filter(Agent.name == agent_name).first()
-        if not agent:
-            return HTMLResponse(content="<h1>Agent not found</h1>", status_code=404)
-
-        base_url = str(request.base_url).rstrip('/')
-        return templates.TemplateResponse(
-            "agent-landing.html",
-            {
-                "request": request,
-                "agent": agent,
-                "base_url": base_url
-            }
-        )
-    finally:
-        db.close()
+    return _landing_page(request, agent_name=agent_name)
 
 
 # Well-known agent protocol endpoint
@@ -215,15 +345,50 @@ async def agent_protocol(request: Request):
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+def health_check():
+    """
+    Readiness probe: checks the database and Redis.
+    Returns 503 if the database is unreachable, or while the caches are still
+    warming up after a start ("starting"); without Redis the service still
+    works on its in-process fallbacks, so it reports "degraded".
+    """
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception as e:
+        print(f"Health check: database unreachable: {e}")
+        database = "unreachable"
+
+    redis_status = "connected" if ping_redis() else "unreachable"
+
+    if database != "connected":
+        status = "unhealthy"
+    elif not startup.warm.is_set():
+        status = "starting"
+    elif redis_status != "connected":
+        status = "degraded"
+    else:
+        status = "healthy"
+
+    return JSONResponse(
+        status_code=503 if status in ("unhealthy", "starting") else 200,
+        content={
+            "status": status,
+            "environment": settings.environment,
+            "database": database,
+            "redis": redis_status,
+            "caches": "warm" if startup.warm.is_set() else "warming"
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
     """
-    Health check endpoint for monitoring
+    Prometheus metrics (per worker process)
     """
-    return {
-        "status": "healthy",
-        "environment": settings.environment,
-        "database": "connected"
-    }
+    return metrics_response()
 
 
 if __name__ == "__main__":
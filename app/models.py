@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Column, String, Integer, Boolean, Text, DateTime, Date, ForeignKey, JSON, LargeBinary, UniqueConstraint, Index
+)
 from sqlalchemy.sql import func
 from datetime import datetime
 import uuid
@@ -11,6 +13,7 @@ def generate_uuid():
 
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (Index("ix_agents_active_reputation", "is_active", "reputation_score"),)
 
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String(100), unique=True, nullable=False, index=True)
@@ -23,7 +26,7 @@ class Agent(Base):
     total_tasks_completed = Column(Integer, default=0)
     total_tasks_posted = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
-    last_active = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_active = Column(DateTime, default=datetime.utcnow)  # Written in bulk by utils/last_active.py
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -39,7 +42,7 @@ class Task(Base):
     required_capabilities = Column(JSON, default=list)  # Store as JSON list
     payload = Column(JSON, default=dict)  # Store as JSON dict
     result = Column(JSON, nullable=True)  # Store as JSON dict
-    status = Column(String(20), default="open", index=True)  # open, in_progress, completed, cancelled
+    status = Column(String(20), default="open")  # open, in_progress, completed, cancelled
     priority = Column(Integer, default=0)
     expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -47,6 +50,11 @@ class Task(Base):
     completed_at = Column(DateTime, nullable=True)
 
 
+# Composite indexes; migrations/versions/0002_performance_indexes.py has the query each one serves
+Index("ix_tasks_status_priority_created", Task.status, Task.priority.desc(), Task.created_at.desc())
+Index("ix_tasks_claimer_status", Task.claimer_id, Task.status)
+
+
 class Interaction(Base):
     __tablename__ = "interactions"
 
@@ -59,12 +67,98 @@ class Interaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
+class InteractionArchiveBlock(Base):
+    __tablename__ = "interaction_archive_blocks"
+
+    # Sparse index of the archived interactions (utils/interaction_archive.py):
+    # one row per compressed block of a segment file
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    segment = Column(String(255), nullable=False)  # Path relative to INTERACTION_ARCHIVE_DIR
+    byte_offset = Column(Integer, nullable=False)  # Where the block's gzip member starts
+    byte_length = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    min_created_at = Column(DateTime, nullable=False)
+    max_created_at = Column(DateTime, nullable=False, index=True)
+    agent_filter = Column(LargeBinary, nullable=False)  # Bloom filter of sender and recipient ids
+    status_counts = Column(JSON, default=dict)  # {"sent": n, ...}, so stats survive archiving
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
 class ReputationLog(Base):
     __tablename__ = "reputation_logs"
+    __table_args__ = (
+        Index("ix_reputation_logs_agent_created", "agent_id", "created_at"),
+        Index("ix_reputation_logs_created_at", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
+    agent_id = Column(String, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
+    action = Column(String(50))
+    value_change = Column(Integer)
+    reason = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ReputationDailyRollup(Base):
+    __tablename__ = "reputation_daily_rollups"
+    __table_args__ = (UniqueConstraint("agent_id", "day", "action", name="uq_reputation_rollup"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
     agent_id = Column(String, ForeignKey("agents.id", ondelete="CASCADE"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    action = Column(String(50), nullable=False)
+    total_change = Column(Integer, default=0, nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)
+
+
+class ReputationLogArchive(Base):
+    __tablename__ = "reputation_logs_archive"
+
+    id = Column(String, primary_key=True)
+    agent_id = Column(String, nullable=False, index=True)
     action = Column(String(50))
     value_change = Column(Integer)
     reason = Column(Text)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    name = Column(String(150), primary_key=True)  # e.g. "tasks.status.open", "open_tasks.cap.python"
+    value = Column(Integer, default=0, nullable=False)
+
+
+class TaskResultCache(Base):
+    __tablename__ = "task_result_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 of capabilities + payload
+    source_task_id = Column(String, nullable=False)
+    claimer_id = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    result_size = Column(Integer, default=0, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class CacheableTask(Base):
+    __tablename__ = "cacheable_tasks"
+
+    # Open/in-progress tasks posted with cacheable=true, awaiting a result to cache
+    task_id = Column(String, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    cache_key = Column(String(64), nullable=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # sha256 of agent, method, path and the client's key
+    agent_id = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is still running
+    response = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
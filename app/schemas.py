@@ -1,6 +1,18 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, Optional, List, Dict, Any, Literal
+from datetime import datetime, date
+from .utils.blob_store import BLOB_KEY
+
+
+def _reject_blob_key(value: Dict[str, Any]) -> Dict[str, Any]:
+    # Stored documents with this key are references into the blob store
+    if BLOB_KEY in value:
+        raise ValueError(f"'{BLOB_KEY}' is a reserved key")
+    return value
+
+
+# A JSON object supplied by an agent (task payloads and results, message payloads)
+ClientDocument = Annotated[Dict[str, Any], AfterValidator(_reject_blob_key)]
 
 
 # Agent Schemas
@@ -63,13 +75,14 @@ class TaskCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
     required_capabilities: List[str] = Field(default_factory=list)
-    payload: Dict[str, Any] = Field(default_factory=dict)
+    payload: ClientDocument = Field(default_factory=dict)
     priority: int = Field(default=0)
     expires_at: Optional[datetime] = None
+    cacheable: bool = False  # Deterministic work: reuse the result of an identical completed task
 
 
 class TaskComplete(BaseModel):
-    result: Dict[str, Any] = Field(default_factory=dict)
+    result: ClientDocument = Field(default_factory=dict)
     notes: Optional[str] = None
 
 
@@ -93,11 +106,21 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class TaskRecommendation(TaskResponse):
+    match_score: float
+    matched_capabilities: List[str]
+
+
+class TaskSearchResult(TaskResponse):
+    rank: float
+    snippet: str
+
+
 # Interaction Schemas
 class InteractionMessage(BaseModel):
     recipient_id: str
     message_type: str = Field(..., max_length=50)
-    payload: Dict[str, Any] = Field(default_factory=dict)
+    payload: ClientDocument = Field(default_factory=dict)
 
 
 class InteractionResponse(BaseModel):
@@ -113,9 +136,54 @@ class InteractionResponse(BaseModel):
         from_attributes = True
 
 
+# Leaderboard Schemas
+class LeaderboardEntry(BaseModel):
+    rank: int
+    agent_id: str
+    name: str
+    reputation_score: int
+    total_tasks_completed: int
+
+
+class AgentRank(BaseModel):
+    agent_id: str
+    rank: int
+    reputation_score: int
+    total_ranked: int
+    capability: Optional[str] = None
+
+
+# Reputation History Schemas
+class ReputationDay(BaseModel):
+    day: date
+    total_change: int
+    event_count: int
+    by_action: Dict[str, int]
+
+
+class ReputationHistory(BaseModel):
+    agent_id: str
+    days: int
+    change_7d: int
+    change_30d: int
+    trend_7d: int
+    daily: List[ReputationDay]
+
+
+# Capability Catalog Schemas
+class CapabilityEntry(BaseModel):
+    capability: str
+    agent_count: int
+    task_count: int
+    usage_count: int
+    similarity: Optional[float] = None
+
+
 # Search Schemas
 class AgentSearchRequest(BaseModel):
     capabilities: List[str] = Field(default_factory=list)
+    match: Literal["any", "all"] = "any"  # any: at least one capability, all: every capability
+    fuzzy: bool = False  # Also match similar capability names (e.g. "python3" for "python")
     tags: List[str] = Field(default_factory=list)
     limit: int = Field(default=25, le=100)
 
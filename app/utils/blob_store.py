@@ -0,0 +1,279 @@
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import Text, cast
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from ..config import settings
+from .fast_json import FastJSONResponse, raw_json
+from .static_assets import negotiate
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+BLOB_KEY = "$blob"
+MEDIA_TYPE = "application/json"
+CHUNK_SIZE = 64 * 1024
+MIN_COMPRESSION_GAIN = 0.1  # Keep the gzip copy only if it saves at least 10%
+SWEEP_GRACE_SECONDS = 3600  # Younger blobs may belong to a write that hasn't committed yet
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_DIGEST = re.compile(r"sha256:[0-9a-f]{64}")
+_DIGEST_IN_TEXT = re.compile(r"sha256:([0-9a-f]{64})")
+
+
+def canonical_json(value: Any) -> bytes:
+    # Sorted keys, so equal documents hash to the same digest
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _path(digest: str, compressed: bool) -> str:
+    # Two levels of sharding keep directories small: ab/cd/abcd...
+    name = digest + (".gz" if compressed else "")
+    return os.path.join(settings.blob_dir, digest[:2], digest[2:4], name)
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def put_blob(data: bytes) -> Tuple[str, bool]:
+    """
+    Store bytes under their SHA-256 digest (a no-op if already stored).
+
+    Returns:
+        (digest, compressed)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    for compressed in (True, False):
+        if os.path.exists(_path(digest, compressed)):
+            return digest, compressed
+
+    if settings.blob_compress:
+        packed = gzip.compress(data, compresslevel=6, mtime=0)
+        if len(packed) <= len(data) * (1 - MIN_COMPRESSION_GAIN):
+            _write_atomic(_path(digest, True), packed)
+            return digest, True
+
+    _write_atomic(_path(digest, False), data)
+    return digest, False
+
+
+def is_blob_ref(value: Any) -> bool:
+    """
+    Whether a stored document is a reference written by offload_json (agents
+    can't submit the reserved key, see schemas.ClientDocument).
+    """
+    if not isinstance(value, dict) or len(value) != 1:
+        return False
+    ref = value.get(BLOB_KEY)
+    return isinstance(ref, dict) and isinstance(ref.get("digest"), str) \
+        and _DIGEST.fullmatch(ref["digest"]) is not None
+
+
+def offload_json(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Move a JSON document out of row if it is larger than BLOB_INLINE_THRESHOLD.
+
+    Returns:
+        The document itself if small, otherwise a reference:
+        {"$blob": {"digest": "sha256:...", "size": <bytes>, "media_type": "application/json"}}
+    """
+    if value is None or is_blob_ref(value):
+        return value
+
+    data = canonical_json(value)
+    if len(data) <= settings.blob_inline_threshold:
+        return value
+
+    digest, _ = put_blob(data)
+    return {BLOB_KEY: {"digest": f"sha256:{digest}", "size": len(data), "media_type": MEDIA_TYPE}}
+
+
+def _locate(ref: Dict[str, Any]) -> Tuple[str, bool]:
+    digest = ref[BLOB_KEY]["digest"].split(":", 1)[-1]
+    for compressed in (True, False):
+        path = _path(digest, compressed)
+        if os.path.exists(path):
+            return path, compressed
+    raise FileNotFoundError(digest)
+
+
+def load_json(value: Any) -> Any:
+    """
+    Resolve a blob reference back to the stored document (other values pass through).
+    """
+    if not is_blob_ref(value):
+        return value
+    path, compressed = _locate(value)
+    opener = gzip.open if compressed else open
+    with opener(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _document_size(path: str, compressed: bool) -> int:
+    # The gzip trailer ends with the uncompressed size (mod 2**32; blobs are far smaller)
+    if not compressed:
+        return os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), "little")
+
+
+def _stream_gzip_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    # Decompress sequentially, dropping bytes before `start`
+    position = 0
+    with gzip.open(path, "rb") as f:
+        while position <= end:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                yield chunk[max(start - position, 0):end + 1 - position]
+            position = chunk_end
+
+
+def json_document_response(request: Request, value: Any) -> Response:
+    """
+    Respond with a JSON document: inline values directly, blob references
+    streamed from disk. Uncompressed blobs support Range requests natively;
+    gzip blobs are sent as-is to clients accepting gzip, otherwise
+    decompressed on the fly (with single-range support).
+    """
+    if not is_blob_ref(value):
+        return FastJSONResponse(value)
+
+    try:
+        path, compressed = _locate(value)
+    except FileNotFoundError:
+        return FastJSONResponse({"detail": "Blob not found"}, status_code=404)
+
+    digest = value[BLOB_KEY]["digest"]
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    range_header = request.headers.get("range")
+    # gzip blobs go out as stored to clients accepting gzip (except for
+    # Range requests): a different byte stream, so a different strong ETag
+    encoded = compressed and not range_header \
+        and negotiate(request.headers.get("accept-encoding"), ("gzip",)) == "gzip"
+    headers["ETag"] = f'"{digest}-gz"' if encoded else f'"{digest}"'
+    if compressed:
+        headers["Vary"] = "Accept-Encoding"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and any(tag.strip() == headers["ETag"] for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    if not compressed:
+        return FileResponse(path, media_type=MEDIA_TYPE, headers=headers)
+
+    if encoded:
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(path, media_type=MEDIA_TYPE, headers=headers)
+
+    size = _document_size(path, compressed)
+    headers["Accept-Ranges"] = "bytes"
+    match = _RANGE.match(range_header or "")
+    if range_header and match and (match.group(1) or match.group(2)):
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start > end or start >= size:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_stream_gzip_range(path, start, end), status_code=206,
+                                 media_type=MEDIA_TYPE, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_stream_gzip_range(path, 0, size - 1), media_type=MEDIA_TYPE, headers=headers)
+
+
+def _digests_in(value: Any) -> Set[str]:
+    # Any digest mentioned counts as a reference (stored JSON text or decoded values)
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return set(_DIGEST_IN_TEXT.findall(text))
+
+
+def referenced_digests(db: Session) -> Set[str]:
+    """
+    Digests referenced anywhere: task payloads and results, interaction
+    payloads (archived ones included), cached results and stored
+    idempotent responses.
+    """
+    from ..models import Task, Interaction, TaskResultCache, IdempotencyKey
+    from .interaction_archive import iter_archived
+
+    digests: Set[str] = set()
+    for column in (Task.payload, Task.result, Interaction.payload, TaskResultCache.result):
+        rows = db.query(raw_json(column)).filter(cast(column, Text).like(f"%{BLOB_KEY}%")).yield_per(1000)
+        for (value,) in rows:
+            digests |= _digests_in(value)
+    for (response,) in db.query(IdempotencyKey.response).filter(
+            IdempotencyKey.response.like(f"%{BLOB_KEY}%")).yield_per(1000):
+        digests |= _digests_in(response)
+    for rows in iter_archived():
+        for row in rows:
+            if is_blob_ref(row.get("payload")):
+                digests |= _digests_in(row["payload"])
+    return digests
+
+
+def sweep_blobs(db: Session, grace_seconds: float = SWEEP_GRACE_SECONDS) -> int:
+    """
+    Delete blobs no row references any more (deleted or replaced payloads
+    and results). Blobs younger than `grace_seconds` are kept: offload_json
+    writes the file before the row that references it is committed.
+
+    Returns:
+        int: Number of blob files deleted
+    """
+    referenced = referenced_digests(db)
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    for directory, _, files in os.walk(settings.blob_dir):
+        for name in files:
+            digest = name[:-3] if name.endswith(".gz") else name
+            if not re.fullmatch(r"[0-9a-f]{64}", digest) or digest in referenced:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
+
+
+if __name__ == "__main__":
+    # Run as a maintenance job: python -m app.utils.blob_store
+    from ..database import SessionLocal, init_db
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"✅ Deleted {sweep_blobs(db)} unreferenced blobs")
+    finally:
+        db.close()
@@ -0,0 +1,353 @@
+from sqlalchemy import Column, Date, DateTime, JSON, MetaData, Table, Text, insert, select
+from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+import gzip
+import io
+import json
+import zlib
+from ..config import settings
+from ..database import SessionLocal, latest_revision, schema_revision
+from ..models import Agent, Task, Interaction, ReputationLog, ReputationLogArchive
+from .blob_store import load_json, offload_json
+from .fast_json import STREAM_BATCH_SIZE, dumps, raw_json, row_mapper
+from .interaction_archive import iter_archived
+from .leaderboard import rebuild_leaderboard
+from .notifications import invalidation_bus, RESYNC
+from .reputation_history import rebuild_rollups
+from .stats import rebuild_stats
+from .task_search import init_search, pause_search_index, rebuild_search_index
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+EXPORT_FORMAT = "50c14l-export"
+EXPORT_VERSION = 1
+EXPORT_MEDIA_TYPE = "application/gzip"
+EXPORT_PAGE_SIZE = 5000  # Rows read per short read transaction
+EXPORT_COMPRESSION_LEVEL = 6
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Exported tables, parents first so an import never inserts a row before
+# the agent it references. Archived reputation logs are included because
+# rollups and leaderboards are rebuilt from both log tables.
+EXPORT_MODELS = [Agent, Task, Interaction, ReputationLog, ReputationLogArchive]
+
+# JSON columns that may hold a blob store reference; exports inline the
+# document so they are self-contained, imports offload it again
+BLOB_COLUMNS = {"tasks": ("payload", "result"), "interactions": ("payload",)}
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class _TableSpec(NamedTuple):
+    table: Table
+    to_dict: Callable[[Any], Dict[str, Any]]
+    target: Table  # Same table with JSON columns as Text: imports write serialized JSON
+    columns: frozenset
+    defaults: Dict[str, Callable[[], Any]]  # For columns an older export doesn't have
+    parsers: Dict[str, Callable[[Any], Any]]  # Applied to non-null values
+    encoders: Dict[str, Callable[[Any], Any]]  # JSON columns, applied to every value
+
+
+def _json_text(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def _blob_json_text(value: Any) -> str:
+    text = dumps(value)
+    if len(text) > settings.blob_inline_threshold:
+        text = dumps(offload_json(value))
+    return text.decode("utf-8")
+
+
+def _spec(table: Table) -> _TableSpec:
+    json_columns = [c.key for c in table.columns if isinstance(c.type, JSON)]
+    blob_columns = BLOB_COLUMNS.get(table.name, ())
+    to_dict = row_mapper([c for c in json_columns if c not in blob_columns])
+
+    def export_row(row) -> Dict[str, Any]:
+        data = to_dict(row)
+        for column in blob_columns:
+            value = data.get(column)
+            if isinstance(value, (str, bytes)):
+                data[column] = load_json(_loads(value))
+        return data
+
+    # Serializing JSON ourselves (orjson when installed) instead of through the
+    # JSON type's json.dumps roughly halves the per-row cost of an import
+    target = Table(table.name, MetaData(), *[
+        Column(c.key, Text if c.key in json_columns else c.type, primary_key=c.primary_key)
+        for c in table.columns
+    ])
+    parsers: Dict[str, Callable[[Any], Any]] = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            parsers[column.key] = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            parsers[column.key] = date.fromisoformat
+    defaults: Dict[str, Callable[[], Any]] = {}
+    for column in table.columns:
+        default = column.default
+        if default is not None and default.is_callable:
+            defaults[column.key] = lambda arg=default.arg: arg(None)
+        elif default is not None and default.is_scalar:
+            defaults[column.key] = lambda arg=default.arg: arg
+    encoders = {c: _blob_json_text if c in blob_columns else _json_text for c in json_columns}
+    return _TableSpec(table, export_row, target, frozenset(target.c.keys()), defaults, parsers, encoders)
+
+
+_SPECS = {model.__table__.name: _spec(model.__table__) for model in EXPORT_MODELS}
+
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return dumps(record) + b"\n"
+
+
+def _export_pages(spec: _TableSpec, page_size: int) -> Iterator[List[bytes]]:
+    # Keyset pages, each read in its own short transaction: on SQLite an open
+    # read cursor blocks every writer's commit, so the lock must not be held
+    # while the client is slow to take the next chunk
+    table = spec.table
+    key = table.primary_key.columns.values()[0]
+    columns = [raw_json(c) if isinstance(c.type, JSON) else c for c in table.columns]
+    last = None
+    while True:
+        query = select(*columns).order_by(key).limit(page_size)
+        if last is not None:
+            query = query.where(key > last)
+        db = SessionLocal()
+        try:
+            rows = db.execute(query.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE))
+            lines = []
+            for row in rows:
+                last = row._mapping[key.key]
+                lines.append(_line({"table": table.name, "row": spec.to_dict(row)}))
+        finally:
+            db.close()
+        if lines:
+            yield lines
+        if len(lines) < page_size:
+            return
+
+
+def export_stream(page_size: int = EXPORT_PAGE_SIZE) -> Iterator[bytes]:
+    """
+    Stream the marketplace data as gzip-compressed NDJSON in constant memory.
+
+    The first line is a header (format, schema revision, export time), then
+    one {"table": ..., "row": {...}} line per row, table by table (archived
+    interactions included), and a
+    final {"end": true, "counts": {...}} line so an import can tell a
+    complete export from a truncated one.
+
+    Rows are read in primary key order, one page per transaction, so the
+    export never blocks writers. Rows written while it runs may or may not
+    be included; pause writes for an exact point-in-time copy.
+    """
+    compressor = zlib.compressobj(EXPORT_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    counts: Dict[str, int] = {}
+    yield compressor.compress(_line({
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "schema_revision": schema_revision(),
+        "exported_at": datetime.utcnow(),
+        "tables": list(_SPECS)
+    }))
+    for name, spec in _SPECS.items():
+        counts[name] = 0
+        for lines in _export_pages(spec, page_size):
+            counts[name] += len(lines)
+            chunk = compressor.compress(b"".join(lines))
+            if chunk:
+                yield chunk
+        if name == "interactions":
+            # Archived interactions are exported as ordinary rows; after an
+            # import the retention job moves them back into segments
+            for rows in iter_archived():
+                counts[name] += len(rows)
+                chunk = compressor.compress(b"".join(
+                    _line({"table": name, "row": dict(row, payload=load_json(row.get("payload")))}) for row in rows
+                ))
+                if chunk:
+                    yield chunk
+    yield compressor.compress(_line({"end": True, "counts": counts})) + compressor.flush()
+
+
+def open_export(fileobj: IO[bytes]) -> IO[bytes]:
+    """
+    Wrap a seekable export file for line reading, decompressing it if gzipped.
+    """
+    magic = fileobj.read(2)
+    fileobj.seek(0)
+    if magic == GZIP_MAGIC:
+        return io.BufferedReader(gzip.GzipFile(fileobj=fileobj), buffer_size=1024 * 1024)
+    return fileobj
+
+
+def _insert_statement(db: Session, table: Table, skip_existing: bool):
+    if not skip_existing:
+        return insert(table)
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    return insert(table).prefix_with("OR IGNORE")
+
+
+def import_stream(db: Session, lines: IO[bytes], skip_existing: bool = False,
+                  batch_size: Optional[int] = None, commit_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Load an export (as read by `open_export`) with batched multi-row inserts.
+
+    Rows are inserted through Core in batches of IMPORT_BATCH_SIZE and
+    committed every IMPORT_COMMIT_ROWS rows, bypassing the ORM and its
+    per-row events. Full-text indexing is paused for the load. Derived data
+    (counters, rollups, leaderboards, search index, in-process caches) is
+    rebuilt once at the end; see `rebuild_derived`.
+
+    Args:
+        db: Database session
+        lines: Export file opened with `open_export`
+        skip_existing: Skip rows whose id (or a unique column) already exists,
+            instead of failing; makes an import safe to re-run
+
+    Returns:
+        dict: Rows read and inserted per table, whether the export was complete,
+        and the row counts it declared
+
+    Raises:
+        ValueError: The file is not an export, or comes from a newer schema
+    """
+    batch_size = batch_size or settings.import_batch_size
+    commit_rows = commit_rows or settings.import_commit_rows
+    read: Counter = Counter()
+    inserted: Counter = Counter()
+    header = None
+    footer = None
+    batch: List[Dict[str, Any]] = []
+    spec = None
+    uncommitted = 0
+
+    def flush():
+        nonlocal uncommitted
+        if not batch:
+            return
+        result = db.execute(_insert_statement(db, spec.target, skip_existing), batch)
+        inserted[spec.table.name] += result.rowcount if result.rowcount >= 0 else len(batch)
+        uncommitted += len(batch)
+        batch.clear()
+        if uncommitted >= commit_rows:
+            db.commit()
+            uncommitted = 0
+
+    init_search(db.get_bind())
+    pause_search_index(db)
+    try:
+        for number, raw in enumerate(lines, 1):
+            if not raw.strip():
+                continue
+            record = _loads(raw)
+            if header is None:
+                if record.get("format") != EXPORT_FORMAT:
+                    raise ValueError("Not a 50c14l export (missing header line)")
+                revision = record.get("schema_revision")
+                if revision and revision > latest_revision():
+                    raise ValueError(f"Export is from a newer schema ({revision}); upgrade this service first")
+                header = record
+                continue
+            if record.get("end"):
+                footer = record
+                break
+
+            row_spec = _SPECS.get(record.get("table"))
+            if row_spec is None:
+                raise ValueError(f"Line {number}: unknown table {record.get('table')!r}")
+            if row_spec is not spec:
+                flush()
+                spec = row_spec
+
+            # Columns this schema doesn't have are dropped; missing ones get their defaults
+            row = record["row"]
+            if row.keys() != spec.columns:
+                row = {column: value for column, value in row.items() if column in spec.columns}
+                for column, default in spec.defaults.items():
+                    if column not in row:
+                        row[column] = default()
+            for column, parse in spec.parsers.items():
+                value = row.get(column)
+                if value is not None:
+                    row[column] = parse(value)
+            for column, encode in spec.encoders.items():
+                if column in row:
+                    row[column] = encode(row[column])
+            batch.append(row)
+            read[spec.table.name] += 1
+            if len(batch) >= batch_size:
+                flush()
+        if header is None:
+            raise ValueError("Empty export")
+        flush()
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        rebuilt = rebuild_derived(db)
+
+    return {
+        "read": dict(read),
+        "inserted": dict(inserted),
+        "complete": footer is not None,
+        "declared": (footer or {}).get("counts"),
+        "rebuilt": rebuilt
+    }
+
+
+def rebuild_derived(db: Session) -> Dict[str, int]:
+    """
+    Recompute everything derived from the imported tables: full-text index,
+    stat counters, reputation rollups and leaderboards. Then every worker
+    rebuilds its in-process caches (capability index and catalog, task
+    matcher, profiles, list ETags) via a "resync" on the invalidation bus.
+    """
+    rebuild_search_index(db)
+    rebuilt = {
+        "stat_counters": rebuild_stats(db),
+        "reputation_rollups": rebuild_rollups(db),
+        "leaderboard_agents": rebuild_leaderboard(db)
+    }
+    invalidation_bus.publish(RESYNC)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    # Run as a backup/restore job:
+    #   python -m app.utils.bulk_data export backup.ndjson.gz
+    #   python -m app.utils.bulk_data import backup.ndjson.gz [--skip-existing]
+    import sys
+    import time
+    from ..database import init_db
+    init_db()
+    command, path = sys.argv[1], sys.argv[2]
+    started = time.perf_counter()
+    if command == "export":
+        with open(path, "wb") as f:
+            for chunk in export_stream():
+                f.write(chunk)
+        print(f"✅ Exported to {path} in {time.perf_counter() - started:.1f}s")
+    else:
+        db = SessionLocal()
+        try:
+            with open(path, "rb") as f:
+                summary = import_stream(db, open_export(f), skip_existing="--skip-existing" in sys.argv)
+        finally:
+            db.close()
+        total = sum(summary["read"].values())
+        print(f"✅ Imported {total} rows in {time.perf_counter() - started:.1f}s: {summary}")
+        if not summary["complete"]:
+            print("⚠️ The export has no end marker; it may be truncated")
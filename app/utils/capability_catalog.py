@@ -0,0 +1,208 @@
+from sqlalchemy.orm import Session
+from bisect import bisect_left, insort
+from collections import Counter
+from threading import Lock
+from typing import Dict, Set, List, Iterable, Optional, Any
+import re
+from ..models import Agent, Task
+from .capability_index import normalize_capability
+from .notifications import invalidation_bus
+
+FUZZY_THRESHOLD = 0.4      # Minimum trigram similarity for a fuzzy match
+FUZZY_MAX_EXPANSIONS = 10  # Max catalog terms one requested capability expands to
+MIN_PREFIX_LENGTH = 3      # Shorter prefixes ("py", "ai") match too many unrelated names
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _compact(capability: str) -> str:
+    """Strip everything but letters and digits ("Py-Coding" -> "pycoding")."""
+    return _NON_ALNUM.sub("", capability.lower())
+
+
+def _tokens(capability: str) -> List[str]:
+    return [t for t in _NON_ALNUM.split(capability.lower()) if len(t) >= 2]
+
+
+def _trigrams(capability: str) -> Set[str]:
+    padded = f"  {_compact(capability)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CapabilityCatalog:
+    """
+    Catalog of every capability in use, with agent and task usage counts.
+
+    Names are kept in a sorted list so a prefix lookup is a bisect plus a
+    contiguous slice (a flattened trie), and a trigram index backs fuzzy
+    matching so "python", "Python3" and "ml-python" can find each other.
+    """
+
+    def __init__(self):
+        self._agent_counts: Counter = Counter()
+        self._task_counts: Counter = Counter()
+        self._names: List[str] = []
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+
+    # -- maintenance -----------------------------------------------------
+
+    def _add_name_locked(self, name: str):
+        i = bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            return
+        self._names.insert(i, name)
+        for gram in _trigrams(name):
+            self._trigram_index.setdefault(gram, set()).add(name)
+
+    def _drop_name_locked(self, name: str):
+        if self._agent_counts[name] > 0 or self._task_counts[name] > 0:
+            return
+        i = bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+        for gram in _trigrams(name):
+            names = self._trigram_index.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._trigram_index[gram]
+        self._agent_counts.pop(name, None)
+        self._task_counts.pop(name, None)
+
+    def _apply_locked(self, counts: Counter, capabilities: Iterable[str], delta: int):
+        for name in {normalize_capability(c) for c in (capabilities or []) if c and c.strip()}:
+            counts[name] += delta
+            if counts[name] <= 0:
+                counts[name] = 0
+                self._drop_name_locked(name)
+            else:
+                self._add_name_locked(name)
+
+    def agent_capabilities_changed(self, old: Optional[Iterable[str]], new: Optional[Iterable[str]]):
+        """
+        Record an agent's capabilities being set (old=None on registration).
+        """
+        with self._lock:
+            self._apply_locked(self._agent_counts, old or [], -1)
+            self._apply_locked(self._agent_counts, new or [], 1)
+
+    def task_created(self, capabilities: Optional[Iterable[str]]):
+        with self._lock:
+            self._apply_locked(self._task_counts, capabilities or [], 1)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Recount capability usage from active agents and all tasks.
+
+        Returns:
+            int: Number of distinct capabilities in the catalog
+        """
+        agent_counts: Counter = Counter()
+        for (capabilities,) in db.query(Agent.capabilities).filter(Agent.is_active == True):
+            agent_counts.update({normalize_capability(c) for c in (capabilities or []) if c and c.strip()})
+
+        task_counts: Counter = Counter()
+        for (capabilities,) in db.query(Task.required_capabilities).yield_per(1000):
+            task_counts.update({normalize_capability(c) for c in (capabilities or []) if c and c.strip()})
+
+        with self._lock:
+            self._agent_counts = agent_counts
+            self._task_counts = task_counts
+            self._names = []
+            self._trigram_index = {}
+            for name in set(agent_counts) | set(task_counts):
+                insort(self._names, name)
+                for gram in _trigrams(name):
+                    self._trigram_index.setdefault(gram, set()).add(name)
+            return len(self._names)
+
+    # -- lookups ---------------------------------------------------------
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        agents, tasks = self._agent_counts[name], self._task_counts[name]
+        return {
+            "capability": name,
+            "agent_count": agents,
+            "task_count": tasks,
+            "usage_count": agents + tasks
+        }
+
+    def complete(self, prefix: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Autocomplete: capabilities starting with `prefix`, most used first.
+        """
+        prefix = normalize_capability(prefix)
+        with self._lock:
+            start = bisect_left(self._names, prefix)
+            end = bisect_left(self._names, prefix + "\uffff") if prefix else len(self._names)
+            entries = [self._entry(name) for name in self._names[start:end]]
+        entries.sort(key=lambda e: (-e["usage_count"], e["capability"]))
+        return entries[:limit]
+
+    def similar(self, capability: str, limit: int = FUZZY_MAX_EXPANSIONS) -> List[Dict[str, Any]]:
+        """
+        Catalog capabilities that fuzzily match `capability`, best first.
+
+        A capability matches when its trigram similarity reaches
+        FUZZY_THRESHOLD, when one compacted form is a prefix of the other
+        ("python" / "python3"), or when a word of one is a prefix of the
+        other ("ml-python" / "python3"). Prefixes must be at least
+        MIN_PREFIX_LENGTH characters, and a prefix match scores by how much
+        of the longer name it covers.
+        """
+        name = normalize_capability(capability)
+        compact = _compact(name)
+        grams = _trigrams(name)
+        tokens = [t for t in _tokens(name) if len(t) >= MIN_PREFIX_LENGTH]
+
+        with self._lock:
+            shared: Counter = Counter()
+            for gram in grams:
+                shared.update(self._trigram_index.get(gram, ()))
+
+            scored = []
+            for candidate in set(shared) | {name}:
+                if candidate not in self._agent_counts and candidate not in self._task_counts:
+                    continue
+                candidate_compact = _compact(candidate)
+                overlap = shared[candidate]
+                similarity = overlap / (len(grams) + len(_trigrams(candidate)) - overlap) if overlap else 0.0
+                shorter, longer = sorted((compact, candidate_compact), key=len)
+                if len(shorter) >= MIN_PREFIX_LENGTH and longer.startswith(shorter):
+                    # "python" / "python3" scores 0.93, "pyt" / "pytorch" 0.71
+                    similarity = max(similarity, 0.5 + 0.5 * len(shorter) / len(longer))
+                elif any(candidate_compact.startswith(t) for t in tokens) or \
+                        any(compact.startswith(t) for t in _tokens(candidate) if len(t) >= MIN_PREFIX_LENGTH):
+                    similarity = max(similarity, FUZZY_THRESHOLD)
+                if similarity >= FUZZY_THRESHOLD:
+                    entry = self._entry(candidate)
+                    entry["similarity"] = round(similarity, 3)
+                    scored.append(entry)
+
+        scored.sort(key=lambda e: (-e["similarity"], -e["usage_count"], e["capability"]))
+        return scored[:limit]
+
+    def expand(self, capability: str) -> Set[str]:
+        """
+        The requested capability plus every catalog capability that fuzzily matches it.
+        """
+        return {normalize_capability(capability)} | {e["capability"] for e in self.similar(capability)}
+
+
+# Process-wide catalog
+capability_catalog = CapabilityCatalog()
+
+
+def _agent_changed(agent_id: str, data: Dict[str, Any]):
+    if "capabilities" in data:
+        capability_catalog.agent_capabilities_changed(data.get("previous_capabilities"), data["capabilities"])
+
+
+def _task_changed(task_id: str, data: Dict[str, Any]):
+    if data.get("event") == "created":
+        capability_catalog.task_created(data.get("capabilities"))
+
+
+invalidation_bus.on("agent", _agent_changed)
+invalidation_bus.on("task", _task_changed)
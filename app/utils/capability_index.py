@@ -0,0 +1,167 @@
+from sqlalchemy.orm import Session
+from collections import Counter
+from heapq import nsmallest
+from threading import Lock
+from typing import Dict, Set, List, Tuple, Iterable, Optional, Any
+from ..models import Agent
+from .notifications import invalidation_bus
+
+
+def normalize_capability(capability: str) -> str:
+    return capability.strip().lower()
+
+
+class CapabilityIndex:
+    """
+    In-memory inverted index from capability to active agent ids.
+
+    Kept current by registration, profile updates and reputation changes,
+    and rebuilt from the database at startup. Lookups only touch the
+    posting sets of the requested capabilities.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._agent_caps: Dict[str, Set[str]] = {}
+        self._scores: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def _remove_locked(self, agent_id: str):
+        for cap in self._agent_caps.pop(agent_id, ()):
+            posting = self._postings.get(cap)
+            if posting is not None:
+                posting.discard(agent_id)
+                if not posting:
+                    del self._postings[cap]
+
+    def update_agent(self, agent_id: str, capabilities: Optional[Iterable[str]], score: int = 0):
+        """
+        Add an agent or replace its capabilities and score.
+        """
+        caps = {normalize_capability(c) for c in (capabilities or []) if c and c.strip()}
+        with self._lock:
+            self._remove_locked(agent_id)
+            self._agent_caps[agent_id] = caps
+            self._scores[agent_id] = score
+            for cap in caps:
+                self._postings.setdefault(cap, set()).add(agent_id)
+
+    def update_score(self, agent_id: str, score: int):
+        """
+        Update the reputation used for tie-breaking. Unknown agents are ignored.
+        """
+        with self._lock:
+            if agent_id in self._scores:
+                self._scores[agent_id] = score
+
+    def score(self, agent_id: str) -> int:
+        """
+        Reputation score last seen for an agent (0 if unknown).
+        """
+        return self._scores.get(agent_id, 0)
+
+    def remove_agent(self, agent_id: str):
+        with self._lock:
+            self._remove_locked(agent_id)
+            self._scores.pop(agent_id, None)
+
+    def search(self, capabilities: Iterable[str], mode: str = "any",
+               limit: int = 25) -> List[Tuple[str, int]]:
+        """
+        Find agents by capability, ranked by match count then reputation.
+
+        Args:
+            capabilities: Requested capabilities (case-insensitive)
+            mode: "any" to match at least one capability, "all" to require every one
+            limit: Max number of results
+
+        Returns:
+            List of (agent_id, match_count) tuples, best match first
+        """
+        wanted = {normalize_capability(c) for c in capabilities if c and c.strip()}
+        return self.search_groups([{cap} for cap in wanted], mode, limit)
+
+    def search_groups(self, groups: List[Set[str]], mode: str = "any",
+                      limit: int = 25) -> List[Tuple[str, int]]:
+        """
+        Like `search`, but each requested capability is a group of
+        interchangeable names (e.g. fuzzy expansions). An agent matches a
+        group if it has any name in it; match count is the number of groups.
+        """
+        groups = [{normalize_capability(c) for c in group} for group in groups if group]
+        if not groups:
+            return []
+
+        with self._lock:
+            postings = []
+            for group in groups:
+                if len(group) == 1:
+                    postings.append(self._postings.get(next(iter(group)), set()))
+                else:
+                    postings.append(set().union(*(self._postings.get(cap, set()) for cap in group)))
+
+            # Intersect starting from the rarest capability
+            postings.sort(key=len)
+            matched = set(postings[0])
+            for posting in postings[1:]:
+                matched &= posting
+                if not matched:
+                    break
+
+            scores = self._scores
+            if mode == "all" or len(matched) >= limit:
+                # Agents matching every group rank first, so when there are
+                # enough of them the others never need counting
+                best = nsmallest(limit, matched, key=lambda agent_id: (-scores.get(agent_id, 0), agent_id))
+                return [(agent_id, len(groups)) for agent_id in best]
+
+            counts = Counter()
+            for posting in postings:
+                counts.update(posting)
+            best = nsmallest(
+                limit,
+                counts.items(),
+                key=lambda item: (-item[1], -scores.get(item[0], 0), item[0])
+            )
+
+        return best
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Replace the index contents with all active agents from the database.
+
+        Returns:
+            int: Number of agents indexed
+        """
+        rows = db.query(Agent.id, Agent.capabilities, Agent.reputation_score) \
+            .filter(Agent.is_active == True).all()
+
+        postings: Dict[str, Set[str]] = {}
+        agent_caps: Dict[str, Set[str]] = {}
+        scores: Dict[str, int] = {}
+        for agent_id, capabilities, score in rows:
+            caps = {normalize_capability(c) for c in (capabilities or []) if c and c.strip()}
+            agent_caps[agent_id] = caps
+            scores[agent_id] = score or 0
+            for cap in caps:
+                postings.setdefault(cap, set()).add(agent_id)
+
+        with self._lock:
+            self._postings = postings
+            self._agent_caps = agent_caps
+            self._scores = scores
+        return len(rows)
+
+
+# Process-wide index used by the agents router
+capability_index = CapabilityIndex()
+
+
+def _agent_changed(agent_id: str, data: Dict[str, Any]):
+    if "capabilities" in data:
+        capability_index.update_agent(agent_id, data["capabilities"], data.get("score", 0))
+    elif "score" in data:
+        capability_index.update_score(agent_id, data["score"])
+
+
+invalidation_bus.on("agent", _agent_changed)
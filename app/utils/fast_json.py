@@ -0,0 +1,123 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import Text, type_coerce
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import json
+from ..database import SessionLocal
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+NDJSON_MAX_LIMIT = 100000  # List endpoints allow larger pages when streaming
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to JSON bytes (orjson when installed). Naive datetimes are
+    written as ISO 8601 without offset, same as the Pydantic response models.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _default(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class: JSONResponse rendered with orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def raw_json(column):
+    """
+    Select a JSON column as its stored text, skipping the driver-side json.loads.
+    """
+    return type_coerce(column, Text).label(column.key)
+
+
+def _embed(value: Any) -> Any:
+    # Stored JSON text is embedded verbatim instead of parsed and re-serialized.
+    # Drivers that already decode JSON (e.g. psycopg2) hand back objects.
+    if isinstance(value, (str, bytes)):
+        if orjson is not None and hasattr(orjson, "Fragment"):
+            return orjson.Fragment(value)
+        return json.loads(value)
+    return value
+
+
+def row_mapper(json_fields: Sequence[str] = ()) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Build a function turning a result row into a plain dict, with the
+    given fields selected via `raw_json` embedded as-is.
+    """
+    json_fields = set(json_fields)
+
+    def to_dict(row) -> Dict[str, Any]:
+        data = dict(row._mapping)
+        for field in json_fields:
+            if field in data:
+                data[field] = _embed(data[field])
+        return data
+
+    return to_dict
+
+
+def rows_response(rows: Iterable[Any], to_dict: Callable[[Any], Dict[str, Any]], headers=None) -> Response:
+    """
+    Serialize query rows straight to a JSON array response, without ORM
+    objects or Pydantic validation.
+    """
+    return Response(content=dumps([to_dict(row) for row in rows]), media_type="application/json",
+                    headers=headers)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(make_rows: Callable[[Any], Any], to_dict: Callable[[Any], Dict[str, Any]],
+                    keep: Optional[Callable[[Any], bool]] = None, limit: Optional[int] = None,
+                    headers=None) -> StreamingResponse:
+    """
+    Stream rows as newline-delimited JSON in constant memory.
+
+    `make_rows(session)` is called with a session owned by the stream (the
+    request's session is closed before the body is sent) and should return
+    a query; it is read in batches with server-side cursors where supported.
+    Rows for which `keep(row)` is false are skipped; at most `limit` rows
+    are written.
+    """
+    def generate() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            rows = make_rows(db).execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+            batch: List[bytes] = []
+            written = 0
+            for row in rows:
+                if keep is not None and not keep(row):
+                    continue
+                if limit is not None and written >= limit:
+                    break
+                written += 1
+                batch.append(dumps(to_dict(row)) + b"\n")
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield b"".join(batch)
+                    batch = []
+            if batch:
+                yield b"".join(batch)
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,203 @@
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import or_, and_, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Generator, Optional, Tuple
+import hashlib
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Agent, IdempotencyKey
+from ..auth import get_current_agent
+from .blob_store import canonical_json
+from .fast_json import dumps
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+HOT_TIER_SIZE = 10000
+
+# (expires_at, request_hash, status_code, body) of recently completed requests
+_hot: "OrderedDict[str, Tuple[datetime, str, int, bytes]]" = OrderedDict()
+_hot_lock = Lock()
+
+
+def _remember(key: str, entry: Tuple[datetime, str, int, bytes]):
+    with _hot_lock:
+        _hot[key] = entry
+        _hot.move_to_end(key)
+        while len(_hot) > HOT_TIER_SIZE:
+            _hot.popitem(last=False)
+
+
+def _recall(key: str) -> Optional[Tuple[datetime, str, int, bytes]]:
+    with _hot_lock:
+        entry = _hot.get(key)
+        if entry and entry[0] <= datetime.utcnow():
+            del _hot[key]
+            return None
+        return entry
+
+
+def _replay(request_hash: str, stored_hash: str, status_code: int, body: bytes) -> Response:
+    if request_hash != stored_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return Response(content=body, status_code=status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+class IdempotentRequest:
+    """
+    Handle for one request that may carry an Idempotency-Key.
+
+    `start(body)` returns the stored response of an earlier request with
+    the same key (the endpoint returns it without doing anything else), or
+    reserves the key and returns None. `save(model)` records the response
+    and returns it. A reservation that is never saved (the endpoint raised)
+    is released, so the client can retry.
+    """
+
+    def __init__(self, agent_id: str, method: str, path: str, client_key: Optional[str]):
+        self.key = None
+        if client_key:
+            if len(client_key) > MAX_KEY_LENGTH:
+                raise HTTPException(status_code=400, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+            scope = f"{agent_id}\n{method} {path}\n{client_key}"
+            self.key = hashlib.sha256(scope.encode()).hexdigest()
+        self.agent_id = agent_id
+        self.request_hash = None
+        self._reserved = False
+
+    def start(self, body: Any = None) -> Optional[Response]:
+        if self.key is None:
+            return None
+        if isinstance(body, BaseModel):
+            body = body.model_dump(mode="json")
+        self.request_hash = hashlib.sha256(canonical_json(body)).hexdigest()
+
+        cached = _recall(self.key)
+        if cached:
+            return _replay(self.request_hash, cached[1], cached[2], cached[3])
+
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.add(IdempotencyKey(
+                key=self.key,
+                agent_id=self.agent_id,
+                request_hash=self.request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds)
+            ))
+            try:
+                db.commit()
+                self._reserved = True
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            record = db.query(IdempotencyKey).filter(IdempotencyKey.key == self.key).first()
+            if record and record.status_code is not None and record.expires_at > now:
+                expires_at = record.expires_at
+                _remember(self.key, (expires_at, record.request_hash, record.status_code, record.response.encode()))
+                return _replay(self.request_hash, record.request_hash, record.status_code, record.response.encode())
+
+            # Take over an expired key, or a reservation abandoned by a crashed worker
+            stale = now - timedelta(seconds=settings.idempotency_lock_seconds)
+            taken = db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == self.key)
+                .where(or_(IdempotencyKey.expires_at <= now,
+                           and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.created_at < stale)))
+                .values(agent_id=self.agent_id, request_hash=self.request_hash, status_code=None,
+                        response=None, created_at=now,
+                        expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds))
+            ).rowcount
+            db.commit()
+            if taken:
+                self._reserved = True
+                return None
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress",
+                                headers={"Retry-After": "1"})
+        finally:
+            db.close()
+
+    def save(self, model: Any, status_code: int = 200):
+        """
+        Store the response for replays. Returns what the endpoint should return.
+        """
+        if not self._reserved:
+            return model
+        if isinstance(model, BaseModel):
+            model = model.model_dump(mode="json")
+        body = dumps(model)
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(IdempotencyKey).where(IdempotencyKey.key == self.key)
+                .values(status_code=status_code, response=body.decode())
+            )
+            db.commit()
+            expires_at = db.query(IdempotencyKey.expires_at).filter(IdempotencyKey.key == self.key).scalar()
+        finally:
+            db.close()
+        self._reserved = False
+        if expires_at:
+            _remember(self.key, (expires_at, self.request_hash, status_code, body))
+        return Response(content=body, status_code=status_code, media_type="application/json")
+
+    def release(self):
+        if not self._reserved:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.key == self.key, IdempotencyKey.status_code.is_(None)
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self._reserved = False
+
+
+def idempotent_request(
+    request: Request,
+    agent: Agent = Depends(get_current_agent)
+) -> Generator[IdempotentRequest, None, None]:
+    """
+    Dependency for mutating endpoints that honour the Idempotency-Key header.
+    """
+    idem = IdempotentRequest(agent.id, request.method, request.url.path, request.headers.get(HEADER))
+    try:
+        yield idem
+    finally:
+        idem.release()
+
+
+def purge_expired(db: Session) -> int:
+    """
+    Delete expired keys.
+
+    Returns:
+        int: Number of keys deleted
+    """
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    # Run as a maintenance job: python -m app.utils.idempotency
+    from ..database import init_db
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"✅ Purged {purge_expired(db)} expired idempotency keys")
+    finally:
+        db.close()
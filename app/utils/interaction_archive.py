@@ -0,0 +1,305 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Interaction, InteractionArchiveBlock
+from .fast_json import dumps, raw_json, row_mapper
+from .table_versions import tables_changed
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+ARCHIVE_BLOCK_ROWS = 1000  # Rows per compressed block (the unit a history read decompresses)
+ARCHIVE_COMPRESSION_LEVEL = 9  # Written once, read rarely
+DELETE_BATCH_SIZE = 1000
+FILTER_BITS_PER_AGENT = 10  # With 4 hashes: about 1% of blocks read for nothing
+FILTER_HASHES = 4
+SEGMENT_SUFFIX = ".ndjson.gz"
+
+# The InteractionResponse fields, as archived
+ARCHIVE_COLUMNS = (
+    Interaction.id, Interaction.sender_id, Interaction.recipient_id, Interaction.message_type,
+    raw_json(Interaction.payload), Interaction.status, Interaction.created_at
+)
+_archive_row = row_mapper(("payload",))
+
+Cursor = Tuple[datetime, str]  # (created_at, id) of the last interaction on the previous page
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _filter_positions(agent_id: str, bits: int) -> Iterator[int]:
+    # Double hashing: k positions from one 128-bit digest
+    digest = hashlib.blake2b(agent_id.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    for i in range(FILTER_HASHES):
+        yield (h1 + i * h2) % bits
+
+
+def build_agent_filter(agent_ids: Iterable[str]) -> bytes:
+    """
+    Bloom filter of the agents in a block, so a history read skips blocks
+    the agent has no messages in without decompressing them.
+    """
+    agent_ids = set(agent_ids)
+    size = max(8, (len(agent_ids) * FILTER_BITS_PER_AGENT + 7) // 8)
+    bits = bytearray(size)
+    for agent_id in agent_ids:
+        for position in _filter_positions(agent_id, size * 8):
+            bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits)
+
+
+def may_contain(agent_filter: bytes, agent_id: str) -> bool:
+    bits = len(agent_filter) * 8
+    return all(agent_filter[p >> 3] & (1 << (p & 7)) for p in _filter_positions(agent_id, bits))
+
+
+def encode_cursor(created_at: datetime, interaction_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{interaction_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Timestamps with an offset are normalized to naive UTC, like the stored ones.
+
+    Raises:
+        ValueError: Not a cursor returned by this API
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, interaction_id = raw.split("|", 1)
+        when = datetime.fromisoformat(created_at)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when, interaction_id
+
+
+def _sort_key(row: Dict[str, Any]) -> Cursor:
+    return row["created_at"] or datetime.min, row["id"]
+
+
+def _write_block(f, segment: str, rows: List[Any]) -> InteractionArchiveBlock:
+    lines = []
+    agents = set()
+    statuses: Counter = Counter()
+    for row in rows:
+        lines.append(dumps(_archive_row(row)) + b"\n")
+        agents.update((row.sender_id, row.recipient_id))
+        statuses[row.status or "sent"] += 1
+
+    # Each block is a complete gzip member: a segment can be read block by
+    # block through the index, or whole with zcat
+    data = gzip.compress(b"".join(lines), compresslevel=ARCHIVE_COMPRESSION_LEVEL, mtime=0)
+    offset = f.tell()
+    f.write(data)
+    return InteractionArchiveBlock(
+        segment=segment,
+        byte_offset=offset,
+        byte_length=len(data),
+        row_count=len(rows),
+        min_created_at=rows[0].created_at,
+        max_created_at=rows[-1].created_at,
+        agent_filter=build_agent_filter(agents),
+        status_counts=dict(statuses)
+    )
+
+
+def _archive_range(db: Session, start: datetime, end: datetime) -> int:
+    # One new segment per run and day; existing segments are never rewritten
+    segment = f"{start:%Y/%m}/{start.date().isoformat()}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+    path = os.path.join(settings.interaction_archive_dir, segment)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    blocks: List[InteractionArchiveBlock] = []
+    ids: List[str] = []
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            rows = db.execute(
+                select(*ARCHIVE_COLUMNS)
+                .where(Interaction.created_at >= start, Interaction.created_at < end)
+                .order_by(Interaction.created_at, Interaction.id)
+                .execution_options(stream_results=True, yield_per=ARCHIVE_BLOCK_ROWS)
+            )
+            for partition in rows.partitions():
+                blocks.append(_write_block(f, segment, partition))
+                ids.extend(row.id for row in partition)
+            f.flush()
+            os.fsync(f.fileno())
+        if not blocks:
+            os.unlink(tmp)
+            return 0
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    # The index rows and the delete commit together: a crash before this
+    # leaves the rows hot and an unreferenced segment file, never a gap
+    db.add_all(blocks)
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        db.query(Interaction).filter(
+            Interaction.id.in_(ids[i:i + DELETE_BATCH_SIZE])
+        ).delete(synchronize_session=False)
+    db.commit()
+    return len(ids)
+
+
+def archive_interactions(db: Session, retention_days: Optional[int] = None) -> int:
+    """
+    Move interactions older than the retention window into compressed,
+    append-only segment files: one per UTC day and run, split into blocks
+    of ARCHIVE_BLOCK_ROWS rows. Each block gets a row in
+    interaction_archive_blocks (time range, agent filter, status counts),
+    the sparse index history reads go through.
+
+    Args:
+        db: Database session
+        retention_days: Days of interactions to keep in the table (defaults to settings)
+
+    Returns:
+        int: Number of interactions archived
+    """
+    if retention_days is None:
+        retention_days = settings.interaction_retention_days
+    now = datetime.utcnow()
+    cutoff = datetime(now.year, now.month, now.day) - timedelta(days=retention_days)
+
+    archived = 0
+    while True:
+        oldest = db.query(func.min(Interaction.created_at)).filter(Interaction.created_at < cutoff).scalar()
+        if oldest is None:
+            break
+        start = datetime(oldest.year, oldest.month, oldest.day)
+        archived += _archive_range(db, start, min(start + timedelta(days=1), cutoff))
+
+    if archived:
+        tables_changed("interactions")
+    return archived
+
+
+def read_block(block: InteractionArchiveBlock) -> List[Dict[str, Any]]:
+    """
+    Decompress one block into interaction dicts (created_at as datetime).
+    """
+    with open(os.path.join(settings.interaction_archive_dir, block.segment), "rb") as f:
+        f.seek(block.byte_offset)
+        data = f.read(block.byte_length)
+    rows = []
+    for line in gzip.decompress(data).splitlines():
+        row = _loads(line)
+        if row.get("created_at"):
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        rows.append(row)
+    return rows
+
+
+def archived_history(db: Session, agent_id: str, with_agent_id: Optional[str],
+                     before: Optional[Cursor], limit: int) -> List[Dict[str, Any]]:
+    """
+    The newest `limit` archived interactions of an agent (optionally only
+    those with `with_agent_id`) older than the cursor.
+
+    Blocks are visited newest first; a block is decompressed only if its
+    time range reaches below the cursor and its agent filter matches, and
+    the walk stops once no remaining block can hold a newer row.
+    """
+    query = db.query(InteractionArchiveBlock).order_by(
+        InteractionArchiveBlock.max_created_at.desc(), InteractionArchiveBlock.id.desc()
+    )
+    if before is not None:
+        query = query.filter(InteractionArchiveBlock.min_created_at <= before[0])
+
+    found: List[Dict[str, Any]] = []
+    for block in query.yield_per(100):
+        if len(found) >= limit and block.max_created_at < found[-1]["created_at"]:
+            break
+        if not may_contain(block.agent_filter, agent_id):
+            continue
+        if with_agent_id and not may_contain(block.agent_filter, with_agent_id):
+            continue
+        for row in read_block(block):
+            if agent_id not in (row["sender_id"], row["recipient_id"]):
+                continue
+            if with_agent_id and with_agent_id not in (row["sender_id"], row["recipient_id"]):
+                continue
+            if before is not None and _sort_key(row) >= before:
+                continue
+            found.append(row)
+        found.sort(key=_sort_key, reverse=True)
+        del found[limit:]
+    return found
+
+
+def history_page(db: Session, hot: List[Dict[str, Any]], agent_id: str, with_agent_id: Optional[str],
+                 before: Optional[Cursor], limit: int) -> List[Dict[str, Any]]:
+    """
+    Complete a page of history read from the interactions table with
+    archived rows, when the page isn't full or reaches past the newest
+    archived interaction. Otherwise the archive is not touched.
+    """
+    if limit < 1:
+        return []
+    newest_archived = db.query(func.max(InteractionArchiveBlock.max_created_at)).scalar()
+    if newest_archived is None:
+        return hot
+    if len(hot) >= limit and _sort_key(hot[-1])[0] > newest_archived:
+        return hot
+
+    merged = {row["id"]: row for row in archived_history(db, agent_id, with_agent_id, before, limit)}
+    merged.update((row["id"], row) for row in hot)
+    return sorted(merged.values(), key=_sort_key, reverse=True)[:limit]
+
+
+def iter_archived(batch_blocks: int = 50) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Every archived interaction, one block at a time, oldest segments first.
+    The index is read in short transactions (see bulk_data's export).
+    """
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            blocks = db.query(InteractionArchiveBlock).filter(
+                InteractionArchiveBlock.id > last_id
+            ).order_by(InteractionArchiveBlock.id).limit(batch_blocks).all()
+        finally:
+            db.close()
+        for block in blocks:
+            last_id = block.id
+            yield read_block(block)
+        if len(blocks) < batch_blocks:
+            return
+
+
+if __name__ == "__main__":
+    # Run as a retention job: python -m app.utils.interaction_archive [days]
+    import sys
+    from ..database import init_db
+    init_db()
+    db = SessionLocal()
+    try:
+        days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        print(f"✅ Archived {archive_interactions(db, days)} interactions")
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+from sqlalchemy import update, bindparam, or_
+from datetime import datetime
+from typing import Dict, Optional
+from threading import Lock, Thread, Event
+from ..models import Agent
+from ..database import engine
+
+# agent_id -> most recent activity time not yet written to the database
+_pending: Dict[str, datetime] = {}
+_pending_lock = Lock()
+
+_stop = Event()
+_flusher: Optional[Thread] = None
+
+# Only last_active is written; updated_at is set to itself so its onupdate
+# hook does not fire for a pure activity ping. Older timestamps never
+# overwrite newer ones, so workers can flush in any order.
+_agents = Agent.__table__
+_bulk_update = (
+    update(_agents)
+    .where(_agents.c.id == bindparam("agent_id"))
+    .where(or_(_agents.c.last_active.is_(None), _agents.c.last_active < bindparam("seen_at")))
+    .values(last_active=bindparam("seen_at"), updated_at=_agents.c.updated_at)
+)
+
+
+def touch_agent(agent_id: str, when: Optional[datetime] = None):
+    """
+    Record agent activity without touching the database.
+    The timestamp is written by the next flush.
+
+    Args:
+        agent_id: ID of the agent
+        when: Time of the activity (defaults to now)
+    """
+    when = when or datetime.utcnow()
+    with _pending_lock:
+        current = _pending.get(agent_id)
+        if current is None or when > current:
+            _pending[agent_id] = when
+
+
+def pending_last_active(agent_id: str) -> Optional[datetime]:
+    """
+    Get the buffered (not yet flushed) last activity time for an agent, if any.
+    """
+    with _pending_lock:
+        return _pending.get(agent_id)
+
+
+def flush_last_active() -> int:
+    """
+    Write all buffered activity times to the agents table in one bulk update.
+    On failure the timestamps are put back so the next flush retries them.
+
+    Returns:
+        int: Number of agents updated
+    """
+    global _pending
+    with _pending_lock:
+        if not _pending:
+            return 0
+        batch, _pending = _pending, {}
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(_bulk_update, [
+                {"agent_id": agent_id, "seen_at": seen_at}
+                for agent_id, seen_at in batch.items()
+            ])
+    except Exception as e:
+        print(f"Error flushing last_active updates: {e}")
+        for agent_id, seen_at in batch.items():
+            touch_agent(agent_id, seen_at)
+        return 0
+
+    return len(batch)
+
+
+def _flush_loop(interval: float):
+    while not _stop.wait(interval):
+        flush_last_active()
+
+
+def start_last_active_flusher(interval: float):
+    """
+    Start the background thread that flushes activity times every `interval` seconds.
+    """
+    global _flusher
+    if _flusher and _flusher.is_alive():
+        return
+    _stop.clear()
+    _flusher = Thread(target=_flush_loop, args=(interval,), name="last-active-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_last_active_flusher():
+    """
+    Stop the flusher thread and write anything still buffered.
+    """
+    global _flusher
+    _stop.set()
+    if _flusher:
+        _flusher.join(timeout=5)
+        _flusher = None
+    flush_last_active()
@@ -0,0 +1,238 @@
+from sqlalchemy.orm import Session
+from bisect import insort, bisect_left
+from typing import Dict, List, Optional, Tuple, Iterable
+from threading import Lock
+from ..models import Agent
+from .notifications import get_redis, redis_available
+
+# Redis keys
+GLOBAL_KEY = "leaderboard:global"
+CAPABILITY_KEY_PREFIX = "leaderboard:cap:"
+CAPABILITY_INDEX_KEY = "leaderboard:capabilities"  # set of capabilities that have a board
+
+
+def _capability_key(capability: str) -> str:
+    return f"{CAPABILITY_KEY_PREFIX}{capability}"
+
+
+def _normalize_capabilities(capabilities: Optional[Iterable[str]]) -> List[str]:
+    return sorted({c.strip().lower() for c in (capabilities or []) if c and c.strip()})
+
+
+class _Descending(str):
+    # A member id that sorts in reverse order
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+    def __gt__(self, other):
+        return str.__lt__(self, other)
+
+
+class _MemorySortedSet:
+    """
+    Minimal in-process stand-in for a Redis sorted set.
+    Ordered by score descending, ties broken by member id descending
+    (like ZREVRANGE), so both backends page and rank identically.
+    """
+
+    def __init__(self):
+        self.scores: Dict[str, int] = {}
+        self.order: List[Tuple[int, _Descending]] = []  # (-score, member)
+
+    def add(self, member: str, score: int):
+        self.remove(member)
+        self.scores[member] = score
+        insort(self.order, (-score, _Descending(member)))
+
+    def remove(self, member: str):
+        score = self.scores.pop(member, None)
+        if score is not None:
+            del self.order[bisect_left(self.order, (-score, _Descending(member)))]
+
+    def rank(self, member: str) -> Optional[int]:
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect_left(self.order, (-score, _Descending(member)))
+
+    def range(self, offset: int, limit: int) -> List[Tuple[str, int]]:
+        return [(str(member), -neg) for neg, member in self.order[offset:offset + limit]]
+
+
+_memory_boards: Dict[str, _MemorySortedSet] = {}
+_memory_lock = Lock()
+
+
+def _memory_board(key: str) -> _MemorySortedSet:
+    board = _memory_boards.get(key)
+    if board is None:
+        board = _memory_boards[key] = _MemorySortedSet()
+    return board
+
+
+def update_agent_score(agent_id: str, score: int, capabilities: Optional[Iterable[str]] = None,
+                       previous_capabilities: Optional[Iterable[str]] = None):
+    """
+    Set an agent's score on the global board and on each capability board.
+
+    Args:
+        agent_id: ID of the agent
+        score: Current reputation score
+        capabilities: Agent's current capabilities
+        previous_capabilities: Capabilities the agent had before an update;
+            the agent is removed from boards it no longer belongs to
+    """
+    caps = _normalize_capabilities(capabilities)
+    stale = set(_normalize_capabilities(previous_capabilities)) - set(caps)
+
+    if redis_available():
+        try:
+            pipe = get_redis().pipeline()
+            pipe.zadd(GLOBAL_KEY, {agent_id: score})
+            for cap in caps:
+                pipe.zadd(_capability_key(cap), {agent_id: score})
+            if caps:
+                pipe.sadd(CAPABILITY_INDEX_KEY, *caps)
+            for cap in stale:
+                pipe.zrem(_capability_key(cap), agent_id)
+            pipe.execute()
+        except Exception as e:
+            print(f"Error updating leaderboard in Redis: {e}")
+        return
+
+    with _memory_lock:
+        _memory_board(GLOBAL_KEY).add(agent_id, score)
+        for cap in caps:
+            _memory_board(_capability_key(cap)).add(agent_id, score)
+        for cap in stale:
+            _memory_board(_capability_key(cap)).remove(agent_id)
+
+
+def get_leaderboard(offset: int = 0, limit: int = 100,
+                    capability: Optional[str] = None) -> List[Tuple[str, int]]:
+    """
+    Get a page of the leaderboard, highest score first.
+
+    Args:
+        offset: Number of entries to skip
+        limit: Max number of entries to return
+        capability: Restrict to agents with this capability
+
+    Returns:
+        List of (agent_id, score) tuples (empty if limit < 1)
+    """
+    if limit < 1 or offset < 0:
+        return []
+    key = _capability_key(capability.strip().lower()) if capability else GLOBAL_KEY
+
+    if redis_available():
+        try:
+            rows = get_redis().zrevrange(key, offset, offset + limit - 1, withscores=True)
+            return [(member, int(score)) for member, score in rows]
+        except Exception as e:
+            print(f"Error reading leaderboard from Redis: {e}")
+            return []
+
+    with _memory_lock:
+        board = _memory_boards.get(key)
+        return board.range(offset, limit) if board else []
+
+
+def get_rank(agent_id: str, capability: Optional[str] = None) -> Optional[Tuple[int, int, int]]:
+    """
+    Get an agent's position on a leaderboard.
+
+    Args:
+        agent_id: ID of the agent
+        capability: Rank within this capability's board instead of globally
+
+    Returns:
+        (rank, score, board_size) with a 1-based rank, or None if the agent
+        is not on the board
+    """
+    key = _capability_key(capability.strip().lower()) if capability else GLOBAL_KEY
+
+    if redis_available():
+        try:
+            pipe = get_redis().pipeline()
+            pipe.zrevrank(key, agent_id)
+            pipe.zscore(key, agent_id)
+            pipe.zcard(key)
+            rank, score, size = pipe.execute()
+        except Exception as e:
+            print(f"Error reading leaderboard from Redis: {e}")
+            return None
+        if rank is None:
+            return None
+        return rank + 1, int(score), size
+
+    with _memory_lock:
+        board = _memory_boards.get(key)
+        rank = board.rank(agent_id) if board else None
+        if rank is None:
+            return None
+        return rank + 1, board.scores[agent_id], len(board.scores)
+
+
+def rebuild_leaderboard(db: Session) -> int:
+    """
+    Reconcile all leaderboards from the database.
+
+    Scores are seeded from Agent.reputation_score, the value profiles,
+    search and ranking filters serve, so the boards converge on it even if
+    an incremental update was lost.
+
+    Args:
+        db: Database session
+
+    Returns:
+        int: Number of agents placed on the global board
+    """
+    agents = db.query(Agent.id, Agent.capabilities, Agent.reputation_score) \
+        .filter(Agent.is_active == True).all()
+
+    boards: Dict[str, Dict[str, int]] = {GLOBAL_KEY: {}}
+    for agent_id, capabilities, reputation_score in agents:
+        score = int(reputation_score or 0)
+        boards[GLOBAL_KEY][agent_id] = score
+        for cap in _normalize_capabilities(capabilities):
+            boards.setdefault(_capability_key(cap), {})[agent_id] = score
+
+    if redis_available():
+        try:
+            old_caps = get_redis().smembers(CAPABILITY_INDEX_KEY)
+            pipe = get_redis().pipeline()
+            pipe.delete(GLOBAL_KEY, CAPABILITY_INDEX_KEY, *[_capability_key(c) for c in old_caps])
+            for key, members in boards.items():
+                if members:
+                    pipe.zadd(key, members)
+            new_caps = [k[len(CAPABILITY_KEY_PREFIX):] for k in boards if k != GLOBAL_KEY]
+            if new_caps:
+                pipe.sadd(CAPABILITY_INDEX_KEY, *new_caps)
+            pipe.execute()
+        except Exception as e:
+            print(f"Error rebuilding leaderboard in Redis: {e}")
+        return len(agents)
+
+    rebuilt: Dict[str, _MemorySortedSet] = {}
+    for key, members in boards.items():
+        board = rebuilt[key] = _MemorySortedSet()
+        for agent_id, score in members.items():
+            board.add(agent_id, score)
+    with _memory_lock:
+        _memory_boards.clear()
+        _memory_boards.update(rebuilt)
+    return len(agents)
+
+
+if __name__ == "__main__":
+    # Run as a reconciliation job: python -m app.utils.leaderboard
+    from ..database import SessionLocal
+    db = SessionLocal()
+    try:
+        count = rebuild_leaderboard(db)
+        print(f"✅ Leaderboard rebuilt for {count} agents")
+    finally:
+        db.close()
@@ -0,0 +1,160 @@
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from contextvars import ContextVar
+from typing import List, Optional
+import time
+
+# Request-level
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being processed", ["method", "route"])
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+# Hot paths
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duration of individual database queries",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+)
+API_KEY_VERIFY = Histogram(
+    "api_key_verify_seconds", "Time spent in verify_api_key_hash (bcrypt)",
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1)
+)
+REDIS_PUBLISH = Histogram(
+    "redis_publish_duration_seconds", "Redis pub/sub publish latency", ["kind", "outcome"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+)
+WEBHOOK_DELIVERY = Histogram(
+    "webhook_delivery_duration_seconds", "Webhook delivery latency from send_message", ["outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+WEBHOOK_DELIVERIES = Counter("webhook_deliveries_total", "Webhook deliveries by outcome", ["outcome"])
+
+UNMATCHED = "unmatched"
+
+# [query count, query seconds] of the request being served in this context
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def route_template(scope) -> str:
+    """
+    The path template of the route serving this request, e.g.
+    "/api/v1/tasks/{task_id}", so labels don't grow with every ID.
+    """
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight requests and database
+    usage per route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db.set(stats)
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(method, route, str(status["code"])).observe(time.perf_counter() - started)
+            in_flight.dec()
+            REQUEST_DB_QUERIES.labels(route).observe(stats[0])
+            REQUEST_DB_TIME.labels(route).observe(stats[1])
+            _request_db.reset(token)
+
+
+class _StateCollector:
+    """
+    Gauges read at scrape time: connection pool usage and admission control.
+    """
+
+    def describe(self):
+        # Without this, register() calls collect() at import time, while the
+        # modules collect() imports may still be half-initialized
+        return []
+
+    def collect(self):
+        from ..database import engine
+        from .rate_limit import admission
+
+        pool = engine.pool
+        size = pool.size() if hasattr(pool, "size") else 0
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        overflow = max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0  # QueuePool counts from -size
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+
+        yield GaugeMetricFamily("db_pool_size", "Connections kept in the pool", value=size)
+        yield GaugeMetricFamily("db_pool_checked_out", "Connections currently in use", value=checked_out)
+        yield GaugeMetricFamily("db_pool_overflow", "Connections opened beyond the pool size", value=overflow)
+        yield GaugeMetricFamily("db_pool_saturation", "Checked-out connections / pool capacity",
+                                value=checked_out / capacity if capacity > 0 else 0)
+
+        limited = CounterMetricFamily("rate_limited_requests", "Requests rejected with 429", labels=["route_class"])
+        for klass, count in admission.limited.items():
+            limited.add_metric([klass], count)
+        yield limited
+        shed = CounterMetricFamily("shed_requests", "Requests rejected with 503 under load", labels=["reason"])
+        for reason, count in admission.shed.items():
+            shed.add_metric([reason], count)
+        yield shed
+
+
+REGISTRY.register(_StateCollector())
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,14 +1,74 @@
-import redis
 import json
-from typing import Dict, Any, List
+from threading import Event, Lock, Thread
+from typing import Dict, Any, List, Callable, Optional
+import time
+import uuid
 from ..config import settings
+from .metrics import REDIS_PUBLISH
 
-# Create Redis client
-try:
-    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
-except Exception as e:
-    print(f"Warning: Could not connect to Redis: {e}")
-    redis_client = None
+# Created on first use by get_redis(); tests and benchmarks may assign their own
+redis_client = None
+_redis_created = False
+_redis_lock = Lock()
+
+_redis_checked = False
+_redis_ok = False
+
+
+def get_redis():
+    """
+    The shared Redis client, created on first use.
+
+    Importing redis and building the client is deferred, so a cold start
+    (and any process that never publishes) doesn't pay for it. Like
+    `redis.from_url`, this never connects; see `redis_available`.
+    """
+    global redis_client, _redis_created
+    if redis_client is None and not _redis_created:
+        with _redis_lock:
+            if redis_client is None and not _redis_created:
+                _redis_created = True
+                try:
+                    import redis
+                    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+                except Exception as e:
+                    print(f"Warning: Could not connect to Redis: {e}")
+    return redis_client
+
+
+def redis_available() -> bool:
+    """
+    Check (once per process) whether the Redis server actually answers.
+
+    `redis.from_url` never connects, so a client object exists even when no
+    server is running. Stateful helpers (leaderboards, counters) use this to
+    pick between Redis and their in-process fallback once, instead of
+    splitting their state across both.
+
+    Returns:
+        bool: True if Redis responded to PING
+    """
+    global _redis_checked, _redis_ok
+    if not _redis_checked:
+        _redis_checked = True
+        try:
+            client = get_redis()
+            _redis_ok = bool(client and client.ping())
+        except Exception as e:
+            print(f"Redis not reachable, using in-process fallback: {e}")
+            _redis_ok = False
+    return _redis_ok
+
+
+def ping_redis() -> bool:
+    """
+    Check right now whether Redis answers (for readiness probes).
+    """
+    try:
+        client = get_redis()
+        return bool(client and client.ping())
+    except Exception:
+        return False
 
 
 def publish_task(task_data: Dict[str, Any]) -> bool:
@@ -24,23 +84,27 @@ def publish_task(task_data: Dict[str, Any]) -> bool:
     Returns:
         bool: True if published successfully, False otherwise
     """
-    if not redis_client:
+    client = get_redis()
+    if not client:
         print("Redis not available, skipping task broadcast")
         return False
 
+    started = time.perf_counter()
     try:
         task_json = json.dumps(task_data)
 
         # Publish to general tasks channel
-        redis_client.publish("tasks:new", task_json)
+        client.publish("tasks:new", task_json)
 
         # Publish to capability-specific channels
         capabilities = task_data.get("required_capabilities", [])
         for cap in capabilities:
-            redis_client.publish(f"tasks:{cap}", task_json)
+            client.publish(f"tasks:{cap}", task_json)
 
+        REDIS_PUBLISH.labels("task", "ok").observe(time.perf_counter() - started)
         return True
     except Exception as e:
+        REDIS_PUBLISH.labels("task", "error").observe(time.perf_counter() - started)
         print(f"Error publishing task to Redis: {e}")
         return False
 
@@ -56,14 +120,18 @@ def publish_notification(agent_id: str, notification_data: Dict[str, Any]) -> bo
     Returns:
         bool: True if published successfully, False otherwise
     """
-    if not redis_client:
+    client = get_redis()
+    if not client:
         return False
 
+    started = time.perf_counter()
     try:
         notification_json = json.dumps(notification_data)
-        redis_client.publish(f"agent:{agent_id}:notifications", notification_json)
+        client.publish(f"agent:{agent_id}:notifications", notification_json)
+        REDIS_PUBLISH.labels("notification", "ok").observe(time.perf_counter() - started)
         return True
     except Exception as e:
+        REDIS_PUBLISH.labels("notification", "error").observe(time.perf_counter() - started)
         print(f"Error publishing notification to Redis: {e}")
         return False
 
@@ -79,11 +147,12 @@ def subscribe_to_tasks(capabilities: List[str]):
     Returns:
         Redis pubsub object or None if Redis is not available
     """
-    if not redis_client:
+    client = get_redis()
+    if not client:
         return None
 
     try:
-        pubsub = redis_client.pubsub()
+        pubsub = client.pubsub()
         channels = ["tasks:new"] + [f"tasks:{cap}" for cap in capabilities]
         pubsub.subscribe(channels)
         return pubsub
@@ -102,13 +171,173 @@ def subscribe_to_agent_notifications(agent_id: str):
     Returns:
         Redis pubsub object or None if Redis is not available
     """
-    if not redis_client:
+    client = get_redis()
+    if not client:
         return None
 
     try:
-        pubsub = redis_client.pubsub()
+        pubsub = client.pubsub()
         pubsub.subscribe(f"agent:{agent_id}:notifications")
         return pubsub
     except Exception as e:
         print(f"Error subscribing to agent notifications: {e}")
         return None
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+RESYNC = "resync"  # Event asking every worker to rebuild its caches (e.g. after a bulk import)
+
+InvalidationHandler = Callable[[str, Dict[str, Any]], None]
+
+
+class InvalidationBus:
+    """
+    Fans cache invalidations out to every worker process.
+
+    Writers publish an entity change ("agent", "task", "tables") after
+    their commit. `publish` runs the handlers registered in this process
+    right away and broadcasts the event on Redis. A listener thread in
+    every worker applies the events published by the others. Without
+    Redis the bus is in-process only, which is all a single worker needs.
+
+    Pub/sub is fire-and-forget, so when the listener loses its connection
+    it runs the resync callbacks after resubscribing. Those rebuild the
+    caches and cover whatever was missed. Publishing a "resync" event runs
+    them in every worker.
+    """
+
+    def __init__(self, channel: str = INVALIDATION_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex  # Tags our own events so the listener skips them
+        self._handlers: Dict[str, List[InvalidationHandler]] = {}
+        self._resync: List[Callable[[], None]] = []
+        self._lock = Lock()
+        self._stop = Event()
+        self._listener: Optional[Thread] = None
+        self.published = 0
+        self.received = 0
+
+    def on(self, entity: str, handler: InvalidationHandler):
+        """
+        Register `handler(entity_id, data)` for changes to an entity kind.
+        """
+        with self._lock:
+            self._handlers.setdefault(entity, []).append(handler)
+
+    def on_resync(self, callback: Callable[[], None]):
+        """
+        Register a callback that rebuilds local caches after missed events.
+        """
+        with self._lock:
+            self._resync.append(callback)
+
+    def _apply(self, entity: str, entity_id: Optional[str], data: Dict[str, Any]):
+        if entity == RESYNC:
+            self.resync()
+            return
+        with self._lock:
+            handlers = list(self._handlers.get(entity, ()))
+        for handler in handlers:
+            try:
+                handler(entity_id, data)
+            except Exception as e:
+                print(f"Error applying {entity} invalidation: {e}")
+
+    def publish(self, entity: str, entity_id: Optional[str] = None, **data: Any):
+        """
+        Apply a change locally and broadcast it to the other workers.
+
+        Args:
+            entity: Kind of entity that changed ("agent", "task", "tables"), or "resync"
+            entity_id: ID of the changed entity, if it has one
+            data: JSON-serializable details the handlers need
+        """
+        self._apply(entity, entity_id, data)
+        if not redis_available():
+            return
+
+        started = time.perf_counter()
+        try:
+            get_redis().publish(self.channel, json.dumps(
+                {"origin": self.origin, "entity": entity, "id": entity_id, "data": data}, default=str
+            ))
+            self.published += 1
+            REDIS_PUBLISH.labels("invalidation", "ok").observe(time.perf_counter() - started)
+        except Exception as e:
+            REDIS_PUBLISH.labels("invalidation", "error").observe(time.perf_counter() - started)
+            print(f"Error publishing cache invalidation to Redis: {e}")
+
+    def handle_message(self, raw: str):
+        """
+        Apply one event received from the channel (ignores our own).
+        """
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            return
+        if event.get("origin") == self.origin:
+            return
+        self.received += 1
+        self._apply(event.get("entity", ""), event.get("id"), event.get("data") or {})
+
+    def resync(self):
+        with self._lock:
+            callbacks = list(self._resync)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error resyncing caches: {e}")
+
+    def _listen(self):
+        connected_before = False
+        backoff = 1.0
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if connected_before:
+                    self.resync()
+                connected_before = True
+                backoff = 1.0
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.handle_message(message["data"])
+            except Exception as e:
+                print(f"Cache invalidation listener disconnected: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self) -> bool:
+        """
+        Start listening for other workers' events.
+
+        Returns:
+            bool: False if Redis is unavailable (the bus stays in-process)
+        """
+        if not redis_available():
+            return False
+        if self._listener and self._listener.is_alive():
+            return True
+        self._stop.clear()
+        self._listener = Thread(target=self._listen, name="cache-invalidation-listener", daemon=True)
+        self._listener.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._listener:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+
+# Process-wide bus; caches register their handlers on import
+invalidation_bus = InvalidationBus()
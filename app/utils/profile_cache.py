@@ -0,0 +1,136 @@
+from fastapi import Request, Response
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from threading import Lock
+from typing import Dict, Optional, Tuple, NamedTuple, Hashable
+import hashlib
+import time
+from .notifications import invalidation_bus
+
+DEFAULT_TTL_SECONDS = 60.0  # Bounds staleness of fields with no invalidation (e.g. last_active)
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    media_type: str
+    etag: str
+    last_modified: datetime
+    expires_at: float
+
+
+class ProfileCache:
+    """
+    Versioned cache of serialized agent profiles and rendered landing pages.
+
+    Every agent has a version number that is part of each cache key.
+    Invalidating an agent bumps its version, so stale entries are never
+    read again and simply age out of the LRU.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedPage]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}  # agent name -> id (names never change)
+        self._lock = Lock()
+
+    def _key(self, kind: str, agent_id: str, variant: Hashable, version: Optional[int] = None) -> Tuple:
+        if version is None:
+            version = self._versions.get(agent_id, 0)
+        return (kind, agent_id, version, variant)
+
+    def version(self, agent_id: str) -> int:
+        """
+        Current version of an agent. Read it before loading from the database
+        and pass it to `put`, so a concurrent invalidation is not overwritten.
+        """
+        with self._lock:
+            return self._versions.get(agent_id, 0)
+
+    def get(self, kind: str, agent_id: str, variant: Hashable = None) -> Optional[CachedPage]:
+        with self._lock:
+            key = self._key(kind, agent_id, variant)
+            page = self._entries.get(key)
+            if page is None:
+                return None
+            if page.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def put(self, kind: str, agent_id: str, body: bytes, media_type: str,
+            last_modified: datetime, variant: Hashable = None,
+            version: Optional[int] = None) -> CachedPage:
+        page = CachedPage(
+            body=body,
+            media_type=media_type,
+            etag='"' + hashlib.sha1(body).hexdigest() + '"',
+            last_modified=last_modified,
+            expires_at=time.monotonic() + self.ttl
+        )
+        with self._lock:
+            self._entries[self._key(kind, agent_id, variant, version)] = page
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return page
+
+    def invalidate(self, agent_id: str):
+        """
+        Drop every cached page for an agent (profile update, reputation change).
+        """
+        with self._lock:
+            self._versions[agent_id] = self._versions.get(agent_id, 0) + 1
+
+    def remember_name(self, name: str, agent_id: str):
+        with self._lock:
+            self._names[name] = agent_id
+
+    def agent_id_for_name(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._names.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._names.clear()
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cached_page_response(request: Request, page: CachedPage) -> Response:
+    """
+    Build the response for a cached page, or a bodyless 304 when the
+    client's If-None-Match already names this version.
+    """
+    headers = {
+        "ETag": page.etag,
+        "Last-Modified": _http_date(page.last_modified),
+        "Cache-Control": "no-cache"  # Always revalidate; revalidation is a cheap 304
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=page.body, media_type=page.media_type, headers=headers)
+
+
+# Process-wide cache for /agents/{id}, /agent/{id} and /u/{name}
+profile_cache = ProfileCache()
+
+
+# Any agent change (profile, reputation, task counts) drops its pages in every worker
+invalidation_bus.on("agent", lambda agent_id, data: profile_cache.invalidate(agent_id))
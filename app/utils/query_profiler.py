@@ -0,0 +1,141 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+import json
+import random
+import re
+import time
+from ..config import settings
+
+# Expanded IN lists and multi-row VALUES differ only in their number of
+# placeholders; collapse them so they count as one statement pattern.
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)|\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_log_lock = Lock()
+
+
+def normalize_statement(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestProfile:
+    """
+    Statements executed while serving one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])  # pattern -> [count, seconds]
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        entry = self.statements[normalize_statement(statement)]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def n_plus_one(self) -> List[Dict[str, Any]]:
+        """
+        Statement patterns repeated at least N_PLUS_ONE_THRESHOLD times:
+        usually a query issued once per row of an earlier result.
+        """
+        threshold = settings.query_profiler_n_plus_one
+        return [
+            {"sql": sql, "count": count, "total_ms": round(seconds * 1000, 3)}
+            for sql, (count, seconds) in sorted(self.statements.items(), key=lambda item: -item[1][0])
+            if count >= threshold
+        ]
+
+    def server_timing(self, n_plus_one: List[Dict[str, Any]]) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"app;dur={total_ms - self.db_seconds * 1000:.2f}",
+            f"total;dur={total_ms:.2f}"
+        ]
+        if n_plus_one:
+            parts.append(f'n1;desc="{len(n_plus_one)} repeated statements, worst x{n_plus_one[0]["count"]}"')
+        return ", ".join(parts)
+
+    def trace(self, method: str, path: str, status: int, n_plus_one: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "ts": datetime.utcnow().isoformat(),
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "queries": self.queries,
+            "n_plus_one": n_plus_one,
+            "statements": [
+                {"sql": sql, "count": count, "total_ms": round(seconds * 1000, 3)}
+                for sql, (count, seconds) in sorted(self.statements.items(), key=lambda item: -item[1][1])
+            ]
+        }
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("query_profile", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.get("profiler_started")
+    if profile is not None and started:
+        profile.record(statement, time.perf_counter() - started.pop())
+
+
+def write_trace(trace: Dict[str, Any]):
+    line = json.dumps(trace)
+    if not settings.query_profiler_log:
+        print(f"[query-profile] {line}")
+        return
+    with _log_lock, open(settings.query_profiler_log, "a") as f:
+        f.write(line + "\n")
+
+
+class QueryProfilerMiddleware:
+    """
+    Opt-in (QUERY_PROFILER=true) ASGI middleware: profiles the SQL of each
+    request, adds a Server-Timing header, and logs a JSON trace for a
+    sample of requests plus every request with a likely N+1 pattern.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                timing = profile.server_timing(profile.n_plus_one())
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            n_plus_one = profile.n_plus_one()
+            if n_plus_one or random.random() < settings.query_profiler_sample_rate:
+                write_trace(profile.trace(scope["method"], scope["path"], status["code"], n_plus_one))
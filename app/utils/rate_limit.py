@@ -0,0 +1,398 @@
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import ipaddress
+import json
+import math
+import time
+import anyio
+from ..config import settings
+from .notifications import get_redis, redis_available
+
+# Route classes, in the order they are matched
+READ = "read"
+WRITE = "write"
+MESSAGE = "message"
+REGISTER = "register"
+
+# Monitoring must stay reachable while the service sheds load
+EXEMPT_PATHS = {"/api/v1/stats/admission", "/api/v1/stats/startup"}
+
+# Requests whose duration is set by the client or a remote host (streamed
+# bodies, bulk export/import, webhook delivery), not by how busy we are
+UNTIMED_PATHS = {"/api/v1/export", "/api/v1/import", "/api/v1/interactions/message"}
+UNTIMED_SUFFIXES = ("/payload", "/result")
+
+MAX_MEMORY_BUCKETS = 100000
+MAX_VERIFIED_KEYS = 100000
+LATENCY_HALF_LIFE = 1.0  # Seconds for the latency average to halve when no requests finish
+
+# Checks every bucket first and takes a token from each only if all of them
+# admit the request (KEYS[i] with rate ARGV[2i-1] and burst ARGV[2i])
+_TOKEN_BUCKET_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  local state = redis.call('HMGET', KEYS[i], 't', 'ts')
+  local t = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  t = math.min(burst, t + math.max(0, now - ts) * rate)
+  if t < 1 then
+    wait = math.max(wait, (1 - t) / rate)
+  end
+  tokens[i] = t
+end
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  local t = tokens[i]
+  if wait == 0 then
+    t = t - 1
+  end
+  redis.call('HSET', KEYS[i], 't', tostring(t), 'ts', tostring(now))
+  redis.call('PEXPIRE', KEYS[i], math.ceil(burst / rate * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+Bucket = Tuple[str, float, float]  # (key, tokens per second, burst)
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse RATE_LIMITS, e.g. "read=10/40,write=2/10": per route class,
+    tokens refilled per second / bucket size (burst).
+    """
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        rate, _, burst = value.partition("/")
+        rate = float(rate)
+        limits[name.strip()] = (rate, float(burst) if burst else max(rate, 1.0))
+    return limits
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    Map a request to its rate limit class (None for pages, docs and health checks).
+    """
+    if not path.startswith("/api/") or path in EXEMPT_PATHS:
+        return None
+    if method == "POST" and path.endswith("/interactions/message"):
+        return MESSAGE
+    if method == "POST" and path.endswith("/agents/register"):
+        return REGISTER
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    return WRITE
+
+
+def key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.strip().encode()).hexdigest()[:24]
+
+
+class VerifiedKeys:
+    """
+    Digests of API keys that have passed verification in this worker
+    (most recently used kept, up to MAX_VERIFIED_KEYS).
+    """
+
+    def __init__(self):
+        self._digests: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, api_key: str):
+        digest = key_digest(api_key)
+        with self._lock:
+            self._digests[digest] = None
+            self._digests.move_to_end(digest)
+            while len(self._digests) > MAX_VERIFIED_KEYS:
+                self._digests.popitem(last=False)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._digests
+
+    def clear(self):
+        with self._lock:
+            self._digests.clear()
+
+
+verified_keys = VerifiedKeys()
+
+
+def _parse_networks(spec: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    networks = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item and item != "*":
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return networks
+
+
+class TrustedProxies:
+    """
+    The proxies (TRUSTED_PROXIES: addresses or networks, or "*" for any
+    peer) whose X-Forwarded-For header is believed.
+    """
+
+    def __init__(self, spec: str):
+        self.any_peer = "*" in (item.strip() for item in spec.split(","))
+        self.networks = _parse_networks(spec)
+
+    def __contains__(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def client_address(self, peer: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+        """
+        The caller's address. When the peer is a trusted proxy, this is the
+        rightmost X-Forwarded-For entry that isn't itself a trusted proxy:
+        entries left of it were written by the client and can be forged.
+        """
+        if not forwarded_for or not (self.any_peer or (peer and peer in self)):
+            return peer
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if hop not in self:
+                return hop
+        return hops[0] if hops else peer
+
+
+trusted_proxies = TrustedProxies(settings.trusted_proxies)
+
+
+def client_keys(klass: str, headers: Dict[str, str], client_host: Optional[str]) -> List[Tuple[str, float]]:
+    """
+    The buckets a request is charged to, with a multiplier for their size.
+
+    The API key isn't verified here (that costs a bcrypt round, which is what
+    rate limiting should protect), so a bearer token only gets its own
+    per-agent bucket once it has authenticated successfully; until then, and
+    for registration, the caller is keyed by address. Verified agents are
+    still charged to their address, with RATE_LIMIT_IP_FACTOR times the
+    allowance since several agents may share one.
+    """
+    ip_key = f"ip:{client_host or 'unknown'}"
+    authorization = headers.get("authorization", "")
+    if klass != REGISTER and authorization.lower().startswith("bearer "):
+        digest = key_digest(authorization[7:])
+        if digest in verified_keys:
+            return [(ip_key, settings.rate_limit_ip_factor), ("key:" + digest, 1.0)]
+    return [(ip_key, 1.0)]
+
+
+def timed_route(path: str) -> bool:
+    """
+    Whether a request's duration feeds the latency average used for shedding.
+    """
+    return path not in UNTIMED_PATHS and not path.endswith(UNTIMED_SUFFIXES)
+
+
+class MemoryBuckets:
+    """
+    Token buckets in process memory (one worker).
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = Lock()
+
+    def take(self, buckets: List[Bucket]) -> float:
+        """
+        Take a token from every bucket, or from none of them if any is empty.
+        Returns 0 if admitted, else seconds until all have a token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, rate, burst in buckets:
+                tokens, ts = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - ts) * rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+                levels.append(tokens)
+            for (key, _, _), tokens in zip(buckets, levels):
+                if len(self._buckets) >= MAX_MEMORY_BUCKETS and key not in self._buckets:
+                    self._prune(now)
+                self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+        return wait
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        self._buckets = {k: (t, ts) for k, (t, ts) in self._buckets.items() if now - ts < 60}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBuckets:
+    """
+    Token buckets in Redis, shared by all workers (one atomic script call per request).
+    """
+
+    def __init__(self, client):
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    def take(self, buckets: List[Bucket]) -> float:
+        args = []
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        return float(self._script(keys=[f"ratelimit:{key}" for key, _, _ in buckets], args=args))
+
+
+class AdmissionController:
+    """
+    Per-agent token buckets plus overload shedding based on requests in
+    flight and a decaying average of request latency.
+    """
+
+    def __init__(self):
+        self.limits = parse_limits(settings.rate_limits)
+        self.memory = MemoryBuckets()
+        self._redis: Optional[RedisBuckets] = None
+        self._backend_chosen = False
+        self.in_flight = 0
+        self._latency = 0.0
+        self._latency_at = time.monotonic()
+        self.limited: Counter = Counter()
+        self.shed: Counter = Counter()
+        self.backend_errors = 0
+
+    def _backend(self):
+        if not self._backend_chosen:
+            self._backend_chosen = True
+            backend = settings.rate_limit_backend
+            if backend == "redis" or (backend == "auto" and redis_available()):
+                self._redis = RedisBuckets(get_redis())
+        return self._redis
+
+    async def take(self, keys: List[Tuple[str, float]], klass: str) -> float:
+        """
+        Charge the request to its buckets (key, size factor) for the route
+        class, all or none: a rejected request doesn't drain the buckets
+        that would have admitted it.
+        """
+        rate, burst = self.limits.get(klass, (0.0, 0.0))
+        if rate <= 0:
+            return 0.0
+        buckets = [(f"{klass}:{key}", rate * factor, burst * factor) for key, factor in keys]
+        redis_buckets = self._backend()
+        if redis_buckets is not None:
+            try:
+                return await anyio.to_thread.run_sync(redis_buckets.take, buckets)
+            except Exception as e:
+                # Fail over to per-worker buckets rather than rejecting traffic
+                self.backend_errors += 1
+                print(f"Rate limit backend error, using in-process buckets: {e}")
+        return self.memory.take(buckets)
+
+    def latency(self) -> float:
+        """
+        Average request latency (seconds), decaying while no request finishes
+        so that shedding stops once the backlog has cleared.
+        """
+        idle = time.monotonic() - self._latency_at
+        return self._latency * 0.5 ** (idle / LATENCY_HALF_LIFE)
+
+    def record_latency(self, seconds: float):
+        self._latency = self.latency() * 0.9 + seconds * 0.1
+        self._latency_at = time.monotonic()
+
+    def overloaded(self, klass: str) -> Optional[str]:
+        """
+        The shedding reason if this request should be turned away, else None.
+        Reads are shed first on high latency; everything is shed when too
+        many requests are already in flight.
+        """
+        if settings.shed_max_in_flight and self.in_flight >= settings.shed_max_in_flight:
+            return "in_flight"
+        if klass == READ and settings.shed_latency_ms and self.latency() * 1000 > settings.shed_latency_ms:
+            return "latency"
+        return None
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "backend": "redis" if self._redis is not None else "memory",
+            "limits": {k: {"per_second": r, "burst": b} for k, (r, b) in self.limits.items()},
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency() * 1000, 2),
+            "rate_limited": dict(self.limited),
+            "shed": dict(self.shed),
+            "backend_errors": self.backend_errors
+        }
+
+
+admission = AdmissionController()
+
+
+def _reject(status: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+    ]
+    return {"type": "http.response.start", "status": status, "headers": headers}, \
+        {"type": "http.response.body", "body": body}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware: 429 when an agent's bucket for the route class is
+    empty, 503 when the service is overloaded, both with Retry-After.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            return await self.app(scope, receive, send)
+
+        klass = route_class(scope["method"], scope["path"])
+        if klass is None:
+            return await self.app(scope, receive, send)
+
+        reason = admission.overloaded(klass)
+        if reason:
+            admission.shed[reason] += 1
+            for message in _reject(503, 1, "Service overloaded, retry later"):
+                await send(message)
+            return
+
+        headers: Dict[str, str] = {}
+        for k, v in scope["headers"]:
+            if k in (b"authorization", b"x-forwarded-for"):
+                name = k.decode("latin-1")
+                value = v.decode("latin-1")
+                # Repeated X-Forwarded-For headers form one list, in order
+                headers[name] = f"{headers[name]},{value}" if name in headers else value
+        client = scope.get("client")
+        host = trusted_proxies.client_address(client[0] if client else None, headers.get("x-forwarded-for"))
+        wait = await admission.take(client_keys(klass, headers, host), klass)
+        if wait > 0:
+            admission.limited[klass] += 1
+            for message in _reject(429, wait, "Rate limit exceeded"):
+                await send(message)
+            return
+
+        admission.in_flight += 1
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.in_flight -= 1
+            if timed_route(scope["path"]):
+                admission.record_latency(time.monotonic() - started)
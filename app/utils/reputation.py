@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
 from datetime import datetime
 from ..models import Agent, ReputationLog
+from .leaderboard import update_agent_score
+from .reputation_history import record_rollup
+from .notifications import invalidation_bus
 
 
 def update_reputation(db: Session, agent_id: str, action: str, value_change: int, reason: str = ""):
@@ -32,8 +35,12 @@ def update_reputation(db: Session, agent_id: str, action: str, value_change: int
     )
 
     db.add(log_entry)
+    record_rollup(db, agent_id, action, value_change)
     db.commit()
 
+    update_agent_score(agent.id, agent.reputation_score, agent.capabilities)
+    invalidation_bus.publish("agent", agent.id, score=agent.reputation_score)
+
     return True
 
 
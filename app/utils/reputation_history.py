@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+from ..models import ReputationLog, ReputationLogArchive, ReputationDailyRollup
+from ..config import settings
+from ..database import dialect_insert
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def record_rollup(db: Session, agent_id: str, action: str, value_change: int,
+                  when: Optional[datetime] = None):
+    """
+    Add one reputation change to the agent's daily rollup.
+    Does not commit; call inside the same transaction as the log insert.
+
+    Args:
+        db: Database session
+        agent_id: ID of the agent
+        action: Reputation action (e.g., "task_completed")
+        value_change: Integer change to reputation
+        when: Time of the change (defaults to now)
+    """
+    day = (when or datetime.utcnow()).date()
+
+    # One statement: concurrent first changes of the day add up instead of
+    # one of them failing on the unique constraint
+    stmt = dialect_insert(db)(ReputationDailyRollup).values(
+        agent_id=agent_id, day=day, action=action, total_change=value_change, event_count=1
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["agent_id", "day", "action"],
+        set_={
+            "total_change": ReputationDailyRollup.total_change + stmt.excluded.total_change,
+            "event_count": ReputationDailyRollup.event_count + stmt.excluded.event_count
+        }
+    ))
+
+
+def get_reputation_change(db: Session, agent_id: str, days: int) -> int:
+    """
+    Total reputation change for an agent over the last `days` days (today included).
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    total = db.query(func.coalesce(func.sum(ReputationDailyRollup.total_change), 0)).filter(
+        ReputationDailyRollup.agent_id == agent_id,
+        ReputationDailyRollup.day >= since
+    ).scalar()
+    return int(total or 0)
+
+
+def get_reputation_history(db: Session, agent_id: str, days: int = 30) -> Dict[str, Any]:
+    """
+    Build a daily reputation series for an agent from the rollup table.
+
+    Args:
+        db: Database session
+        agent_id: ID of the agent
+        days: Number of days to include (today included)
+
+    Returns:
+        Dictionary with 7/30-day totals, a trend value (last 7 days minus the
+        7 days before) and one entry per day, oldest first. Days without
+        activity are included with zero change.
+    """
+    window = max(days, 30)
+    today = datetime.utcnow().date()  # Rollup days are UTC days
+    since = today - timedelta(days=window - 1)
+
+    rows = db.query(ReputationDailyRollup).filter(
+        ReputationDailyRollup.agent_id == agent_id,
+        ReputationDailyRollup.day >= since
+    ).all()
+
+    per_day: Dict[date, Dict[str, Any]] = {}
+    for row in rows:
+        entry = per_day.setdefault(row.day, {"total_change": 0, "event_count": 0, "by_action": {}})
+        entry["total_change"] += row.total_change
+        entry["event_count"] += row.event_count
+        entry["by_action"][row.action] = entry["by_action"].get(row.action, 0) + row.total_change
+
+    def window_total(start: int, length: int) -> int:
+        # Sum of days [today - start - length + 1, today - start]
+        return sum(
+            per_day.get(today - timedelta(days=offset), {}).get("total_change", 0)
+            for offset in range(start, start + length)
+        )
+
+    daily: List[Dict[str, Any]] = []
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        entry = per_day.get(day, {"total_change": 0, "event_count": 0, "by_action": {}})
+        daily.append({"day": day, **entry})
+
+    return {
+        "agent_id": agent_id,
+        "days": days,
+        "change_7d": window_total(0, 7),
+        "change_30d": window_total(0, 30),
+        "trend_7d": window_total(0, 7) - window_total(7, 7),
+        "daily": daily
+    }
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute all daily rollups from the raw and archived reputation logs.
+    Used to backfill rollups for logs written before rollups existed.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    buckets: Dict[tuple, List[int]] = {}
+    for model in (ReputationLog, ReputationLogArchive):
+        rows = db.query(
+            model.agent_id,
+            func.date(model.created_at),
+            model.action,
+            func.sum(model.value_change),
+            func.count(model.id)
+        ).group_by(model.agent_id, func.date(model.created_at), model.action).all()
+        for agent_id, day, action, total, count in rows:
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            bucket = buckets.setdefault((agent_id, day, action), [0, 0])
+            bucket[0] += int(total or 0)
+            bucket[1] += count
+
+    db.query(ReputationDailyRollup).delete()
+    db.add_all([
+        ReputationDailyRollup(agent_id=agent_id, day=day, action=action,
+                              total_change=total, event_count=count)
+        for (agent_id, day, action), (total, count) in buckets.items()
+    ])
+    db.commit()
+    return len(buckets)
+
+
+def compact_reputation_logs(db: Session, retention_days: Optional[int] = None) -> int:
+    """
+    Move raw reputation logs older than the retention window into
+    reputation_logs_archive. Rollups already account for these rows, so
+    history queries are unaffected.
+
+    Args:
+        db: Database session
+        retention_days: Days of raw logs to keep (defaults to settings)
+
+    Returns:
+        int: Number of rows archived
+    """
+    if retention_days is None:
+        retention_days = settings.reputation_log_retention_days
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    archived = 0
+    while True:
+        batch = db.query(ReputationLog).filter(
+            ReputationLog.created_at < cutoff
+        ).order_by(ReputationLog.created_at).limit(ARCHIVE_BATCH_SIZE).all()
+        if not batch:
+            break
+
+        db.add_all([
+            ReputationLogArchive(
+                id=log.id,
+                agent_id=log.agent_id,
+                action=log.action,
+                value_change=log.value_change,
+                reason=log.reason,
+                created_at=log.created_at
+            )
+            for log in batch
+        ])
+        db.query(ReputationLog).filter(
+            ReputationLog.id.in_([log.id for log in batch])
+        ).delete(synchronize_session=False)
+        db.commit()
+        archived += len(batch)
+
+    return archived
+
+
+if __name__ == "__main__":
+    # Run as a maintenance job: python -m app.utils.reputation_history [--rebuild]
+    import sys
+    from ..database import SessionLocal, init_db
+    init_db()
+    db = SessionLocal()
+    try:
+        if "--rebuild" in sys.argv:
+            print(f"✅ Rebuilt {rebuild_rollups(db)} reputation rollups")
+        print(f"✅ Archived {compact_reputation_logs(db)} reputation log rows")
+    finally:
+        db.close()
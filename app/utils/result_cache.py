@@ -0,0 +1,143 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+import hashlib
+from ..config import settings
+from ..database import dialect_insert
+from ..models import Task, TaskResultCache, CacheableTask
+from .blob_store import canonical_json, is_blob_ref, BLOB_KEY
+
+
+def task_cache_key(capabilities: Optional[Iterable[str]], payload: Optional[Dict[str, Any]]) -> str:
+    """
+    Canonical hash of a task's required capabilities (normalized, order-free)
+    and payload (key order-free).
+    """
+    caps = sorted({c.strip().lower() for c in (capabilities or []) if c and c.strip()})
+    return hashlib.sha256(canonical_json({"capabilities": caps, "payload": payload or {}})).hexdigest()
+
+
+def lookup_result(db: Session, cache_key: str) -> Optional[TaskResultCache]:
+    """
+    Get a fresh cached result and record the hit. Does not commit.
+    """
+    now = datetime.utcnow()
+    entry = db.query(TaskResultCache).filter(
+        TaskResultCache.cache_key == cache_key,
+        TaskResultCache.expires_at > now
+    ).first()
+    if entry:
+        entry.hits += 1
+        entry.last_used_at = now
+    return entry
+
+
+def remember_cacheable(db: Session, task: Task, cache_key: str):
+    """
+    Mark a task so its result is cached when it completes. Does not commit.
+    """
+    db.add(CacheableTask(task_id=task.id, cache_key=cache_key))
+
+
+def store_result(db: Session, task: Task) -> bool:
+    """
+    Cache the result of a completed task if it was posted as cacheable,
+    evicting least recently used entries if the cache grows past
+    RESULT_CACHE_MAX_BYTES. Call before committing the completion so both
+    land in one transaction.
+
+    Returns:
+        bool: True if a result was cached
+    """
+    pending = db.query(CacheableTask).filter(CacheableTask.task_id == task.id).first()
+    if not pending:
+        return False
+
+    result = task.result
+    size = result[BLOB_KEY]["size"] if is_blob_ref(result) else len(canonical_json(result))
+    now = datetime.utcnow()
+
+    # One statement, so two completions racing on the same key can't both insert
+    insert = dialect_insert(db)
+    values = dict(
+        source_task_id=task.id,
+        claimer_id=task.claimer_id,
+        result=result,
+        result_size=size,
+        created_at=now,
+        last_used_at=now,
+        expires_at=now + timedelta(seconds=settings.result_cache_ttl_seconds)
+    )
+    stmt = insert(TaskResultCache).values(cache_key=pending.cache_key, hits=0, **values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[TaskResultCache.cache_key],
+        set_={name: stmt.excluded[name] for name in values}
+    ))
+
+    db.delete(pending)
+    _evict_over_cap(db, settings.result_cache_max_bytes)
+    return True
+
+
+def forget_cacheable(db: Session, task_id: str):
+    """
+    Drop the cacheable marker of a cancelled task. Does not commit.
+    """
+    db.query(CacheableTask).filter(CacheableTask.task_id == task_id).delete(synchronize_session=False)
+
+
+def _evict_over_cap(db: Session, max_bytes: int) -> int:
+    # Least recently used entries first, until the cache fits. Does not commit.
+    total = db.query(func.coalesce(func.sum(TaskResultCache.result_size), 0)).scalar() or 0
+    if total <= max_bytes:
+        return 0
+    oldest = db.query(TaskResultCache.cache_key, TaskResultCache.result_size) \
+        .order_by(TaskResultCache.last_used_at).yield_per(500)
+    victims = []
+    for cache_key, size in oldest:
+        if total <= max_bytes:
+            break
+        victims.append(cache_key)
+        total -= size or 0
+    for i in range(0, len(victims), 500):
+        db.query(TaskResultCache).filter(
+            TaskResultCache.cache_key.in_(victims[i:i + 500])
+        ).delete(synchronize_session=False)
+    return len(victims)
+
+
+def evict_results(db: Session, max_bytes: Optional[int] = None) -> int:
+    """
+    Delete expired entries, then least recently used ones until the cache
+    fits in `max_bytes` (defaults to RESULT_CACHE_MAX_BYTES). Also drops
+    cacheable markers of tasks that ended without completing (e.g. expired).
+
+    Returns:
+        int: Number of entries evicted
+    """
+    if max_bytes is None:
+        max_bytes = settings.result_cache_max_bytes
+
+    evicted = db.query(TaskResultCache).filter(
+        TaskResultCache.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+
+    evicted += _evict_over_cap(db, max_bytes)
+
+    finished = db.query(Task.id).filter(Task.status.notin_(["open", "in_progress"]))
+    db.query(CacheableTask).filter(CacheableTask.task_id.in_(finished)).delete(synchronize_session=False)
+
+    db.commit()
+    return evicted
+
+
+if __name__ == "__main__":
+    # Run as a maintenance job: python -m app.utils.result_cache
+    from ..database import SessionLocal, init_db
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"✅ Evicted {evict_results(db)} cached task results")
+    finally:
+        db.close()
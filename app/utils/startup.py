@@ -0,0 +1,115 @@
+from fastapi import HTTPException
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import sys
+import time
+import anyio
+from ..config import settings
+
+
+class _Phase:
+    def __init__(self, name: str):
+        self.name = name
+        self.detail = ""
+        self.ms = 0.0
+
+
+class StartupReport:
+    """
+    Per-phase timings of process startup, and readiness of the caches.
+
+    The blocking part of startup (schema check) runs before the server
+    accepts connections. The cache pre-warm runs on a background thread;
+    API routes wait for it (see `require_warm`), static pages and the
+    health check don't.
+    """
+
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+        self.warm = Event()
+        self.errors: List[str] = []
+        self.import_ms: Optional[float] = None
+        self._began = time.perf_counter()
+        self._warm_ms: Optional[float] = None
+        self._lock = Lock()
+
+    def imported(self, started: float):
+        """
+        Record how long importing the app took (`started` is a perf_counter()
+        taken before the first import).
+        """
+        self.import_ms = (time.perf_counter() - started) * 1000
+        self._began = started
+        modules = sum(1 for name in sys.modules if name == "app" or name.startswith("app."))
+        with self._lock:
+            self.phases.append({"phase": "import", "ms": round(self.import_ms, 1),
+                                "detail": f"{modules} app modules", "background": False})
+        print(f"✅ import: {modules} app modules ({self.import_ms:.0f} ms)")
+
+    @contextmanager
+    def phase(self, name: str, background: bool = False) -> Iterator[_Phase]:
+        """
+        Time one startup step. Set `.detail` on the yielded phase to describe
+        what it did. A failing step is logged and recorded, not raised, so one
+        broken cache doesn't keep the service from starting.
+        """
+        phase = _Phase(name)
+        started = time.perf_counter()
+        try:
+            yield phase
+        except Exception as e:
+            phase.detail = f"failed: {e}"
+            with self._lock:
+                self.errors.append(f"{name}: {e}")
+        phase.ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.phases.append({"phase": name, "ms": round(phase.ms, 1), "detail": phase.detail,
+                                "background": background})
+        print(f"{'⚠️ ' if phase.detail.startswith('failed') else '✅'} {name}: {phase.detail} ({phase.ms:.0f} ms)")
+
+    def warm_up_in_background(self, warm_up: Callable[[], None]):
+        """
+        Run the cache pre-warm on a thread; `warm` is set when it ends, even on failure.
+        """
+        def run():
+            try:
+                warm_up()
+            finally:
+                self._warm_ms = (time.perf_counter() - self._began) * 1000
+                self.warm.set()
+                print(f"✅ Ready in {self._warm_ms:.0f} ms since import began ({self.summary()})")
+
+        Thread(target=run, name="cache-warm-up", daemon=True).start()
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = [f"{p['phase']} {p['ms']:.0f} ms" for p in self.phases]
+        return ", ".join(parts)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "warm": self.warm.is_set(),
+                "import_ms": round(self.import_ms, 1) if self.import_ms is not None else None,
+                "ready_ms": round(self._warm_ms, 1) if self._warm_ms is not None else None,
+                "phases": list(self.phases),
+                "errors": list(self.errors)
+            }
+
+
+# Process-wide report for the app's startup
+startup = StartupReport()
+
+
+async def require_warm():
+    """
+    Dependency for routes that read the in-process caches: waits for the
+    pre-warm, or answers 503 if it takes longer than `warmup_wait_seconds`.
+    Once warm it returns without leaving the event loop.
+    """
+    if startup.warm.is_set():
+        return
+    if not await anyio.to_thread.run_sync(startup.warm.wait, settings.warmup_wait_seconds):
+        raise HTTPException(status_code=503, detail="Service is starting, retry shortly",
+                            headers={"Retry-After": "1"})
@@ -0,0 +1,216 @@
+from fastapi import Request, Response
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from threading import Lock
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+import gzip
+import hashlib
+import os
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are built
+    brotli = None
+
+# The HTML and markdown pages main.py serves (paths relative to the project root)
+ASSETS = [
+    "static/for-agents.html",
+    "static/admin.html",
+    "static/log.html",
+    "static/log2.html",
+    "static/log3.html",
+    "static/log4.html",
+    "static/view.html",
+    "docs/agent-instructions.md",
+]
+
+MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".md": "text/markdown; charset=utf-8",
+}
+
+MIN_COMPRESSION_GAIN = 0.1  # Keep a compressed variant only if it saves at least 10%
+SUFFIXES = {"br": ".br", "gzip": ".gz"}  # Precompressed files written at build time
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class StaticAsset(NamedTuple):
+    media_type: str
+    last_modified: datetime
+    variants: Dict[str, Variant]  # "identity", "gzip", "br"
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _precompressed(path: str, encoding: str, source_mtime: float) -> Optional[bytes]:
+    # A build-time file is used only if it is at least as new as its source
+    candidate = path + SUFFIXES[encoding]
+    try:
+        if os.path.getmtime(candidate) >= source_mtime:
+            with open(candidate, "rb") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """
+    Parse Accept-Encoding into {coding: q}.
+    """
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], available: Iterable[str]) -> str:
+    """
+    Pick the best available encoding for an Accept-Encoding header: the
+    highest q-value wins, ties go to brotli, then gzip. Falls back to the
+    uncompressed body.
+    """
+    if not header:
+        return "identity"
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, wildcard)
+        if encoding in available and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class StaticAssetCache:
+    """
+    In-memory copies of the static pages, with precompressed variants.
+
+    Each page is read once, compressed with brotli and gzip, and kept with
+    a strong ETag per variant, so a hit is a dict lookup and no disk read
+    or compression happens per request. The variants are built at startup,
+    or taken from the .br/.gz files written at build time by
+    `python -m app.utils.static_assets`.
+    """
+
+    def __init__(self):
+        self._assets: Dict[str, StaticAsset] = {}
+        self._lock = Lock()
+
+    def load(self, path: str) -> StaticAsset:
+        """
+        Read a file and build its variants (replacing any cached copy).
+        """
+        source_mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        variants = {"identity": Variant(data, f'"{digest}"')}
+        for encoding in SUFFIXES:
+            packed = _precompressed(path, encoding, source_mtime)
+            if packed is None:
+                if encoding not in _encodings():
+                    continue
+                packed = _compress(encoding, data)
+            if len(packed) <= len(data) * (1 - MIN_COMPRESSION_GAIN):
+                # Each representation gets its own strong validator
+                variants[encoding] = Variant(packed, f'"{digest}-{SUFFIXES[encoding][1:]}"')
+
+        asset = StaticAsset(
+            media_type=MEDIA_TYPES.get(os.path.splitext(path)[1], "application/octet-stream"),
+            last_modified=datetime.fromtimestamp(int(source_mtime), tz=timezone.utc),
+            variants=variants
+        )
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    def preload(self, paths: Iterable[str] = ASSETS) -> int:
+        """
+        Load every page up front so the first visitor doesn't pay for compression.
+
+        Returns:
+            int: Number of pages loaded
+        """
+        loaded = 0
+        for path in paths:
+            try:
+                self.load(path)
+                loaded += 1
+            except OSError as e:
+                print(f"Static asset {path} not loaded: {e}")
+        return loaded
+
+    def get(self, path: str) -> StaticAsset:
+        asset = self._assets.get(path)
+        return asset if asset is not None else self.load(path)
+
+    def response(self, request: Request, path: str) -> Response:
+        """
+        Serve a page in the best encoding the client accepts, or a bodyless
+        304 when its If-None-Match already names that variant.
+        """
+        asset = self.get(path)
+        encoding = negotiate(request.headers.get("accept-encoding"), asset.variants)
+        variant = asset.variants[encoding]
+
+        headers = {
+            "ETag": variant.etag,
+            "Last-Modified": _http_date(asset.last_modified),
+            "Cache-Control": f"public, max-age={settings.static_max_age_seconds}, "
+                             f"stale-while-revalidate={settings.static_stale_seconds}",
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or any(
+                tag.strip().removeprefix("W/") == variant.etag for tag in if_none_match.split(","))):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=variant.body, media_type=asset.media_type, headers=headers)
+
+
+# Process-wide cache for the pages in ASSETS
+static_assets = StaticAssetCache()
+
+
+if __name__ == "__main__":
+    # Build step: write .br/.gz next to each page so startup only reads them
+    for path in ASSETS:
+        with open(path, "rb") as f:
+            data = f.read()
+        for encoding in _encodings():
+            with open(path + SUFFIXES[encoding], "wb") as f:
+                f.write(_compress(encoding, data))
+    print(f"✅ Precompressed {len(ASSETS)} static assets ({', '.join(_encodings())})")
@@ -0,0 +1,181 @@
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional
+from ..database import dialect_insert
+from ..models import Agent, Task, Interaction, InteractionArchiveBlock, StatCounter
+
+# Counter names
+TASKS_TOTAL = "tasks.total"
+TASK_STATUS = "tasks.status."          # + status
+OPEN_TASK_CAP = "open_tasks.cap."      # + capability
+AGENTS_TOTAL = "agents.total"
+AGENTS_ACTIVE = "agents.active"
+INTERACTIONS_TOTAL = "interactions.total"
+INTERACTION_STATUS = "interactions.status."  # + status
+INTERACTIONS_DAY = "interactions.day."       # + YYYY-MM-DD
+
+
+def _capabilities(values: Optional[Iterable[str]]) -> set:
+    return {c.strip().lower() for c in (values or []) if c and c.strip()}
+
+
+def _old_value(obj, attr: str):
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(obj, attr)
+
+
+def _task_deltas(deltas: Counter, status: Optional[str], capabilities, sign: int):
+    deltas[TASK_STATUS + (status or "open")] += sign
+    if (status or "open") == "open":
+        for cap in _capabilities(capabilities):
+            deltas[OPEN_TASK_CAP + cap] += sign
+
+
+def _collect_deltas(session: Session) -> Counter:
+    deltas: Counter = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            deltas[TASKS_TOTAL] += 1
+            _task_deltas(deltas, obj.status, obj.required_capabilities, 1)
+        elif isinstance(obj, Agent):
+            deltas[AGENTS_TOTAL] += 1
+            if obj.is_active is not False:
+                deltas[AGENTS_ACTIVE] += 1
+        elif isinstance(obj, Interaction):
+            deltas[INTERACTIONS_TOTAL] += 1
+            deltas[INTERACTION_STATUS + (obj.status or "sent")] += 1
+            deltas[INTERACTIONS_DAY + (obj.created_at or datetime.utcnow()).date().isoformat()] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            status_changed = get_history(obj, "status").has_changes()
+            caps_changed = get_history(obj, "required_capabilities").has_changes()
+            if status_changed or caps_changed:
+                _task_deltas(deltas, _old_value(obj, "status"), _old_value(obj, "required_capabilities"), -1)
+                _task_deltas(deltas, obj.status, obj.required_capabilities, 1)
+        elif isinstance(obj, Interaction):
+            if get_history(obj, "status").has_changes():
+                deltas[INTERACTION_STATUS + (_old_value(obj, "status") or "sent")] -= 1
+                deltas[INTERACTION_STATUS + (obj.status or "sent")] += 1
+        elif isinstance(obj, Agent):
+            if get_history(obj, "is_active").has_changes():
+                deltas[AGENTS_ACTIVE] += 1 if obj.is_active else -1
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            deltas[TASKS_TOTAL] -= 1
+            _task_deltas(deltas, _old_value(obj, "status"), _old_value(obj, "required_capabilities"), -1)
+        elif isinstance(obj, Agent):
+            deltas[AGENTS_TOTAL] -= 1
+            if _old_value(obj, "is_active") is not False:
+                deltas[AGENTS_ACTIVE] -= 1
+        elif isinstance(obj, Interaction):
+            deltas[INTERACTIONS_TOTAL] -= 1
+            deltas[INTERACTION_STATUS + (_old_value(obj, "status") or "sent")] -= 1
+
+    return Counter({name: delta for name, delta in deltas.items() if delta})
+
+
+def apply_deltas(connection, deltas: Dict[str, int]):
+    """
+    Add deltas to counters on the given connection (inside its transaction),
+    creating missing ones, in a single INSERT ... ON CONFLICT DO UPDATE.
+    """
+    if not deltas:
+        return
+    # Sorted, so concurrent writers lock the counter rows in the same order
+    stmt = dialect_insert(connection)(StatCounter).values(
+        [{"name": name, "value": delta} for name, delta in sorted(deltas.items())]
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[StatCounter.name],
+        set_={"value": StatCounter.value + stmt.excluded.value}
+    ))
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_counters(session: Session, flush_context, instances):
+    # Runs inside the flush's transaction, so counters commit or roll back
+    # together with the state change they describe.
+    deltas = _collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild_stats(db: Session) -> int:
+    """
+    Recompute every counter with COUNT queries (first run, or after a bulk import).
+
+    Returns:
+        int: Number of counters written
+    """
+    counters: Counter = Counter()
+
+    for status, count in db.query(Task.status, func.count(Task.id)).group_by(Task.status):
+        counters[TASK_STATUS + (status or "open")] += count
+        counters[TASKS_TOTAL] += count
+    for (capabilities,) in db.query(Task.required_capabilities).filter(Task.status == "open").yield_per(1000):
+        for cap in _capabilities(capabilities):
+            counters[OPEN_TASK_CAP + cap] += 1
+
+    counters[AGENTS_TOTAL] = db.query(func.count(Agent.id)).scalar() or 0
+    counters[AGENTS_ACTIVE] = db.query(func.count(Agent.id)).filter(Agent.is_active == True).scalar() or 0
+
+    for status, count in db.query(Interaction.status, func.count(Interaction.id)).group_by(Interaction.status):
+        counters[INTERACTION_STATUS + (status or "sent")] += count
+        counters[INTERACTIONS_TOTAL] += count
+    day = func.date(Interaction.created_at)
+    for created_day, count in db.query(day, func.count(Interaction.id)).group_by(day):
+        if created_day is not None:
+            counters[INTERACTIONS_DAY + str(created_day)] += count
+    # Archived interactions still count; segments are partitioned by day
+    blocks = db.query(InteractionArchiveBlock.min_created_at, InteractionArchiveBlock.row_count,
+                      InteractionArchiveBlock.status_counts)
+    for created_at, count, statuses in blocks.yield_per(1000):
+        for status, status_count in (statuses or {}).items():
+            counters[INTERACTION_STATUS + status] += status_count
+        counters[INTERACTIONS_TOTAL] += count
+        counters[INTERACTIONS_DAY + created_at.date().isoformat()] += count
+
+    db.query(StatCounter).delete()
+    db.add_all([StatCounter(name=name, value=value) for name, value in counters.items()])
+    db.commit()
+    return len(counters)
+
+
+def _group(counters: Dict[str, int], prefix: str) -> Dict[str, int]:
+    return {name[len(prefix):]: value for name, value in counters.items() if name.startswith(prefix) and value}
+
+
+def get_stats(db: Session) -> Dict[str, Any]:
+    """
+    Platform totals read from the counter table, without COUNT(*) over the data tables.
+    """
+    counters = dict(db.execute(select(StatCounter.name, StatCounter.value)).all())
+    today = datetime.utcnow().date().isoformat()
+
+    return {
+        "tasks": {
+            "total": counters.get(TASKS_TOTAL, 0),
+            "by_status": _group(counters, TASK_STATUS)
+        },
+        "agents": {
+            "total": counters.get(AGENTS_TOTAL, 0),
+            "active": counters.get(AGENTS_ACTIVE, 0)
+        },
+        "interactions": {
+            "total": counters.get(INTERACTIONS_TOTAL, 0),
+            "today": counters.get(INTERACTIONS_DAY + today, 0),
+            "by_status": _group(counters, INTERACTION_STATUS),
+            "by_day": dict(sorted(_group(counters, INTERACTIONS_DAY).items())[-30:])
+        },
+        "open_tasks_by_capability": dict(
+            sorted(_group(counters, OPEN_TASK_CAP).items(), key=lambda item: -item[1])
+        )
+    }
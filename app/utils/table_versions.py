@@ -0,0 +1,145 @@
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import uuid
+from ..config import settings
+from .fast_json import NDJSON_MEDIA_TYPE, wants_ndjson
+from .notifications import get_redis, invalidation_bus, redis_available
+
+# With Redis, versions live in one hash shared by all workers, so every
+# worker computes the same ETag for the same data. Its generation field is
+# set by whichever worker finds it missing, so counters that restart at 0
+# (e.g. after a Redis flush) never reproduce an ETag a client has seen.
+VERSIONS_KEY = "table_versions"
+GENERATION_FIELD = "_generation"
+
+# Without Redis (one worker) the counters are local; the epoch changes on
+# every process start for the same reason
+_epoch = uuid.uuid4().hex[:8]
+
+_versions: Dict[str, int] = {}
+_lock = Lock()
+
+
+def _bump_shared(tables: Iterable[str]):
+    if not redis_available():
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for table in tables:
+            pipe.hincrby(VERSIONS_KEY, table, 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"Error bumping table versions in Redis: {e}")
+
+
+def _shared_versions(tables: List[str]) -> Optional[List[str]]:
+    # [generation, version per table], or None to fall back to local counters
+    if not redis_available():
+        return None
+    try:
+        client = get_redis()
+        values = client.hmget(VERSIONS_KEY, [GENERATION_FIELD] + tables)
+        if values[0] is None:
+            client.hsetnx(VERSIONS_KEY, GENERATION_FIELD, uuid.uuid4().hex[:8])
+            values[0] = client.hget(VERSIONS_KEY, GENERATION_FIELD)
+        return [values[0]] + [value or "0" for value in values[1:]]
+    except Exception as e:
+        print(f"Error reading table versions from Redis: {e}")
+        return None
+
+
+def bump_version(*tables: str, shared: bool = False):
+    """
+    Record that rows in these tables changed, in this worker's counters
+    (and in the shared ones if `shared`; do that once per change, not in
+    every worker).
+    """
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+    if shared:
+        _bump_shared(tables)
+
+
+def table_version(table: str) -> int:
+    return _versions.get(table, 0)
+
+
+def tables_changed(*tables: str):
+    """
+    Announce a committed write: bumps the shared counters once, and every
+    worker's local counters through the invalidation bus.
+    """
+    _bump_shared(tables)
+    invalidation_bus.publish("tables", tables=sorted(tables))
+
+
+# Every committed ORM write bumps the counters of the tables it touched.
+# (The bulk last_active flush writes through Core and deliberately doesn't.)
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session: Session, flush_context):
+    written = session.info.setdefault("written_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            written.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_tables(session: Session):
+    written = session.info.pop("written_tables", None)
+    if written:
+        tables_changed(*written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session: Session):
+    session.info.pop("written_tables", None)
+
+
+invalidation_bus.on("tables", lambda _, data: bump_version(*data.get("tables", ())))
+
+
+def list_etag(request: Request, tables: Iterable[str]) -> str:
+    """
+    ETag for a list response: the versions of the tables it reads, the
+    deploy id, its query parameters and the negotiated media type (JSON or
+    NDJSON, see etag_headers). Computed before querying, so a write racing
+    with the request can only make the ETag older than the body, never newer.
+    """
+    tables = sorted(tables)
+    shared = _shared_versions(tables)
+    if shared is not None:
+        generation, counts = shared[0], shared[1:]
+    else:
+        generation, counts = _epoch, [table_version(table) for table in tables]
+    versions = "-".join(f"{table}.{count}" for table, count in zip(tables, counts))
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    media_type = NDJSON_MEDIA_TYPE if wants_ndjson(request) else "application/json"
+    digest = hashlib.sha1(
+        f"{settings.deploy_id}\n{media_type}\n{request.url.path}?{params}".encode()
+    ).hexdigest()[:12]
+    return f'W/"{generation}-{versions}-{digest}"'
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """
+    Validator headers for a list response (200 or 304). Its representation
+    depends on Accept, and so does its ETag.
+    """
+    return {"ETag": etag, "Vary": "Accept"}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    A 304 response if the client's If-None-Match matches `etag`, else None.
+    """
+    header = request.headers.get("if-none-match")
+    if header and any(tag.strip() == etag for tag in header.split(",")):
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
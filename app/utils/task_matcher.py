@@ -0,0 +1,221 @@
+from sqlalchemy.orm import Session
+from bisect import insort, bisect_left
+from datetime import datetime
+from heapq import nlargest
+from threading import Lock
+from typing import Dict, List, Tuple, Iterable, Optional, NamedTuple, Callable, Any
+import math
+from ..models import Task
+from .capability_index import normalize_capability
+from .notifications import invalidation_bus
+
+CANDIDATE_DEPTH = 200   # Tasks taken from the head of each capability list
+OPEN_TO_ALL = ""        # Bucket for tasks that require no capability
+
+# Scoring weights
+OVERLAP_WEIGHT = 10.0   # Share of the task's required capabilities the agent has
+PRIORITY_WEIGHT = 1.0   # Per point of Task.priority
+REPUTATION_WEIGHT = 1.0  # Per log-unit of requester reputation
+AGE_WEIGHT = 2.0        # Reached after AGE_HORIZON_HOURS, so old tasks don't starve
+AGE_HORIZON_HOURS = 24.0
+
+
+class _OpenTask(NamedTuple):
+    task_id: str
+    requester_id: str
+    priority: int
+    created_at: datetime
+    expires_at: Optional[datetime]
+    capabilities: frozenset
+
+
+def _sort_key(task: _OpenTask) -> Tuple[int, datetime, str]:
+    # Static part of the ranking: highest priority first, then oldest first
+    return (-task.priority, task.created_at, task.task_id)
+
+
+class TaskMatcher:
+    """
+    Per-capability candidate lists of open tasks.
+
+    Each list is kept sorted by priority then age, so a recommendation only
+    scores the heads of the lists for the caller's capabilities instead of
+    the whole task board. Tasks enter on creation and leave when claimed,
+    completed or cancelled.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, _OpenTask] = {}
+        self._lists: Dict[str, List[Tuple[int, datetime, str]]] = {}
+        self._lock = Lock()
+
+    def _buckets(self, task: _OpenTask) -> Iterable[str]:
+        return task.capabilities or (OPEN_TO_ALL,)
+
+    def _add_locked(self, task: _OpenTask):
+        self._remove_locked(task.task_id)
+        self._tasks[task.task_id] = task
+        key = _sort_key(task)
+        for cap in self._buckets(task):
+            insort(self._lists.setdefault(cap, []), key)
+
+    def _remove_locked(self, task_id: str):
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        key = _sort_key(task)
+        for cap in self._buckets(task):
+            entries = self._lists.get(cap)
+            if not entries:
+                continue
+            i = bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+            if not entries:
+                del self._lists[cap]
+
+    @staticmethod
+    def _from_task(task: Task) -> _OpenTask:
+        return _OpenTask(
+            task_id=task.id,
+            requester_id=task.requester_id,
+            priority=task.priority or 0,
+            created_at=task.created_at or datetime.utcnow(),
+            expires_at=task.expires_at,
+            capabilities=frozenset(
+                normalize_capability(c) for c in (task.required_capabilities or []) if c and c.strip()
+            )
+        )
+
+    def task_opened(self, task: Task):
+        with self._lock:
+            self._add_locked(self._from_task(task))
+
+    def task_closed(self, task_id: str):
+        """
+        Drop a task that was claimed, completed or cancelled.
+        """
+        with self._lock:
+            self._remove_locked(task_id)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Reload all open tasks from the database.
+
+        Returns:
+            int: Number of open tasks indexed
+        """
+        rows = db.query(
+            Task.id, Task.requester_id, Task.priority, Task.created_at,
+            Task.expires_at, Task.required_capabilities
+        ).filter(Task.status == "open").yield_per(1000)
+
+        tasks: Dict[str, _OpenTask] = {}
+        lists: Dict[str, List[Tuple[int, datetime, str]]] = {}
+        for task_id, requester_id, priority, created_at, expires_at, capabilities in rows:
+            task = _OpenTask(
+                task_id, requester_id, priority or 0, created_at or datetime.utcnow(), expires_at,
+                frozenset(normalize_capability(c) for c in (capabilities or []) if c and c.strip())
+            )
+            tasks[task_id] = task
+            for cap in self._buckets(task):
+                lists.setdefault(cap, []).append(_sort_key(task))
+        for entries in lists.values():
+            entries.sort()
+
+        with self._lock:
+            self._tasks = tasks
+            self._lists = lists
+        return len(tasks)
+
+    def recommend(self, agent_id: str, capabilities: Iterable[str],
+                  requester_score: Callable[[str], int], limit: int = 10,
+                  now: Optional[datetime] = None) -> List[Tuple[str, float, List[str]]]:
+        """
+        Rank open tasks for an agent.
+
+        Score = OVERLAP_WEIGHT * (matched / required capabilities)
+              + PRIORITY_WEIGHT * priority
+              + REPUTATION_WEIGHT * log1p(requester reputation)
+              + AGE_WEIGHT * min(age / AGE_HORIZON_HOURS, 1)
+
+        Tasks requiring no capability are candidates for everyone (overlap 0).
+        The agent's own tasks and expired tasks are skipped (expired ones
+        are dropped from the lists).
+
+        Args:
+            agent_id: ID of the agent asking for work
+            capabilities: The agent's capabilities
+            requester_score: Returns the current reputation of a requester
+            limit: Max number of results
+            now: Reference time for age and expiry (defaults to now)
+
+        Returns:
+            List of (task_id, score, matched_capabilities), best first
+        """
+        now = now or datetime.utcnow()
+        caps = {normalize_capability(c) for c in capabilities if c and c.strip()}
+
+        with self._lock:
+            # Walk each list past the agent's own and expired tasks until it
+            # yields CANDIDATE_DEPTH usable ones; expired tasks can never be
+            # recommended again, so they are dropped on the way
+            candidate_ids = set()
+            expired = []
+            for cap in caps | {OPEN_TO_ALL}:
+                taken = 0
+                for _, _, task_id in self._lists.get(cap, ()):
+                    if taken >= CANDIDATE_DEPTH:
+                        break
+                    task = self._tasks[task_id]
+                    if task.expires_at and task.expires_at <= now:
+                        expired.append(task_id)
+                    elif task.requester_id != agent_id:
+                        candidate_ids.add(task_id)
+                        taken += 1
+            for task_id in expired:
+                self._remove_locked(task_id)
+            candidates = [self._tasks[task_id] for task_id in candidate_ids]
+
+        scored = []
+        for task in candidates:
+            matched = sorted(task.capabilities & caps)
+            overlap = len(matched) / len(task.capabilities) if task.capabilities else 0.0
+            age_hours = max((now - task.created_at).total_seconds(), 0) / 3600
+            score = (
+                OVERLAP_WEIGHT * overlap
+                + PRIORITY_WEIGHT * task.priority
+                + REPUTATION_WEIGHT * math.log1p(max(requester_score(task.requester_id), 0))
+                + AGE_WEIGHT * min(age_hours / AGE_HORIZON_HOURS, 1.0)
+            )
+            scored.append((task.task_id, round(score, 4), matched))
+
+        return nlargest(limit, scored, key=lambda item: (item[1], item[0]))
+
+
+# Process-wide matcher used by the tasks router
+task_matcher = TaskMatcher()
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    # Local events carry datetimes; events from other workers carry their JSON strings
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _task_changed(task_id: str, data: Dict[str, Any]):
+    if data.get("event") == "closed":
+        task_matcher.task_closed(task_id)
+    elif data.get("event") == "created" and data.get("status") == "open":
+        task_matcher.task_opened(Task(
+            id=task_id,
+            requester_id=data.get("requester_id"),
+            priority=data.get("priority"),
+            created_at=_as_datetime(data.get("created_at")),
+            expires_at=_as_datetime(data.get("expires_at")),
+            required_capabilities=data.get("capabilities")
+        ))
+
+
+invalidation_bus.on("task", _task_changed)
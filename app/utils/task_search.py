@@ -0,0 +1,224 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import html
+import re
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+# Highlight delimiters the database puts in snippets; swapped for the tags
+# once the task text around them has been HTML-escaped
+_HIGHLIGHT_OPEN = "\x02"
+_HIGHLIGHT_CLOSE = "\x03"
+TITLE_WEIGHT = 10.0  # A hit in the title counts this many times a hit in the description
+
+# Which implementation init_search() selected: "fts5", "postgres" or "like"
+_backend = "like"
+
+# The index itself is created by migration 0004:
+# - SQLite: an external-content FTS5 table keyed on tasks.rowid, kept in sync
+#   by triggers. tasks has a string primary key, so VACUUM may renumber its
+#   rowids: vacuum with vacuum_database(), which rebuilds the index afterwards.
+# - Postgres: an expression GIN index, so no extra column or trigger is needed.
+
+# The insert trigger as migration 0004 creates it; pause_search_index drops
+# it for bulk loads and rebuild_search_index puts it back
+_SQLITE_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.rowid, new.title, coalesce(new.description, ''));
+    END
+"""
+
+_POSTGRES_TSVECTOR = "to_tsvector('english', coalesce(tasks.title, '') || ' ' || coalesce(tasks.description, ''))"
+
+
+def init_search(engine: Engine) -> str:
+    """
+    Pick the search implementation for the migrated schema: FTS5 when the
+    tasks_fts table exists, LIKE matching when SQLite lacks FTS5.
+
+    Returns:
+        str: The backend in use ("fts5", "postgres" or "like")
+    """
+    global _backend
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        _backend = "postgres"
+    elif dialect == "sqlite":
+        with engine.connect() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+            )).first()
+        _backend = "fts5" if exists else "like"
+        if not exists:
+            print("Warning: full-text search unavailable (no FTS5), using LIKE matching")
+    else:
+        _backend = "like"
+    return _backend
+
+
+def pause_search_index(db: Session):
+    """
+    Stop indexing tasks as they are inserted (drops the FTS5 insert trigger),
+    for a bulk load. `rebuild_search_index` restores the trigger and indexes
+    everything in one pass, which is much faster than a trigger per row.
+    """
+    if _backend == "fts5":
+        db.execute(text("DROP TRIGGER IF EXISTS tasks_fts_ai"))
+        db.commit()
+
+
+def rebuild_search_index(db: Session):
+    """
+    Rebuild the FTS5 index from the tasks table (e.g. after a bulk load).
+    """
+    if _backend == "fts5":
+        db.execute(text(_SQLITE_INSERT_TRIGGER))  # Dropped by pause_search_index
+        db.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+        db.commit()
+
+
+def vacuum_database(engine: Engine, db: Session):
+    """
+    VACUUM a SQLite database, then rebuild the search index: VACUUM can
+    change the rowids of tables without an INTEGER primary key, which
+    would leave the index pointing at the wrong tasks.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+    rebuild_search_index(db)
+
+
+def _highlight(snippet: str) -> str:
+    escaped = html.escape(snippet)
+    return escaped.replace(_HIGHLIGHT_OPEN, SNIPPET_OPEN).replace(_HIGHLIGHT_CLOSE, SNIPPET_CLOSE)
+
+
+def _terms(q: str) -> List[str]:
+    return [t for t in re.split(r"\s+", q.strip()) if t]
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input can't use (or break) FTS5 query syntax;
+    # the last term is a prefix match to support search-as-you-type.
+    quoted = ['"' + t.replace('"', '""') + '"' for t in _terms(q)]
+    if quoted:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _capability_filter(dialect: str, capabilities: List[str], params: dict) -> str:
+    names = []
+    for i, cap in enumerate(capabilities):
+        params[f"cap{i}"] = cap
+        names.append(f":cap{i}")
+    if dialect == "postgresql":
+        return (
+            "EXISTS (SELECT 1 FROM json_array_elements_text(tasks.required_capabilities::json) AS c "
+            f"WHERE lower(c) IN ({', '.join(names)}))"
+        )
+    return (
+        "EXISTS (SELECT 1 FROM json_each(tasks.required_capabilities) "
+        f"WHERE lower(json_each.value) IN ({', '.join(names)}))"
+    )
+
+
+def search_tasks(db: Session, q: str, status: Optional[str] = None,
+                 capabilities: Optional[List[str]] = None,
+                 limit: int = 25) -> List[Tuple[str, float, str]]:
+    """
+    Full-text search over task titles and descriptions.
+
+    Args:
+        db: Database session
+        q: Search text; all terms must match, the last one as a prefix
+        status: Only tasks with this status
+        capabilities: Only tasks requiring at least one of these (lowercase)
+        limit: Max number of results
+
+    Returns:
+        List of (task_id, rank, snippet), best match first. Higher rank is
+        better; the snippet is HTML-escaped, with matched terms wrapped in
+        <mark> tags.
+    """
+    if not _terms(q):
+        return []
+
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit, "open": _HIGHLIGHT_OPEN, "close": _HIGHLIGHT_CLOSE}
+    filters = []
+    if status:
+        filters.append("tasks.status = :status")
+        params["status"] = status
+    if capabilities:
+        filters.append(_capability_filter(dialect, capabilities, params))
+
+    if _backend == "fts5":
+        params["q"] = _fts5_query(q)
+        sql = f"""
+            SELECT tasks.id,
+                   -bm25(tasks_fts, {TITLE_WEIGHT}, 1.0) AS rank,
+                   snippet(tasks_fts, -1, :open, :close, '…', 16) AS snippet
+            FROM tasks_fts JOIN tasks ON tasks.rowid = tasks_fts.rowid
+            WHERE tasks_fts MATCH :q {''.join(' AND ' + f for f in filters)}
+            ORDER BY bm25(tasks_fts, {TITLE_WEIGHT}, 1.0)
+            LIMIT :limit
+        """
+    elif _backend == "postgres":
+        params["q"] = q
+        params["headline"] = f"StartSel={_HIGHLIGHT_OPEN}, StopSel={_HIGHLIGHT_CLOSE}, MaxWords=16"
+        sql = f"""
+            SELECT tasks.id,
+                   ts_rank_cd({_POSTGRES_TSVECTOR}, websearch_to_tsquery('english', :q)) AS rank,
+                   ts_headline('english', coalesce(tasks.title, '') || ' ' || coalesce(tasks.description, ''),
+                               websearch_to_tsquery('english', :q),
+                               :headline) AS snippet
+            FROM tasks
+            WHERE {_POSTGRES_TSVECTOR} @@ websearch_to_tsquery('english', :q)
+                  {''.join(' AND ' + f for f in filters)}
+            ORDER BY rank DESC
+            LIMIT :limit
+        """
+    else:
+        like_filters = []
+        for i, term in enumerate(_terms(q)):
+            # Match the term literally: % and _ in it are not wildcards
+            escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params[f"t{i}"] = f"%{escaped}%"
+            like_filters.append(
+                f"(lower(tasks.title) LIKE :t{i} ESCAPE '\\' "
+                f"OR lower(coalesce(tasks.description, '')) LIKE :t{i} ESCAPE '\\')"
+            )
+        sql = f"""
+            SELECT tasks.id, 0.0 AS rank, tasks.title AS snippet
+            FROM tasks
+            WHERE {' AND '.join(like_filters + filters)}
+            ORDER BY tasks.priority DESC, tasks.created_at DESC
+            LIMIT :limit
+        """
+
+    rows = db.execute(text(sql), params).all()
+    return [(task_id, float(rank or 0.0), _highlight(snippet or "")) for task_id, rank, snippet in rows]
+
+
+if __name__ == "__main__":
+    # Run as a maintenance job: python -m app.utils.task_search [--vacuum]
+    import sys
+    from ..database import SessionLocal, engine, init_db
+    init_db()
+    init_search(engine)
+    db = SessionLocal()
+    try:
+        if "--vacuum" in sys.argv:
+            vacuum_database(engine, db)
+            print("✅ Vacuumed the database and rebuilt the task search index")
+        else:
+            rebuild_search_index(db)
+            print("✅ Rebuilt the task search index")
+    finally:
+        db.close()
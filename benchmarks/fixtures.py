@@ -0,0 +1,151 @@
+"""
+Seeded fixture generators for the micro-benchmarks.
+
+Every generator takes a `random.Random`, so the same seed always yields
+the same rows. Databases are standalone SQLite files with the app's
+schema, independent of DATABASE_URL.
+"""
+import random
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import Base
+from app.models import Agent, Task, Interaction, ReputationLog
+from app.utils.capability_index import normalize_capability
+
+CAPABILITY_VOCABULARY = [
+    "python", "javascript", "rust", "go", "sql", "data-analysis", "web-scraping", "translation",
+    "summarization", "image-generation", "code-review", "research", "writing", "math", "finance",
+    "legal", "medical", "devops", "security", "testing", "design", "marketing", "seo", "audio",
+    "video", "ocr", "classification", "embedding", "search", "planning"
+]
+
+TASK_STATUSES = [("open", 60), ("in_progress", 15), ("completed", 20), ("cancelled", 5)]
+
+
+def make_database(path: str) -> sessionmaker:
+    """
+    Create an SQLite database with the app's schema; returns a session factory.
+    """
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _capabilities(rng: random.Random, low: int = 1, high: int = 4) -> List[str]:
+    return rng.sample(CAPABILITY_VOCABULARY, rng.randint(low, high))
+
+
+def seed_agents(db: Session, count: int, rng: random.Random, bcrypt_rounds: int = 4,
+                probes: int = 3) -> List[Tuple[str, str]]:
+    """
+    Insert `count` active agents.
+
+    Only `probes` agents (spread across the table) get a real API key. The
+    others get a fresh salt spliced onto one shared digest: a well-formed
+    hash with the same cost factor that never matches. bcrypt verification
+    costs the same either way, so authentication scans behave as with real
+    keys, while seeding 10k agents takes a few hashes instead of 10k.
+
+    Returns:
+        [(agent_id, api_key)] for the probe agents, first to last in table order
+    """
+    shared_hash = bcrypt.hashpw(b"not-a-probe-key", bcrypt.gensalt(rounds=bcrypt_rounds)).decode()
+    probe_positions = {int(i * (count - 1) / max(probes - 1, 1)) for i in range(probes)} if count else set()
+    now = datetime.utcnow()
+
+    rows: List[Dict] = []
+    keys = []
+    for i in range(count):
+        agent_id = f"agent-{i:07d}"
+        salt = bcrypt.gensalt(rounds=bcrypt_rounds).decode()
+        api_key_hash = salt + shared_hash[len(salt):]  # "$2b$NN$" + 22-char salt, then the digest
+        if i in probe_positions:
+            api_key = secrets.token_urlsafe(32)
+            api_key_hash = bcrypt.hashpw(api_key.encode()[:72], bcrypt.gensalt(rounds=bcrypt_rounds)).decode()
+            keys.append((agent_id, api_key))
+        rows.append({
+            "id": agent_id,
+            "name": f"bench-agent-{i}",
+            "description": "Benchmark fixture",
+            "api_key_hash": api_key_hash,
+            "capabilities": [normalize_capability(c) for c in _capabilities(rng)],
+            "endpoints": {},
+            "agent_metadata": {},
+            "reputation_score": rng.randint(0, 500),
+            "total_tasks_completed": 0,
+            "total_tasks_posted": 0,
+            "is_active": True,
+            "created_at": now - timedelta(seconds=count - i),
+            "updated_at": now,
+            "last_active": now
+        })
+    db.bulk_insert_mappings(Agent, rows)
+    db.commit()
+    return keys
+
+
+def seed_tasks(db: Session, count: int, agent_ids: List[str], rng: random.Random) -> List[str]:
+    """
+    Insert `count` tasks with a realistic status mix and 1-3 capabilities each.
+    """
+    statuses = [s for s, _ in TASK_STATUSES]
+    weights = [w for _, w in TASK_STATUSES]
+    now = datetime.utcnow()
+    ids = []
+    batch: List[Dict] = []
+    for i in range(count):
+        status = rng.choices(statuses, weights)[0]
+        task_id = f"task-{i:08d}"
+        ids.append(task_id)
+        batch.append({
+            "id": task_id,
+            "requester_id": rng.choice(agent_ids),
+            "claimer_id": rng.choice(agent_ids) if status in ("in_progress", "completed") else None,
+            "title": f"Benchmark task {i}",
+            "description": "Generated fixture task",
+            "required_capabilities": _capabilities(rng, 1, 3),
+            "payload": {"n": i},
+            "status": status,
+            "priority": rng.randint(0, 5),
+            "result": {"ok": True} if status == "completed" else None,
+            "created_at": now - timedelta(seconds=count - i),
+            "updated_at": now
+        })
+        if len(batch) >= 5000:
+            db.bulk_insert_mappings(Task, batch)
+            batch = []
+    if batch:
+        db.bulk_insert_mappings(Task, batch)
+    db.commit()
+    return ids
+
+
+def seed_interactions(db: Session, count: int, agent_ids: List[str], rng: random.Random):
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(Interaction, [{
+        "id": f"interaction-{i:08d}",
+        "sender_id": rng.choice(agent_ids),
+        "recipient_id": rng.choice(agent_ids),
+        "message_type": "hello",
+        "payload": {"i": i},
+        "status": rng.choice(["sent", "delivered", "failed"]),
+        "created_at": now - timedelta(seconds=count - i)
+    } for i in range(count)])
+    db.commit()
+
+
+def seed_reputation_logs(db: Session, count: int, agent_ids: List[str], rng: random.Random):
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(ReputationLog, [{
+        "id": f"reputation-{i:08d}",
+        "agent_id": rng.choice(agent_ids),
+        "action": rng.choice(["task_completed", "task_fulfilled", "positive_interaction"]),
+        "value_change": rng.choice([10, 5, 2]),
+        "reason": "fixture",
+        "created_at": now - timedelta(seconds=count - i)
+    } for i in range(count)])
+    db.commit()
@@ -0,0 +1,361 @@
+"""
+End-to-end load test: runs app.main:app on a local port against a
+temporary SQLite database and drives it with simulated agents.
+
+    python -m benchmarks.loadtest --agents 200 --duration 60 --json results.json
+
+Each virtual agent registers (with a webhook pointing at a local stub
+server), then loops over the marketplace lifecycle: polling and searching
+tasks, posting tasks, claiming and completing them, and messaging other
+agents. Dashboard clients poll /activity/recent. The report lists
+throughput, p50/p95/p99 latency and status codes per route, plus SQLite
+lock errors seen by the server.
+
+Redis: by default REDIS_URL points at a closed port, so the app runs on
+its in-process fallbacks; pass --fake-redis (needs the `fakeredis`
+package) or --redis-url to exercise a Redis backend.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+CAPABILITIES = [
+    "python", "data-analysis", "web-scraping", "translation", "summarization",
+    "image-generation", "sql", "code-review", "research", "writing"
+]
+
+# (weight, action) for each step of a virtual agent
+ACTIONS = [
+    (30, "poll_tasks"),
+    (10, "search_agents"),
+    (5, "recommended"),
+    (15, "post_task"),
+    (15, "claim_and_complete"),
+    (15, "message"),
+    (5, "my_profile"),
+    (5, "leaderboard"),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """
+    Latency samples and status codes per route label.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.transport_errors: Counter = Counter()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    async def call(self, client, method: str, route: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception as e:
+            self.transport_errors[f"{method} {route}: {type(e).__name__}"] += 1
+            return None
+        self.latencies[f"{method} {route}"].append(time.perf_counter() - started)
+        self.statuses[f"{method} {route}"][response.status_code] += 1
+        return response
+
+    def report(self, lock_errors: int) -> Dict[str, object]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total = sum(len(v) for v in self.latencies.values())
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            routes[route] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(_percentile(samples, 99) * 1000, 2),
+                "statuses": {str(k): v for k, v in sorted(self.statuses[route].items())}
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "server_errors": sum(c for s in self.statuses.values() for code, c in s.items() if code >= 500),
+            "lock_errors": lock_errors,
+            "transport_errors": dict(self.transport_errors),
+            "routes": routes
+        }
+
+
+def _print_report(report: Dict[str, object]):
+    print()
+    print(f"Requests: {report['requests']} in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} req/s), 5xx: {report['server_errors']}, "
+          f"SQLite lock errors: {report['lock_errors']}")
+    if report["transport_errors"]:
+        print(f"Transport errors: {report['transport_errors']}")
+    print()
+    print(f"{'route':<48} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for route, r in report["routes"].items():
+        statuses = " ".join(f"{k}:{v}" for k, v in r["statuses"].items())
+        print(f"{route:<48} {r['requests']:>7} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {statuses}")
+
+
+def _start_server(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def _webhook_stub(failure_rate: float, delay: float):
+    """
+    ASGI app standing in for agents' webhook endpoints.
+    """
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        more = True
+        while more:
+            message = await receive()
+            more = message.get("more_body", False)
+        if delay:
+            await asyncio.sleep(delay)
+        status = 500 if random.random() < failure_rate else 200
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+    return app
+
+
+class VirtualAgent:
+    def __init__(self, index: int, base: str, webhook_base: str, recorder: Recorder, shared: Dict[str, list]):
+        self.name = f"loadtest-agent-{index}"
+        self.capabilities = random.sample(CAPABILITIES, random.randint(1, 3))
+        self.base = base
+        self.webhook = f"{webhook_base}/hook/{index}"
+        self.recorder = recorder
+        self.shared = shared
+        self.id = None
+        self.headers = {}
+
+    async def register(self, client) -> bool:
+        response = await self.recorder.call(client, "POST", "/agents/register", f"{self.base}/agents/register", json={
+            "name": self.name,
+            "description": "Load test agent",
+            "capabilities": self.capabilities,
+            "endpoints": {"webhook": self.webhook}
+        })
+        if response is None or response.status_code != 200:
+            return False
+        data = response.json()
+        self.id = data["agent_id"]
+        self.headers = {"Authorization": f"Bearer {data['api_key']}"}
+        self.shared["agents"].append(self.id)
+        return True
+
+    async def step(self, client):
+        action = random.choices([a for _, a in ACTIONS], weights=[w for w, _ in ACTIONS])[0]
+        await getattr(self, action)(client)
+
+    async def poll_tasks(self, client):
+        caps = ",".join(random.sample(self.capabilities, 1))
+        await self.recorder.call(client, "GET", "/tasks", f"{self.base}/tasks",
+                                 params={"status": "open", "capabilities": caps, "limit": 20})
+
+    async def search_agents(self, client):
+        await self.recorder.call(client, "POST", "/agents/search", f"{self.base}/agents/search",
+                                 json={"capabilities": random.sample(CAPABILITIES, 2), "limit": 20})
+
+    async def recommended(self, client):
+        await self.recorder.call(client, "GET", "/tasks/recommended", f"{self.base}/tasks/recommended",
+                                 headers=self.headers)
+
+    async def my_profile(self, client):
+        await self.recorder.call(client, "GET", "/agents/me", f"{self.base}/agents/me", headers=self.headers)
+
+    async def leaderboard(self, client):
+        await self.recorder.call(client, "GET", "/leaderboard", f"{self.base}/leaderboard", params={"limit": 50})
+
+    async def post_task(self, client):
+        response = await self.recorder.call(client, "POST", "/tasks", f"{self.base}/tasks", headers=self.headers, json={
+            "title": f"Task from {self.name}",
+            "description": "Generated by the load test",
+            "required_capabilities": random.sample(CAPABILITIES, random.randint(1, 2)),
+            "payload": {"n": random.randint(0, 10 ** 6)},
+            "priority": random.randint(0, 5)
+        })
+        if response is not None and response.status_code == 200:
+            self.shared["tasks"].append(response.json()["id"])
+
+    async def claim_and_complete(self, client):
+        if not self.shared["tasks"]:
+            return await self.poll_tasks(client)
+        task_id = random.choice(self.shared["tasks"][-200:])
+        response = await self.recorder.call(client, "POST", "/tasks/{id}/claim",
+                                            f"{self.base}/tasks/{task_id}/claim", headers=self.headers)
+        if response is None or response.status_code != 200:
+            return  # Taken by another agent, or our own task: expected under contention
+        await self.recorder.call(client, "POST", "/tasks/{id}/complete", f"{self.base}/tasks/{task_id}/complete",
+                                 headers=self.headers, json={"result": {"ok": True}, "notes": "done"})
+
+    async def message(self, client):
+        if len(self.shared["agents"]) < 2:
+            return
+        recipient = random.choice(self.shared["agents"])
+        if recipient == self.id:
+            return
+        await self.recorder.call(client, "POST", "/interactions/message", f"{self.base}/interactions/message",
+                                 headers=self.headers,
+                                 json={"recipient_id": recipient, "message_type": "hello", "payload": {"x": 1}})
+
+
+async def _run(args, base: str, webhook_base: str, recorder: Recorder):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        shared: Dict[str, list] = {"agents": [], "tasks": []}
+        agents = [VirtualAgent(i, base, webhook_base, recorder, shared) for i in range(args.agents)]
+
+        print(f"Registering {len(agents)} agents...")
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def register(agent):
+            async with semaphore:
+                return await agent.register(client)
+
+        registered = [a for a, ok in zip(agents, await asyncio.gather(*(register(a) for a in agents))) if ok]
+        print(f"Registered {len(registered)} agents; running workload for {args.duration}s...")
+
+        deadline = time.perf_counter() + args.duration
+        recorder.started = time.perf_counter()
+        recorder.latencies.clear()
+        recorder.statuses.clear()
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await random.choice(registered).step(client)
+                if args.think_time:
+                    await asyncio.sleep(random.uniform(0, args.think_time))
+
+        async def dashboard():
+            while time.perf_counter() < deadline:
+                await recorder.call(client, "GET", "/activity/recent", f"{base}/activity/recent")
+                await asyncio.sleep(args.dashboard_interval)
+
+        if registered:
+            await asyncio.gather(*([worker() for _ in range(args.concurrency)] +
+                                   [dashboard() for _ in range(args.dashboards)]))
+        recorder.finished = time.perf_counter()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test for the marketplace API")
+    parser.add_argument("--agents", type=int, default=100, help="Virtual agents to register")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent in-flight requests")
+    parser.add_argument("--duration", type=float, default=30, help="Workload duration in seconds")
+    parser.add_argument("--dashboards", type=int, default=2, help="Clients polling /activity/recent")
+    parser.add_argument("--dashboard-interval", type=float, default=1.0)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between steps (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client request timeout (s)")
+    parser.add_argument("--webhook-failure-rate", type=float, default=0.05)
+    parser.add_argument("--webhook-delay", type=float, default=0.01, help="Stub webhook response delay (s)")
+    parser.add_argument("--redis-url", help="Use a real Redis server")
+    parser.add_argument("--fake-redis", action="store_true", help="Use fakeredis in process")
+    parser.add_argument("--with-rate-limits", action="store_true", help="Keep rate limiting enabled")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="50c14l-loadtest-")
+
+    # Configure the app before importing it: settings are read at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/loadtest.db"
+    os.environ["BLOB_DIR"] = os.path.join(workdir, "blobs")
+    os.environ["INTERACTION_ARCHIVE_DIR"] = os.path.join(workdir, "interactions")
+    os.environ["REDIS_URL"] = args.redis_url or f"redis://127.0.0.1:{_free_port()}/0"
+    os.environ["ENVIRONMENT"] = "loadtest"
+    if not args.with_rate_limits:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # static/ is relative
+
+    from sqlalchemy import event
+    from app.database import engine
+
+    if args.fake_redis:
+        import fakeredis
+        from app.utils import notifications
+        notifications.redis_client = fakeredis.FakeRedis(decode_responses=True)
+
+    lock_errors = Counter()
+
+    @event.listens_for(engine, "handle_error")
+    def _count_lock_errors(context):
+        if "locked" in str(context.original_exception).lower():
+            lock_errors["locked"] += 1
+
+    from app.main import app
+
+    port, webhook_port = _free_port(), _free_port()
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    server, server_thread = _start_server(app, port)
+    webhook_server, webhook_thread = _start_server(
+        _webhook_stub(args.webhook_failure_rate, args.webhook_delay), webhook_port)
+
+    recorder = Recorder()
+    try:
+        asyncio.run(_run(args, f"http://127.0.0.1:{port}/api/v1", f"http://127.0.0.1:{webhook_port}", recorder))
+    finally:
+        # Wait for both servers to drain in-flight requests and run the app's
+        # shutdown hooks; exiting with them mid-request aborts the interpreter
+        # ("FATAL: exception not rethrown")
+        server.should_exit = True
+        webhook_server.should_exit = True
+        server_thread.join()
+        webhook_thread.join()
+
+    report = recorder.report(lock_errors["locked"])
+    report["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Micro-benchmarks for hot functions, with JSON baselines and a regression gate.
+
+    python -m benchmarks.micro run --out current.json          # full sizes
+    python -m benchmarks.micro run --quick --out current.json  # smaller fixtures
+    python -m benchmarks.micro compare baseline.json current.json --threshold 0.25
+    python -m benchmarks.micro run --quick --compare baseline.json
+
+`compare` (and `run --compare`) exits with status 1 when the median of any
+benchmark present in both files is more than `threshold` slower than in
+the baseline. Baselines are only comparable on the same machine; record
+one per runner, e.g. on the main branch in CI.
+
+Fixtures are seeded (--seed), so every run measures the same data.
+Authentication uses bcrypt cost 4 (--bcrypt-rounds) to keep seeding fast;
+scans still cost one verification per agent, scaled by the cost factor.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = {
+    "full": {"agents": [10, 1000, 10000], "tasks": [1000, 10000, 100000], "search_agents": [1000, 10000, 50000]},
+    "quick": {"agents": [10, 100, 1000], "tasks": [1000, 10000], "search_agents": [1000, 10000]},
+}
+
+
+class Suite:
+    """
+    Collects benchmark timings: `warmup` untimed calls, then `repeat`
+    timed calls of `fn` per benchmark.
+    """
+
+    def __init__(self, pattern: str, repeat: int, warmup: int):
+        self.pattern = pattern
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def wants(self, name: str) -> bool:
+        return fnmatch.fnmatch(name, self.pattern)
+
+    def measure(self, name: str, fn: Callable[[], object], repeat: Optional[int] = None):
+        if not self.wants(name):
+            return
+        for _ in range(self.warmup):
+            fn()
+        timings = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        self.results[name] = {
+            "runs": len(timings),
+            "median_ms": round(statistics.median(timings) * 1000, 4),
+            "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+            "min_ms": round(min(timings) * 1000, 4),
+            "p95_ms": round(sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000, 4)
+        }
+        r = self.results[name]
+        print(f"{name:<52} median {r['median_ms']:>10.3f} ms   min {r['min_ms']:>10.3f} ms   ({r['runs']} runs)")
+
+    def skip(self, name: str, reason: str):
+        if self.wants(name):
+            print(f"{name:<52} skipped: {reason}")
+
+
+def _request(path: str, query: str = ""):
+    from starlette.requests import Request
+    return Request({
+        "type": "http", "method": "GET", "scheme": "http", "server": ("bench", 80),
+        "path": path, "root_path": "", "query_string": query.encode(), "headers": []
+    })
+
+
+def _bench_auth(suite: Suite, workdir: str, sizes: List[int], rng_seed: int, rounds: int):
+    from fastapi.security import HTTPAuthorizationCredentials
+    from app.auth import get_current_agent
+    from benchmarks.fixtures import make_database, seed_agents
+
+    for count in sizes:
+        names = [f"get_current_agent[agents={count},{pos}]" for pos in ("first", "last")]
+        if not any(suite.wants(n) for n in names):
+            continue
+        sessions = make_database(os.path.join(workdir, f"auth-{count}.db"))
+        db = sessions()
+        keys = seed_agents(db, count, random.Random(rng_seed), bcrypt_rounds=rounds, probes=2)
+        for name, (_, api_key) in zip(names, (keys[0], keys[-1])):
+            credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=api_key)
+            # A full scan costs `count` bcrypt checks: fewer runs on large tables
+            suite.measure(name, lambda: get_current_agent(credentials, db), repeat=max(3, min(suite.repeat, 20000 // count)))
+        db.close()
+
+
+def _bench_tasks(suite: Suite, workdir: str, sizes: List[int], rng_seed: int):
+    from app.api.tasks import list_tasks
+    from app.api.activity import get_recent_activity
+    from benchmarks.fixtures import make_database, seed_agents, seed_tasks, seed_interactions, seed_reputation_logs
+
+    for count in sizes:
+        prefix = f"[tasks={count}]"
+        if not any(suite.wants(n + prefix) for n in ("list_tasks*", "get_recent_activity")):
+            continue
+        rng = random.Random(rng_seed)
+        sessions = make_database(os.path.join(workdir, f"tasks-{count}.db"))
+        db = sessions()
+        seed_agents(db, 200, rng)
+        agent_ids = [f"agent-{i:07d}" for i in range(200)]
+        seed_tasks(db, count, agent_ids, rng)
+        seed_interactions(db, min(count, 10000), agent_ids, rng)
+        seed_reputation_logs(db, min(count, 10000), agent_ids, rng)
+
+        suite.measure(f"list_tasks{prefix}", lambda: list_tasks(_request("/api/v1/tasks"), None, "open", 25, False, db))
+        suite.measure(f"list_tasks[capability]{prefix}", lambda: list_tasks(
+            _request("/api/v1/tasks", "capabilities=python"), "python", "open", 25, False, db))
+        suite.measure(f"list_tasks[2 capabilities]{prefix}", lambda: list_tasks(
+            _request("/api/v1/tasks", "capabilities=python,legal"), "python,legal", "open", 25, False, db))
+        suite.measure(f"get_recent_activity{prefix}", lambda: get_recent_activity(100, db))
+        db.close()
+
+
+def _bench_search(suite: Suite, workdir: str, sizes: List[int], rng_seed: int):
+    from app.api.agents import _search_agents
+    from app.schemas import AgentSearchRequest
+    from app.utils.capability_index import capability_index
+    from app.utils.capability_catalog import capability_catalog
+    from app.utils.leaderboard import rebuild_leaderboard
+    from benchmarks.fixtures import make_database, seed_agents
+
+    for count in sizes:
+        prefix = f"[agents={count}]"
+        if not suite.wants(f"search_agents*{prefix}"):
+            continue
+        sessions = make_database(os.path.join(workdir, f"search-{count}.db"))
+        db = sessions()
+        seed_agents(db, count, random.Random(rng_seed), probes=1)
+        capability_index.rebuild(db)
+        capability_catalog.rebuild(db)
+        rebuild_leaderboard(db)
+
+        one = AgentSearchRequest(capabilities=["python"], limit=25)
+        both = AgentSearchRequest(capabilities=["python", "sql"], match="all", limit=25)
+        fuzzy = AgentSearchRequest(capabilities=["python3"], fuzzy=True, limit=25)
+        suite.measure(f"search_agents[any]{prefix}", lambda: _search_agents(one, db))
+        suite.measure(f"search_agents[all]{prefix}", lambda: _search_agents(both, db))
+        suite.measure(f"search_agents[fuzzy]{prefix}", lambda: _search_agents(fuzzy, db))
+        db.close()
+
+
+def _bench_reputation(suite: Suite, workdir: str, rng_seed: int):
+    from app.utils.reputation import update_reputation
+    from benchmarks.fixtures import make_database, seed_agents
+
+    if not suite.wants("update_reputation"):
+        return
+    sessions = make_database(os.path.join(workdir, "reputation.db"))
+    db = sessions()
+    seed_agents(db, 1000, random.Random(rng_seed), probes=1)
+    ids = [f"agent-{i:07d}" for i in range(1000)]
+    rng = random.Random(rng_seed)
+    suite.measure("update_reputation", lambda: update_reputation(db, rng.choice(ids), "task_completed", 10, "bench"))
+    db.close()
+
+
+def _bench_publish(suite: Suite, redis_url: Optional[str]):
+    from app.utils import notifications
+
+    names = [f"publish_task[capabilities={n}]" for n in (1, 10)]
+    if not any(suite.wants(n) for n in names):
+        return
+    client = None
+    if redis_url:
+        import redis
+        client = redis.from_url(redis_url, decode_responses=True)
+    else:
+        try:
+            import fakeredis
+            client = fakeredis.FakeRedis(decode_responses=True)
+        except ImportError:
+            for name in names:
+                suite.skip(name, "needs --redis-url or the fakeredis package")
+            return
+
+    original = notifications.redis_client
+    notifications.redis_client = client
+    try:
+        for name, n in zip(names, (1, 10)):
+            task = {"id": "bench", "title": "Benchmark", "required_capabilities": [f"cap-{i}" for i in range(n)],
+                    "requester_id": "agent", "created_at": datetime.utcnow().isoformat()}
+            suite.measure(name, lambda: notifications.publish_task(task))
+    finally:
+        notifications.redis_client = original
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args) -> Dict[str, object]:
+    workdir = tempfile.mkdtemp(prefix="50c14l-bench-")
+    # Settings are read at import time; keep the app's own database and blobs out of the way
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/app.db"
+    os.environ["BLOB_DIR"] = os.path.join(workdir, "blobs")
+    os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1/0")
+    sys.path.insert(0, ROOT)
+
+    sizes = SIZES["quick" if args.quick else "full"]
+    suite = Suite(args.only, args.repeat, args.warmup)
+    _bench_auth(suite, workdir, sizes["agents"], args.seed, args.bcrypt_rounds)
+    _bench_tasks(suite, workdir, sizes["tasks"], args.seed)
+    _bench_search(suite, workdir, sizes["search_agents"], args.seed)
+    _bench_reputation(suite, workdir, args.seed)
+    _bench_publish(suite, args.redis_url)
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "sizes": "quick" if args.quick else "full",
+            "seed": args.seed,
+            "bcrypt_rounds": args.bcrypt_rounds
+        },
+        "results": suite.results
+    }
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], threshold: float) -> bool:
+    """
+    Print per-benchmark changes of the median. Returns False on any regression beyond `threshold`.
+    """
+    ok = True
+    print(f"\n{'benchmark':<52} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:<52} {'-':>10} {result['median_ms']:>10.3f}      new")
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:<52} {base['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+7.1%}{flag}")
+    missing = set(baseline["results"]) - set(current["results"])
+    if missing:
+        print(f"\nNot measured in this run: {', '.join(sorted(missing))}")
+    print(f"\n{'OK' if ok else 'FAILED'}: threshold +{threshold:.0%} on the median")
+    return ok
+
+
+def _load(path: str) -> Dict[str, object]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with regression gates")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--quick", action="store_true", help="Smaller fixtures")
+    run_parser.add_argument("--only", default="*", help="Glob over benchmark names, e.g. 'search_agents*'")
+    run_parser.add_argument("--repeat", type=int, default=50)
+    run_parser.add_argument("--warmup", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    run_parser.add_argument("--redis-url", help="Redis for publish_task (default: fakeredis if installed)")
+    run_parser.add_argument("--out", help="Write results (a baseline) to this JSON file")
+    run_parser.add_argument("--compare", help="Baseline JSON to compare against; exit 1 on regression")
+    run_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, e.g. 0.25 = 25%%")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        sys.exit(0 if compare(_load(args.baseline), _load(args.current), args.threshold) else 1)
+
+    results = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    if args.compare:
+        sys.exit(0 if compare(_load(args.compare), results, args.threshold) else 1)
+
+
+if __name__ == "__main__":
+    main()
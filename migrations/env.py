@@ -0,0 +1,67 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from app.config import settings
+from app.database import Base
+import app.models  # noqa: F401  (registers the models on Base.metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logging", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Created by raw DDL in migration 0004 and not modelled: the FTS5 table (and
+# the shadow tables SQLite keeps for it) and the Postgres expression index
+SEARCH_INDEX_OBJECTS = ("tasks_fts", "ix_tasks_search")
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Keep `alembic check` from reporting the search index as drift
+    return not (reflected and compare_to is None and name and name.startswith(SEARCH_INDEX_OBJECTS))
+
+
+def run_migrations_offline():
+    """
+    Emit SQL to stdout instead of running it (alembic upgrade head --sql).
+    """
+    context.configure(
+        url=settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        render_as_batch=settings.database_url.startswith("sqlite"),
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # init_db passes the app's connection; the CLI opens its own
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = create_engine(settings.database_url)
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",  # SQLite can't ALTER most things
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
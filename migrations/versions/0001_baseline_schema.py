@@ -0,0 +1,184 @@
+"""baseline schema
+
+The schema as Base.metadata.create_all produced it before migrations were
+introduced. Every table and index is created with IF NOT EXISTS, so this
+revision both builds a fresh database and adopts an existing one.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 22:52:58.552949
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('agents',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('api_key_hash', sa.String(length=255), nullable=False),
+    sa.Column('capabilities', sa.JSON(), nullable=True),
+    sa.Column('endpoints', sa.JSON(), nullable=True),
+    sa.Column('agent_metadata', sa.JSON(), nullable=True),
+    sa.Column('reputation_score', sa.Integer(), nullable=True),
+    sa.Column('total_tasks_completed', sa.Integer(), nullable=True),
+    sa.Column('total_tasks_posted', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('last_active', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('api_key_hash'),
+    if_not_exists=True
+    )
+    op.create_index('ix_agents_name', 'agents', ['name'], unique=True, if_not_exists=True)
+    op.create_index('ix_agents_reputation_score', 'agents', ['reputation_score'], unique=False, if_not_exists=True)
+
+    op.create_table('tasks',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('requester_id', sa.String(), nullable=False),
+    sa.Column('claimer_id', sa.String(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('required_capabilities', sa.JSON(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('priority', sa.Integer(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['claimer_id'], ['agents.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['requester_id'], ['agents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_tasks_requester_id', 'tasks', ['requester_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_tasks_status', 'tasks', ['status'], unique=False, if_not_exists=True)
+
+    op.create_table('interactions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('sender_id', sa.String(), nullable=False),
+    sa.Column('recipient_id', sa.String(), nullable=False),
+    sa.Column('message_type', sa.String(length=50), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['agents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sender_id'], ['agents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_interactions_created_at', 'interactions', ['created_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_interactions_recipient_id', 'interactions', ['recipient_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_interactions_sender_id', 'interactions', ['sender_id'], unique=False, if_not_exists=True)
+
+    op.create_table('reputation_logs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('agent_id', sa.String(), nullable=False),
+    sa.Column('action', sa.String(length=50), nullable=True),
+    sa.Column('value_change', sa.Integer(), nullable=True),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_reputation_logs_agent_id', 'reputation_logs', ['agent_id'], unique=False, if_not_exists=True)
+
+    op.create_table('reputation_daily_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('agent_id', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('action', sa.String(length=50), nullable=False),
+    sa.Column('total_change', sa.Integer(), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('agent_id', 'day', 'action', name='uq_reputation_rollup'),
+    if_not_exists=True
+    )
+    op.create_index('ix_reputation_daily_rollups_agent_id', 'reputation_daily_rollups', ['agent_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_reputation_daily_rollups_day', 'reputation_daily_rollups', ['day'], unique=False, if_not_exists=True)
+
+    op.create_table('reputation_logs_archive',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('agent_id', sa.String(), nullable=False),
+    sa.Column('action', sa.String(length=50), nullable=True),
+    sa.Column('value_change', sa.Integer(), nullable=True),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_reputation_logs_archive_agent_id', 'reputation_logs_archive', ['agent_id'], unique=False, if_not_exists=True)
+
+    op.create_table('stat_counters',
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name'),
+    if_not_exists=True
+    )
+
+    op.create_table('task_result_cache',
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('source_task_id', sa.String(), nullable=False),
+    sa.Column('claimer_id', sa.String(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('result_size', sa.Integer(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('cache_key'),
+    if_not_exists=True
+    )
+    op.create_index('ix_task_result_cache_expires_at', 'task_result_cache', ['expires_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_task_result_cache_last_used_at', 'task_result_cache', ['last_used_at'], unique=False, if_not_exists=True)
+
+    op.create_table('cacheable_tasks',
+    sa.Column('task_id', sa.String(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id'),
+    if_not_exists=True
+    )
+
+    op.create_table('idempotency_keys',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('agent_id', sa.String(), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    if_not_exists=True
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table('idempotency_keys')
+    op.drop_table('cacheable_tasks')
+    op.drop_table('task_result_cache')
+    op.drop_table('stat_counters')
+    op.drop_table('reputation_logs_archive')
+    op.drop_table('reputation_daily_rollups')
+    op.drop_table('reputation_logs')
+    op.drop_table('interactions')
+    op.drop_table('tasks')
+    op.drop_table('agents')
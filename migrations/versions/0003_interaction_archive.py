@@ -0,0 +1,48 @@
+"""interaction archive index
+
+Sparse index of the compressed interaction segments written by the
+retention job (app/utils/interaction_archive.py): one row per block.
+The history endpoint walks it newest first, by max_created_at.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 23:40:02.318220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('interaction_archive_blocks',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('segment', sa.String(length=255), nullable=False),
+    sa.Column('byte_offset', sa.Integer(), nullable=False),
+    sa.Column('byte_length', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('min_created_at', sa.DateTime(), nullable=False),
+    sa.Column('max_created_at', sa.DateTime(), nullable=False),
+    sa.Column('agent_filter', sa.LargeBinary(), nullable=False),
+    sa.Column('status_counts', sa.JSON(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_interaction_archive_blocks_max_created_at', 'interaction_archive_blocks',
+                    ['max_created_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    # The segment files are left in place; restore rows from them before downgrading
+    op.drop_index('ix_interaction_archive_blocks_max_created_at', table_name='interaction_archive_blocks',
+                  if_exists=True)
+    op.drop_table('interaction_archive_blocks', if_exists=True)
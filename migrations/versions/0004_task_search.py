@@ -0,0 +1,86 @@
+"""task full-text search index
+
+The search index used by GET /tasks/search (app/utils/task_search.py),
+previously created by ad-hoc DDL at startup.
+
+SQLite: an external-content FTS5 table keyed on tasks.rowid, kept in sync
+by triggers. Builds without FTS5 skip it; search then falls back to LIKE.
+Postgres: an expression GIN index over title and description.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:05:41.550913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.rowid, new.title, coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, coalesce(old.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, coalesce(old.description, ''));
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.rowid, new.title, coalesce(new.description, ''));
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        # Databases that ran the app before this revision already have the index
+        exists = bind.execute(sa.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+        )).first()
+        if not exists:
+            try:
+                op.execute(
+                    "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+                    "title, description, content='tasks', content_rowid='rowid', tokenize='porter unicode61')"
+                )
+            except sa.exc.OperationalError as e:  # SQLite built without FTS5
+                print(f"Warning: FTS5 unavailable, task search will use LIKE matching: {e}")
+                return
+        for statement in SQLITE_TRIGGERS:
+            op.execute(statement)
+        if not exists:
+            # Index tasks written before the FTS table existed
+            op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING GIN "
+            "(to_tsvector('english', coalesce(tasks.title, '') || ' ' || coalesce(tasks.description, '')))"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in ("tasks_fts_ai", "tasks_fts_ad", "tasks_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_tasks_search")